@@ -0,0 +1,335 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import timeit
+
+from collections import OrderedDict
+
+from evaluation.evaluation import MAX_DIST, evaluate_lemma
+from paintball.distances import DistanceEvaluator
+from paintball.graph import BaseGraph
+from paintball.paint_ball import (PaintBall, Params, LemmaActivations, FRONTIER, VECTORIZED, BEST_FIRST, SPARSE,
+                                  BATCHED)
+from paintball.synset_sizes import SynsetSizeTable
+from paintball.utils import load_impedance_table
+
+from .synthetic import build_graphs, make_knowledge_source
+
+IMPEDANCE_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'res',
+                               'paint_ball_impedance_table.csv')
+
+PARAMS = Params(
+    mikro=0.80,
+    tau_0=0.45,
+    epsilon=(0.5 / 4),
+    tau_3=1.2,
+    tau_4=1
+)
+
+# Set in the parent before a benchmark process is forked, so the graphs and
+# intermediate results are inherited instead of being built again.
+_context = {}
+
+
+def make_paint_ball(engine=FRONTIER):
+    return PaintBall(
+        graph=_context['graph'],
+        params=PARAMS,
+        impedance_table=_context['impedance_table'],
+        knowledge_source=_context['knowledge_source'],
+        plwn=None,
+        engine=engine,
+        synset_sizes=_context['synset_sizes']
+    )
+
+
+def prepare_context(num_lus, degree, num_sources, targets_per_source, shared_targets, seed, impedance_table,
+                    work_dir):
+    """
+    Builds the synthetic graphs and knowledge source, saves the graph for
+    the loading benchmarks and computes intermediate results of every
+    stage of attaching, used as inputs of the next stage.
+    """
+    graph, syn_graph = build_graphs(num_lus, degree, seed=seed)
+    knowledge_source = make_knowledge_source(graph, num_sources, targets_per_source, seed=seed,
+                                             shared_targets=shared_targets)
+
+    _context.clear()
+    _context['graph'] = graph
+    _context['syn_graph'] = syn_graph
+    _context['knowledge_source'] = knowledge_source
+    _context['items'] = sorted(knowledge_source.items())
+    _context['impedance_table'] = load_impedance_table(impedance_table)
+    _context['synset_sizes'] = SynsetSizeTable.from_graph(syn_graph)
+
+    _context['graph_path'] = os.path.join(work_dir, 'graph.xml.gz')
+    _context['snapshot_path'] = os.path.join(work_dir, 'graph.pbs')
+    graph.pickle(_context['graph_path'])
+    graph.save_snapshot(_context['snapshot_path'])
+
+    pb = make_paint_ball()
+    lemma_to_nodes = graph.lemma_to_nodes_dict
+    _context['lemma_activations'] = [
+        [LemmaActivations(target, lemma_to_nodes[target], support) for target, support in targets_supports]
+        for _, targets_supports in _context['items']
+    ]
+    _context['Ts'] = [pb._setup_initial_activation(las) for las in _context['lemma_activations']]
+    _context['Qs'] = [pb._spread(T) for T in _context['Ts']]
+    _context['Q_synsets'] = [pb.synset_activation(Q) for Q in _context['Qs']]
+
+    # lead synsets of every source evaluated as evaluation does with results
+    # of a run; sources are not in the synsets graph, so their first target
+    # lemma stands in for them
+    _context['evaluation_items'] = [
+        (targets_supports[0][0], [syn_graph.node_synset_id(node) for node in pb.find_subgraphs(Q_synset, syn_graph)])
+        for (_, targets_supports), Q_synset in zip(_context['items'], _context['Q_synsets'])
+    ]
+
+
+def bench_load_graph():
+    def run():
+        BaseGraph().unpickle(_context['graph_path'])
+    return run, None
+
+
+def bench_load_snapshot():
+    def run():
+        BaseGraph().load_snapshot(_context['snapshot_path'])
+    return run, None
+
+
+def bench_build_lemma_index():
+    graph = _context['graph']
+
+    def run():
+        graph.generate_lemma_to_nodes_dict_lexical_units()
+    return run, None
+
+
+def bench_build_csr():
+    graph = _context['graph']
+
+    def run():
+        graph.csr(rebuild=True)
+    return run, None
+
+
+def bench_setup_initial_activation():
+    pb = make_paint_ball()
+    lemma_activations = _context['lemma_activations']
+
+    def run():
+        for las in lemma_activations:
+            pb._setup_initial_activation(las)
+    return run, len(lemma_activations)
+
+
+def bench_act_replication():
+    pb = make_paint_ball()
+    Ts = _context['Ts']
+
+    def run():
+        for T in Ts:
+            Q = pb._activations
+            for vertex, activation_value in T.items():
+                pb._act_replication(vertex, activation_value, Q)
+            Q.reset()
+    return run, len(Ts)
+
+
+def bench_synset_activation():
+    pb = make_paint_ball()
+    Qs = _context['Qs']
+
+    def run():
+        for Q in Qs:
+            pb.synset_activation(Q)
+    return run, len(Qs)
+
+
+def bench_find_subgraphs():
+    pb = make_paint_ball()
+    syn_graph = _context['syn_graph']
+    Q_synsets = _context['Q_synsets']
+
+    def run():
+        for Q_synset in Q_synsets:
+            pb.find_subgraphs(Q_synset, syn_graph)
+    return run, len(Q_synsets)
+
+
+def bench_evaluation_distances():
+    syn_graph = _context['syn_graph']
+    evaluator = DistanceEvaluator(syn_graph, max_dist=MAX_DIST)
+    items = _context['evaluation_items']
+
+    def run():
+        for source_lemma, targets_synset_ids in items:
+            evaluate_lemma(syn_graph, evaluator, source_lemma, targets_synset_ids)
+    return run, len(items)
+
+
+def attach_benchmark(engine):
+    def bench():
+        pb = make_paint_ball(engine)
+        syn_graph = _context['syn_graph']
+        items = _context['items']
+
+        def run():
+            pb.attach_batch(items, syn_graph)
+        return run, len(items)
+    return bench
+
+
+BENCHMARKS = OrderedDict([
+    ('load_graph', bench_load_graph),
+    ('load_snapshot', bench_load_snapshot),
+    ('build_lemma_index', bench_build_lemma_index),
+    ('build_csr', bench_build_csr),
+    ('setup_initial_activation', bench_setup_initial_activation),
+    ('act_replication', bench_act_replication),
+    ('synset_activation', bench_synset_activation),
+    ('find_subgraphs', bench_find_subgraphs),
+    ('evaluation_distances', bench_evaluation_distances),
+])
+for _engine in (FRONTIER, VECTORIZED, BEST_FIRST, SPARSE, BATCHED):
+    BENCHMARKS['attach_' + _engine] = attach_benchmark(_engine)
+
+
+def _run_benchmark(task):
+    """
+    Runs a benchmark repeat times in a forked process. Its peak resident
+    memory starts from the memory of the process at the fork, so it covers
+    the benchmark and the inherited pages it touches.
+    """
+    name, repeat = task
+    run, sources = BENCHMARKS[name]()
+    times = []
+    for _ in range(repeat):
+        started = timeit.default_timer()
+        run()
+        times.append(timeit.default_timer() - started)
+
+    times.sort()
+    seconds = times[0]
+    return {
+        'seconds': seconds,
+        'median_seconds': times[len(times) // 2],
+        'sources_per_second': sources / seconds if sources and seconds else None,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }
+
+
+def run_benchmarks(names, repeat):
+    """ Runs benchmarks of prepare_context, each in its own process """
+    results = OrderedDict()
+    for name in names:
+        pool = multiprocessing.Pool(1)
+        try:
+            results[name] = pool.apply(_run_benchmark, ((name, repeat),))
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Benchmarks slower than in the baseline by more than the tolerance, a
+    fraction of the baseline time. Returns (name, baseline seconds,
+    seconds) triples. Results are only comparable for the same config.
+    """
+    if results['config'] != baseline['config']:
+        raise ValueError('Baseline was recorded with a different config: {}'.format(baseline['config']))
+
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        previous = baseline['benchmarks'].get(name)
+        if previous is not None and result['seconds'] > previous['seconds'] * (1 + tolerance):
+            regressions.append((name, previous['seconds'], result['seconds']))
+    return regressions
+
+
+def format_results(results, baseline=None):
+    lines = ["{:<28} {:>10} {:>10} {:>12} {:>10}".format('benchmark', 'seconds', 'baseline', 'sources/s', 'peak MB')]
+    for name, result in results['benchmarks'].items():
+        previous = baseline['benchmarks'].get(name) if baseline else None
+        lines.append("{:<28} {:>10.4f} {:>10} {:>12} {:>10.1f}".format(
+            name,
+            result['seconds'],
+            '{:.4f}'.format(previous['seconds']) if previous else '-',
+            '{:.1f}'.format(result['sources_per_second']) if result['sources_per_second'] else '-',
+            result['peak_rss_mb']
+        ))
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmarks hot paths of paint ball on synthetic graphs')
+    parser.add_argument('--lus', type=int, default=20000, help='number of lexical units of the graph')
+    parser.add_argument('--degree', type=float, default=3, help='average number of outgoing edges of a vertex')
+    parser.add_argument('--sources', type=int, default=200, help='number of sources of the knowledge source')
+    parser.add_argument('--targets', type=int, default=10, help='number of targets of every source')
+    parser.add_argument('--shared-targets', type=int,
+                        help='number of lemmas targets are drawn from, all lemmas of the graph by default')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--impedance-table', default=IMPEDANCE_TABLE)
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every benchmark, the fastest counts')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='benchmarks to run, all by default')
+    parser.add_argument('--output', help='JSON file for the results, usable as a baseline later')
+    parser.add_argument('--baseline', help='JSON file with results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction by which a benchmark may be slower than the baseline')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = OrderedDict([
+        ('lus', args.lus),
+        ('degree', args.degree),
+        ('sources', args.sources),
+        ('targets', args.targets),
+        ('shared_targets', args.shared_targets),
+        ('seed', args.seed),
+        ('repeat', args.repeat),
+    ])
+
+    work_dir = tempfile.mkdtemp(prefix='paintball-bench-')
+    try:
+        prepare_context(args.lus, args.degree, args.sources, args.targets, args.shared_targets, args.seed,
+                        args.impedance_table, work_dir)
+        results = {
+            'config': config,
+            'benchmarks': run_benchmarks(args.only or list(BENCHMARKS), args.repeat),
+        }
+    finally:
+        shutil.rmtree(work_dir)
+        _context.clear()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(format_results(results, baseline))
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, previous, seconds in regressions:
+            print("REGRESSION {}: {:.4f}s -> {:.4f}s".format(name, previous, seconds))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
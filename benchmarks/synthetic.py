@@ -0,0 +1,159 @@
+import random
+
+from collections import defaultdict
+
+from paintball.graph import BaseGraph
+
+HYPONYMY = 10
+HYPERNYMY = 11
+SYNONYMY = 888
+SYNONYMY_BIS = 777
+
+# Relations linking random lexical units with their share of those edges.
+# Derivational relations are missing from the impedance table, so they are
+# only followed from start nodes
+RELATIONS = [
+    (12, 0.10),  # antonymy
+    (13, 0.20),  # converse
+    (14, 0.05),  # meronymy
+    (15, 0.05),  # holonymy
+    (53, 0.15),  # feminity
+    (54, 0.05),
+    (55, 0.15),  # young being
+    (56, 0.05),
+    (57, 0.20),  # augmentativity
+]
+
+# Relations added in both directions, as the inverse relation or itself
+INVERSE_RELATIONS = {10: 11, 11: 10, 12: 12, 13: 13, 14: 15, 15: 14}
+
+
+class SyntheticLexicalUnit(object):
+    """ Stands for a plWordNet lexical unit: lemma and lu_id """
+
+    def __init__(self, lu_id, lemma):
+        self.lu_id = lu_id
+        self.lemma = lemma
+
+
+class SyntheticSynset(object):
+    """ Stands for a plWordNet synset: synset_id and its lexical units """
+
+    def __init__(self, synset_id, lu_set):
+        self.synset_id = synset_id
+        self.lu_set = lu_set
+
+
+def _relation_picker(rnd):
+    rel_ids = [rel_id for rel_id, _ in RELATIONS]
+    bounds = []
+    total = 0.0
+    for _, share in RELATIONS:
+        total += share
+        bounds.append(total)
+
+    def pick():
+        x = rnd.random() * total
+        for rel_id, bound in zip(rel_ids, bounds):
+            if x < bound:
+                return rel_id
+        return rel_ids[-1]
+
+    return pick
+
+
+def build_graphs(num_lus, degree=3, lus_per_synset=2.5, lemmas_per_lu=0.8, hypernym_share=0.9, seed=0):
+    """
+    Builds a lexical unit graph of num_lus vertices with about degree
+    outgoing edges per vertex, and the synsets graph over the same lexical
+    units. Returns (graph, syn_graph), both with their lemma indexes
+    generated.
+
+    Synsets make a hypernymy forest, a hypernym_share of them having a
+    hypernym among the synsets before them. Hypernymy and hyponymy link the
+    first lexical units of synsets. Lexical units of a synset are linked
+    with each other both ways by synonymy (888, every third pair 777), so
+    as in plWordNet synsets of three or more lexical units make synonymy
+    cycles. The rest of degree are RELATIONS between random lexical units.
+    Lemmas are shared by several lexical units, about lemmas_per_lu distinct
+    lemmas per lexical unit.
+    """
+    rnd = random.Random(seed)
+    pick_relation = _relation_picker(rnd)
+    num_synsets = max(1, int(num_lus / lus_per_synset))
+    num_lemmas = max(1, int(num_lus * lemmas_per_lu))
+
+    graph = BaseGraph()
+    graph.init_graph(drctd=True)
+    graph.create_node_attribute('lu', 'object')
+    graph.create_node_attribute('synset_id', 'int')
+    graph.create_edge_attribute('rel_id', 'int')
+
+    members = defaultdict(list)
+    for i in range(num_lus):
+        lu = SyntheticLexicalUnit(i, 'lemma{}'.format(rnd.randrange(num_lemmas)))
+        # every synset gets a lexical unit before any gets a second one
+        synset_id = i if i < num_synsets else rnd.randrange(num_synsets)
+        graph.add_node(i, [('lu', lu), ('synset_id', synset_id)])
+        members[synset_id].append((i, lu))
+
+    def link(source, target, rel_id):
+        graph.add_edge(graph.get_node(source), graph.get_node(target), [('rel_id', rel_id)])
+
+    num_edges = 0
+    synset_edges = []
+    for synset_id in range(num_synsets):
+        head = members[synset_id][0][0]
+        if synset_id and rnd.random() < hypernym_share:
+            hypernym_id = rnd.randrange(synset_id)
+            link(head, members[hypernym_id][0][0], HYPERNYMY)
+            link(members[hypernym_id][0][0], head, HYPONYMY)
+            synset_edges.append((synset_id, hypernym_id))
+            num_edges += 2
+        lus = [i for i, _ in members[synset_id]]
+        for n, (i, j) in enumerate((i, j) for k, i in enumerate(lus) for j in lus[k + 1:]):
+            rel_id = SYNONYMY_BIS if n % 3 == 2 else SYNONYMY
+            link(i, j, rel_id)
+            link(j, i, rel_id)
+            num_edges += 2
+
+    while num_edges < degree * num_lus:
+        source, target = rnd.randrange(num_lus), rnd.randrange(num_lus)
+        if source == target:
+            continue
+        rel_id = pick_relation()
+        link(source, target, rel_id)
+        num_edges += 1
+        if rel_id in INVERSE_RELATIONS:
+            link(target, source, INVERSE_RELATIONS[rel_id])
+            num_edges += 1
+    graph.generate_lemma_to_nodes_dict_lexical_units()
+
+    syn_graph = BaseGraph()
+    syn_graph.init_graph(drctd=True)
+    syn_graph.create_node_attribute('synset', 'object')
+    for synset_id in range(num_synsets):
+        lu_set = [lu for _, lu in members[synset_id]]
+        syn_graph.add_node(synset_id, [('synset', SyntheticSynset(synset_id, lu_set))])
+    for source, target in synset_edges:
+        syn_graph.add_edge(syn_graph.get_node(source), syn_graph.get_node(target))
+    syn_graph.generate_lemma_to_nodes_dict_synsets()
+
+    return graph, syn_graph
+
+
+def make_knowledge_source(graph, num_sources, targets_per_source=10, seed=0, shared_targets=None):
+    """
+    Knowledge source of num_sources new lemmas, each supported by
+    targets_per_source lemmas of the graph with supports in [0.3, 1).
+    Given shared_targets, targets are drawn from that many lemmas only, so
+    sources share them as similar words of a real knowledge source do.
+    """
+    rnd = random.Random(seed)
+    lemmas = sorted(set(graph.node_lemmas(node)[0].lower() for node in graph.all_nodes()))
+    if shared_targets:
+        lemmas = rnd.sample(lemmas, shared_targets)
+    return dict(
+        ('source{}'.format(i), [(rnd.choice(lemmas), rnd.uniform(0.3, 1.0)) for _ in range(targets_per_source)])
+        for i in range(num_sources)
+    )
@@ -1,18 +1,47 @@
 import sys
-import pandas as pd
 
 
+class FrequencyCounter(object):
+    """
+    Streaming version of the former pandas aggregation of lemma,min_dist
+    rows: rows with distance -1 are skipped, every term keeps its smallest
+    distance and terms are counted per distance.
+    """
+
+    def __init__(self):
+        self._distances = {}
+
+    def add(self, term, distance):
+        if distance == -1:
+            return
+        if term not in self._distances or distance < self._distances[term]:
+            self._distances[term] = distance
+
+    def add_lines(self, lines):
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            term, distance = line.rsplit(',', 1)
+            self.add(term, int(float(distance)))
+
+    def frequencies(self):
+        """ (distance, number of terms) pairs sorted by distance """
+        counts = {}
+        for distance in self._distances.values():
+            counts[distance] = counts.get(distance, 0) + 1
+        return sorted(counts.items())
+
+    def write(self, f):
+        for distance, count in self.frequencies():
+            f.write("{},{}\n".format(distance, count))
+
 
 def main():
-    df = pd.read_csv(sys.argv[1], names=['term', 'distance'])
-    df = df[df['distance'] != -1]
-    df = df.groupby('term').min()
-    #df = df.distance.apply(lambda x: round(x, 0))
-
-    df = df.distance
-    df = df.value_counts()
-    df = df.sort_index()
-    print df
+    counter = FrequencyCounter()
+    with open(sys.argv[1]) as f:
+        counter.add_lines(f)
+    counter.write(sys.stdout)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,121 @@
+import argparse
+import csv
+
+from paintball.constants import PAINT_BALL_GRAPH, IMPEDANCE_TABLE, SYNSETS_GRAPH, SYNSET_SIZES
+from paintball.distances import DistanceEvaluator
+from paintball.main import make_params
+from paintball.paint_ball import PaintBall, Params, VECTORIZED
+from paintball.sweep import ParamSweep
+from paintball.utils import load_graph as load_lu_graph
+from paintball.utils import load_impedance_table, load_knowledge_source, load_synset_sizes
+
+from .count_frequencies import FrequencyCounter
+from .evaluation import MAX_DIST, evaluate_lemma, load_graph
+
+PARAM_COLUMNS = ['mikro', 'tau_0', 'epsilon', 'tau_3', 'tau_4']
+
+
+def make_grid(mikro, tau_0, epsilon, tau_3, tau_4):
+    """ Params of every combination of the given values """
+    return [
+        Params(mikro=m, tau_0=t0, epsilon=e, tau_3=t3, tau_4=t4)
+        for m in mikro for t0 in tau_0 for e in epsilon for t3 in tau_3 for t4 in tau_4
+    ]
+
+
+def loosest_params(grid):
+    """ Params spreading to every state reached with any Params of the grid """
+    return Params(
+        mikro=max(params.mikro for params in grid),
+        tau_0=min(params.tau_0 for params in grid),
+        epsilon=min(params.epsilon for params in grid),
+        tau_3=min(params.tau_3 for params in grid),
+        tau_4=min(params.tau_4 for params in grid)
+    )
+
+
+def sweep(paint_ball, grid, syn_graph):
+    """
+    Attaches all sources of the knowledge source of paint_ball with every
+    Params of the grid and evaluates the lead synsets as evaluation does,
+    sources standing for their lemmas of syn_graph. Returns a
+    FrequencyCounter of minimal distances and the number of lead synsets of
+    every setting.
+    """
+    evaluator = DistanceEvaluator(syn_graph, max_dist=MAX_DIST)
+    counters = [FrequencyCounter() for _ in grid]
+    leads = [0] * len(grid)
+
+    for source, lead_nodes_of in ParamSweep(paint_ball, grid).run(paint_ball.knowledge_source.items(), syn_graph):
+        for i, lead_nodes in enumerate(lead_nodes_of):
+            leads[i] += len(lead_nodes)
+            targets_synset_ids = [syn_graph.node_synset_id(node) for node in lead_nodes]
+            for min_dist in evaluate_lemma(syn_graph, evaluator, source, targets_synset_ids):
+                counters[i].add(source, min_dist)
+
+    return counters, leads
+
+
+def table_rows(grid, counters, leads):
+    """ A row of params, lead synsets, evaluated lemmas, lemmas at each distance and the mean distance per setting """
+    rows = [PARAM_COLUMNS + ['leads', 'lemmas'] + ['dist_{}'.format(d) for d in range(MAX_DIST + 1)] + ['mean']]
+    for params, counter, num_leads in zip(grid, counters, leads):
+        frequencies = dict(counter.frequencies())
+        lemmas = sum(frequencies.values())
+        mean = sum(d * count for d, count in frequencies.items()) / float(lemmas) if lemmas else None
+        rows.append(
+            [getattr(params, name) for name in PARAM_COLUMNS] +
+            [num_leads, lemmas] +
+            [frequencies.get(d, 0) for d in range(MAX_DIST + 1)] +
+            ['{:.3f}'.format(mean) if mean is not None else '-']
+        )
+    return rows
+
+
+def format_table(rows):
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        " ".join(str(value).rjust(width) for value, width in zip(row, widths))
+        for row in rows
+    )
+
+
+def parse_args():
+    defaults = make_params()
+    parser = argparse.ArgumentParser(
+        description='Attaches a knowledge source with a grid of params, spreading every source once, '
+                    'and evaluates distances of the results of each setting')
+    parser.add_argument('knowledge_source', nargs='+', help='files with source;target;support lines')
+    parser.add_argument('--mikro', type=float, nargs='+', default=[defaults.mikro])
+    parser.add_argument('--tau-0', type=float, nargs='+', default=[defaults.tau_0])
+    parser.add_argument('--epsilon', type=float, nargs='+', default=[defaults.epsilon])
+    parser.add_argument('--tau-3', type=float, nargs='+', default=[defaults.tau_3])
+    parser.add_argument('--tau-4', type=float, nargs='+', default=[defaults.tau_4])
+    parser.add_argument('--output', help='CSV file for the table')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    grid = make_grid(args.mikro, args.tau_0, args.epsilon, args.tau_3, args.tau_4)
+
+    syn_graph = load_graph(SYNSETS_GRAPH)
+    paint_ball = PaintBall(
+        graph=load_lu_graph(PAINT_BALL_GRAPH),
+        params=loosest_params(grid),
+        impedance_table=load_impedance_table(IMPEDANCE_TABLE),
+        knowledge_source=load_knowledge_source(args.knowledge_source),
+        plwn=None,
+        engine=VECTORIZED,
+        synset_sizes=load_synset_sizes(SYNSET_SIZES, syn_graph)
+    )
+
+    rows = table_rows(grid, *sweep(paint_ball, grid, syn_graph))
+    print(format_table(rows))
+    if args.output:
+        with open(args.output, 'w') as f:
+            csv.writer(f).writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
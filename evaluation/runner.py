@@ -0,0 +1,161 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+from paintball.distances import DistanceEvaluator
+from paintball.parallel import make_shards
+
+from .count_frequencies import FrequencyCounter
+from .evaluation import MAX_DIST, SYNSETS_GRAPH, evaluate_lemma, load_graph, results_to_dict
+
+LAYOUT_FILE = 'layout.json'
+DISTANCES_FILE = 'distances.csv'
+FREQUENCIES_FILE = 'frequencies.csv'
+
+# Set in the parent right before the pool is created, so forked workers
+# inherit the loaded graph instead of receiving pickled copies.
+_worker_state = {}
+
+
+def _shard_paths(output_dir, index):
+    prefix = os.path.join(output_dir, 'shard-{:05d}'.format(index))
+    return prefix + '.csv', prefix + '.progress'
+
+
+def _read_progress(path):
+    """
+    Returns (number of completed lemmas, size of their rows in the shard
+    file) recorded in a progress file.
+    """
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path) as f:
+        done, offset = [int(x) for x in f.read().split()]
+    return done, offset
+
+
+def _write_progress(path, done, offset):
+    """ Replaces the progress file atomically, it is never seen half written """
+    with open(path + '.tmp', 'w') as f:
+        f.write("{} {}\n".format(done, offset))
+    os.rename(path + '.tmp', path)
+
+
+def _evaluate_shard(task):
+    """
+    Evaluates lemmas of a shard not completed by a previous run. Rows of
+    every lemma are flushed before the lemma is recorded as completed, rows
+    of a lemma interrupted halfway are cut off when resuming.
+    """
+    index, shard = task
+    graph = _worker_state['graph']
+    evaluator = _worker_state['evaluator']
+    csv_path, progress_path = _shard_paths(_worker_state['output_dir'], index)
+
+    done, offset = _read_progress(progress_path)
+    if done == len(shard):
+        return index
+
+    with open(csv_path, 'a') as out:
+        out.truncate(offset)
+        for position in range(done, len(shard)):
+            source_lemma, targets_synset_ids = shard[position]
+            for min_dist in evaluate_lemma(graph, evaluator, source_lemma, targets_synset_ids):
+                out.write("{},{}\n".format(source_lemma, min_dist))
+            out.flush()
+            _write_progress(progress_path, position + 1, os.fstat(out.fileno()).st_size)
+
+    return index
+
+
+def _check_layout(output_dir, results_path, num_lemmas, shard_size):
+    """
+    Shards are only valid for the same results and shard size, refuses to
+    resume a run started with different ones.
+    """
+    layout = {
+        'results': os.path.abspath(results_path),
+        'lemmas': num_lemmas,
+        'shard_size': shard_size,
+    }
+    path = os.path.join(output_dir, LAYOUT_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+        if previous != layout:
+            raise ValueError('{} holds a run with different settings: {}'.format(output_dir, previous))
+        return
+
+    with open(path, 'w') as f:
+        json.dump(layout, f)
+
+
+def evaluate(graph, results_path, output_dir, processes=None, shard_size=256):
+    """
+    Evaluates a result file in a pool of worker processes. Lemmas are sorted
+    and split into shards, each written to its own file in output_dir
+    together with a progress file, so an interrupted run started again with
+    the same arguments continues from the last completed lemma.
+
+    Frequencies of minimal distances are counted while shards complete.
+    Finally shards are merged into distances.csv and frequencies are
+    written to frequencies.csv. Returns the FrequencyCounter.
+    """
+    items = sorted(results_to_dict(results_path).items())
+    shards = list(make_shards(items, shard_size))
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    _check_layout(output_dir, results_path, len(items), shard_size)
+
+    _worker_state['graph'] = graph
+    _worker_state['evaluator'] = DistanceEvaluator(graph, max_dist=MAX_DIST)
+    _worker_state['output_dir'] = output_dir
+    pool = multiprocessing.Pool(processes)
+
+    counter = FrequencyCounter()
+    try:
+        for index in pool.imap_unordered(_evaluate_shard, enumerate(shards)):
+            with open(_shard_paths(output_dir, index)[0]) as f:
+                counter.add_lines(f)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        _worker_state.clear()
+
+    with open(os.path.join(output_dir, DISTANCES_FILE), 'w') as out:
+        for index in range(len(shards)):
+            with open(_shard_paths(output_dir, index)[0]) as f:
+                for line in f:
+                    out.write(line)
+
+    with open(os.path.join(output_dir, FREQUENCIES_FILE), 'w') as out:
+        counter.write(out)
+
+    return counter
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Evaluates paint ball results in parallel')
+    parser.add_argument('results', help='paint ball results file')
+    parser.add_argument('output_dir', help='directory for shard files and the merged results')
+    parser.add_argument('--graph', default=SYNSETS_GRAPH, help='synsets graph')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='number of worker processes, all cores by default')
+    parser.add_argument('--shard-size', type=int, default=256,
+                        help='number of lemmas per shard')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    graph = load_graph(args.graph)
+    counter = evaluate(graph, args.results, args.output_dir, args.processes, args.shard_size)
+    counter.write(sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
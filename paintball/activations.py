@@ -0,0 +1,131 @@
+import heapq
+
+import numpy as np
+
+
+class SparseActivations(object):
+    """
+    Activation accumulated per id in a dict, for runs reaching few ids or
+    ids without a small bound, such as synset ids. Activation added is
+    positive.
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return repr(self._values)
+
+    @classmethod
+    def from_arrays(cls, ids, values):
+        """ Activations of distinct ids """
+        Q = cls()
+        Q._values = dict(zip(np.asarray(ids).tolist(), np.asarray(values).tolist()))
+        return Q
+
+    def __contains__(self, i):
+        return i in self._values
+
+    def get(self, i, default=0.0):
+        return self._values.get(i, default)
+
+    def add(self, i, value):
+        self._values[i] = self._values.get(i, 0.0) + value
+
+    def add_many(self, ids, values):
+        for i, value in zip(ids, values):
+            self.add(i, value)
+
+    def reset(self):
+        self._values.clear()
+
+    def ids(self):
+        return list(self._values.keys())
+
+    def items(self):
+        return self._values.items()
+
+    def arrays(self):
+        """ (ids, activations) arrays """
+        return (np.fromiter(self._values.keys(), np.int64, len(self._values)),
+                np.fromiter(self._values.values(), np.float64, len(self._values)))
+
+    def top_k(self, k):
+        """ (id, activation) pairs of the k most activated ids, the most activated first """
+        return [(i, value) for value, i in heapq.nlargest(k, ((value, i) for i, value in self._values.items()))]
+
+
+class DenseActivations(object):
+    """
+    Activation accumulated per vertex in a float array of the size of the
+    graph, together with the list of vertices touched so far. Only touched
+    entries are cleared by reset, so the array is allocated once and reused
+    by every source. Activation added is positive, a zero entry is an
+    untouched one.
+    """
+
+    def __init__(self, size):
+        self.values = np.zeros(size)
+        self._touched = []
+        self._touched_arrays = []
+
+    def __len__(self):
+        return len(self._touched) + sum(len(vertices) for vertices in self._touched_arrays)
+
+    def __contains__(self, vertex):
+        return self.values[vertex] != 0
+
+    def get(self, vertex, default=0.0):
+        value = self.values[vertex]
+        return float(value) if value else default
+
+    def add(self, vertex, value):
+        values = self.values
+        if not values[vertex]:
+            self._touched.append(vertex)
+        values[vertex] += value
+
+    def add_many(self, vertices, values):
+        vertices = np.asarray(vertices, dtype=np.int64)
+        untouched = vertices[self.values[vertices] == 0]
+        if len(untouched):
+            self._touched_arrays.append(np.unique(untouched))
+        np.add.at(self.values, vertices, values)
+
+    def resize(self, size):
+        """ Makes room for vertices added to the graph, activation accumulated so far is kept """
+        if size > len(self.values):
+            self.values = np.concatenate([self.values, np.zeros(size - len(self.values))])
+
+    def reset(self):
+        self.values[self.ids()] = 0.0
+        self._touched = []
+        self._touched_arrays = []
+
+    def ids(self):
+        """ Touched vertices as an array """
+        if not self._touched_arrays:
+            return np.array(self._touched, dtype=np.int64)
+        return np.concatenate([np.array(self._touched, dtype=np.int64)] + self._touched_arrays)
+
+    def items(self):
+        vertices = self.ids()
+        return list(zip(vertices.tolist(), self.values[vertices].tolist()))
+
+    def arrays(self):
+        """ (vertices, activations) arrays of touched vertices """
+        vertices = self.ids()
+        return vertices, self.values[vertices]
+
+    def top_k(self, k):
+        """ (vertex, activation) pairs of the k most activated vertices, the most activated first """
+        vertices = self.ids()
+        values = self.values[vertices]
+        if k < len(vertices):
+            top = np.argpartition(-values, k)[:k]
+            vertices, values = vertices[top], values[top]
+        order = np.argsort(-values, kind='mergesort')
+        return list(zip(vertices[order].tolist(), values[order].tolist()))
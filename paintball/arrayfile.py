@@ -0,0 +1,135 @@
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b'PBARR001'
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_arrays(path, arrays, meta=None):
+    """
+    Writes named arrays into a single file which can be memory-mapped.
+
+    Layout: 8 bytes of magic, little-endian uint64 length of a JSON header,
+    the header itself and the arrays, each starting at a 64-byte aligned
+    offset. The header maps array names to their dtype, shape and offset and
+    carries an arbitrary JSON-serializable meta value.
+    """
+    arrays = dict((name, np.ascontiguousarray(array)) for name, array in arrays.items())
+
+    # offsets are relative to the end of the header, which is aligned as well
+    descriptions = {}
+    offset = 0
+    for name in sorted(arrays):
+        array = arrays[name]
+        descriptions[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+        }
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({'arrays': descriptions, 'meta': meta}).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name in sorted(arrays):
+            f.seek(data_start + descriptions[name]['offset'])
+            f.write(arrays[name].tobytes())
+        f.truncate(data_start + offset)
+
+
+def read_arrays(path, mmap=True):
+    """
+    Returns a dict of arrays and the meta value. With mmap the arrays are
+    read-only views of the file mapped into memory, so processes loading the
+    same file share its pages.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not an array file'.format(path))
+        header_length, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    data_start = _aligned(len(MAGIC) + 8 + header_length)
+    if mmap:
+        buf = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        buf = np.fromfile(path, dtype=np.uint8)
+
+    arrays = {}
+    for name, description in header['arrays'].items():
+        dtype = np.dtype(str(description['dtype']))
+        shape = tuple(description['shape'])
+        start = data_start + description['offset']
+        count = int(np.prod(shape))
+        arrays[name] = buf[start:start + count * dtype.itemsize].view(dtype).reshape(shape)
+
+    return arrays, header['meta']
+
+
+def _encode(text):
+    if isinstance(text, bytes):
+        return text
+    return text.encode('utf-8')
+
+
+def pack_strings(strings):
+    """ Concatenates UTF-8 encoded strings, returns (data, offsets) arrays """
+    encoded = [_encode(s) for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return data, offsets
+
+
+class StringTable(object):
+    """
+    Read-only sequence of strings stored as packed UTF-8 data and offsets.
+    Tables built from byte-sorted strings support binary search with find.
+    """
+
+    __slots__ = ['data', 'offsets']
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        return cls(*pack_strings(strings))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _bytes(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i):
+        return self._bytes(i).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def find(self, text):
+        """ Position of text in a sorted table or -1 """
+        key = _encode(text)
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._bytes(lo) == key:
+            return lo
+        return -1
@@ -0,0 +1,161 @@
+import numpy as np
+import scipy.sparse as sp
+
+from paths import group_paths
+
+
+class BatchSpreader(object):
+    """
+    Spreads activation of many start vertices together, level by level over
+    the CSR arrays of the graph.
+
+    A level is a dense block with a row per state and a column per start
+    vertex, counting the paths of the state that left the start vertex. A
+    state is a vertex, the relation of the edge activation arrived through
+    and the factor, decay * transmittance * impedance multiplied along the
+    path, by which the path scales activation of its start vertex, as in
+    sparse_operator.SpreadingOperator. Out-edges of a state are gathered
+    once and serve all columns of the block.
+
+    Start nodes of the same vertex, e.g. a target lemma shared by many
+    sources, share a column, spread with the loosest cutoff: epsilon over
+    the largest of their activations. Factors never grow along a path when
+    decay, transmittance and impedance are at most one, so a path reaches a
+    state for a start node iff the factor of the state keeps its activation
+    above epsilon; levels are read out per start node with that cutoff, as
+    sweep.SpreadingRecord.replay does with a stricter setting, and each
+    start node gets exactly what it gets alone in the other engines. With
+    larger factors every start node keeps a column of its own.
+    """
+
+    def __init__(self, csr, rel_positions, impedance, decay, width=16):
+        self._csr = csr
+        self._rel_positions = np.asarray(rel_positions, dtype=np.int64)
+        self._impedance = impedance
+        self._num_rels = impedance.shape[0]
+        self._start_rel = impedance.shape[0] - 1
+        self._shared_columns = decay <= 1 and impedance.max() <= 1 and not (csr.weights > 1).any()
+        self.decay = decay
+        self.width = width
+
+    def spread(self, vertices, activations, epsilon, stats=None):
+        """
+        Spreads activation from start vertices. Returns a sparse
+        (num_vertices, len(vertices)) matrix of activation accumulated by
+        vertices, a column per start vertex.
+
+        Given a stats dict, fills 'relaxations' with the number of
+        transmissions tried per start vertex and 'levels' with the number
+        of states expanded per start vertex, a row per step, as
+        sparse_operator.SpreadingOperator.spread does.
+        """
+        vertices = np.asarray(vertices, dtype=np.int64)
+        activations = np.asarray(activations, dtype=np.float64)
+        if stats is not None:
+            stats['relaxations'] = np.zeros(len(vertices), dtype=np.int64)
+            stats['levels'] = []
+
+        starts = np.flatnonzero(activations >= epsilon)
+        if self._shared_columns:
+            column_vertices, columns = np.unique(vertices[starts], return_inverse=True)
+        else:
+            starts = starts[np.argsort(vertices[starts], kind='mergesort')]
+            column_vertices, columns = vertices[starts], np.arange(len(starts))
+        columns = columns.ravel()
+        column_activations = np.zeros(len(column_vertices))
+        np.maximum.at(column_activations, columns, activations[starts])
+
+        # start nodes grouped by column, the loosest cutoff first
+        order = np.lexsort((-activations[starts], columns))
+        starts = starts[order]
+        offsets = np.searchsorted(columns[order], np.arange(len(column_vertices) + 1))
+
+        reached = ([], [], [])
+        for begin in range(0, len(column_vertices), self.width):
+            end = min(begin + self.width, len(column_vertices))
+            block_starts = starts[offsets[begin]:offsets[end]]
+            readout = (block_starts, epsilon / activations[block_starts], offsets[begin:end + 1] - offsets[begin])
+            self._spread_block(column_vertices[begin:end], epsilon / column_activations[begin:end],
+                               readout, activations, reached, stats)
+
+        rows, columns, values = [np.concatenate(part) if part else np.zeros(0) for part in reached]
+        return sp.csr_matrix(
+            (values, (rows.astype(np.int64), columns.astype(np.int64))),
+            shape=(self._csr.num_vertices, len(vertices))
+        )
+
+    def _spread_block(self, vertices, cutoffs, readout, activations, reached, stats):
+        """
+        Spreads a block of columns from their vertices with their cutoffs,
+        the smallest factor a path of each column may have, reading every
+        level out for start nodes of the block, see _read_level.
+        """
+        csr = self._csr
+        width = len(vertices)
+        loosest = cutoffs.min()
+
+        state_vertices, rows = np.unique(vertices, return_inverse=True)
+        state_rels = np.full(len(state_vertices), self._start_rel, dtype=np.int64)
+        factors = np.ones(len(state_vertices))
+        X = np.zeros((len(state_vertices), width))
+        X[rows.ravel(), np.arange(width)] = 1.0
+
+        depth = 0
+        while True:
+            self._read_level(X, state_vertices, factors, readout, activations, depth, reached, stats)
+
+            edges, owners = csr.out_edges(state_vertices)
+            next_factors = self._impedance[state_rels[owners], self._rel_positions[edges]] * \
+                (csr.weights[edges] * (self.decay * factors[owners]))
+            # edges no column of the block may follow are dropped before X is gathered
+            kept = next_factors >= loosest
+            edges, owners, next_factors = edges[kept], owners[kept], next_factors[kept]
+            transmitted = np.where(next_factors[:, None] >= cutoffs, X[owners], 0.0)
+
+            kept = transmitted.any(axis=1)
+            if not kept.any():
+                return
+            edges = edges[kept]
+            transmitted = transmitted[kept]
+
+            # merges paths into the states they reach, in edge order
+            keys, factors, merged = group_paths(
+                csr.targets[edges] * self._num_rels + self._rel_positions[edges], next_factors[kept])
+            order = np.argsort(merged, kind='mergesort')
+            firsts = np.flatnonzero(np.diff(np.concatenate([[-1], merged[order]])))
+            X = np.add.reduceat(transmitted[order], firsts, axis=0)
+            state_vertices = keys // self._num_rels
+            state_rels = keys % self._num_rels
+            depth += 1
+
+    def _read_level(self, X, state_vertices, factors, readout, activations, depth, reached, stats):
+        """
+        Reads paths of a level out for the start nodes of their columns,
+        given as (start nodes, their cutoffs, offsets of the start nodes of
+        every column). A start node gets the states whose factor is at
+        least its cutoff. Appends (vertex, start node, activation) of the
+        states past the start to the reached lists and counts the states
+        and their out-edges in stats.
+        """
+        starts, start_cutoffs, offsets = readout
+        rows, columns = np.nonzero(X)
+        sizes = offsets[columns + 1] - offsets[columns]
+        entries = np.repeat(np.arange(len(rows)), sizes)
+        positions = np.repeat(offsets[columns] - (np.cumsum(sizes) - sizes), sizes) + np.arange(len(entries))
+        rows, columns = rows[entries], columns[entries]
+        kept = factors[rows] >= start_cutoffs[positions]
+        rows, columns, positions = rows[kept], columns[kept], positions[kept]
+        start_nodes = starts[positions]
+
+        if stats is not None:
+            degrees = self._csr.out_degrees(state_vertices)
+            stats['relaxations'] += np.bincount(
+                start_nodes, weights=degrees[rows], minlength=len(activations)).astype(np.int64)
+            while len(stats['levels']) <= depth:
+                stats['levels'].append(np.zeros(len(activations), dtype=np.int64))
+            stats['levels'][depth] += np.bincount(start_nodes, minlength=len(activations))
+
+        if depth:
+            reached[0].append(state_vertices[rows])
+            reached[1].append(start_nodes)
+            reached[2].append(activations[start_nodes] * factors[rows] * X[rows, columns])
@@ -0,0 +1,67 @@
+EXHAUSTED = 'exhausted'
+RELAXATIONS = 'relaxations'
+TIME = 'time'
+TOP_K = 'top_k'
+
+
+class SpreadingBudget(object):
+    """
+    Limits of the best-first spreading of a single source, limits left as
+    None are not checked.
+
+    max_relaxations - number of edges relaxed
+
+    max_seconds - wall time of the spreading
+
+    top_k - stop once the top_k most activated synsets above tau_3 stay the
+    same for patience checks in a row, made every check_every expansions
+    """
+
+    __slots__ = ['max_relaxations', 'max_seconds', 'top_k', 'patience', 'check_every']
+
+    def __init__(self, max_relaxations=None, max_seconds=None, top_k=None, patience=3, check_every=64):
+        self.max_relaxations = max_relaxations
+        self.max_seconds = max_seconds
+        self.top_k = top_k
+        self.patience = patience
+        self.check_every = check_every
+
+    def __str__(self):
+        return "\tMax relaxations - {}\n" \
+               "\tMax seconds - {}\n" \
+               "\tTop k - {}\n" \
+            .format(
+                self.max_relaxations,
+                self.max_seconds,
+                self.top_k,
+            )
+
+
+class SpreadingReport(object):
+    """
+    Outcome of a budgeted spreading: work done, the limit which stopped it
+    (EXHAUSTED if nothing was left to expand) and the activation still
+    pending in states that were never expanded.
+    """
+
+    __slots__ = ['expansions', 'relaxations', 'seconds', 'stopped_by', 'unexpanded_mass', 'unexpanded_states']
+
+    def __init__(self, expansions, relaxations, seconds, stopped_by, unexpanded_mass, unexpanded_states):
+        self.expansions = expansions
+        self.relaxations = relaxations
+        self.seconds = seconds
+        self.stopped_by = stopped_by
+        self.unexpanded_mass = unexpanded_mass
+        self.unexpanded_states = unexpanded_states
+
+    def __str__(self):
+        return "Stopped by {} after {} expansions, {} relaxations, {:.4f}s; " \
+               "unexpanded mass {:.4f} in {} states" \
+            .format(
+                self.stopped_by,
+                self.expansions,
+                self.relaxations,
+                self.seconds,
+                self.unexpanded_mass,
+                self.unexpanded_states,
+            )
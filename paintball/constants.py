@@ -11,3 +11,9 @@ PAINT_BALL_GRAPH = os.getenv('PAINT_BALL_GRAPH_PATH')
 SYNSETS_GRAPH = os.getenv('SYNSET_GRAPH_PATH')
 
 IMPEDANCE_TABLE = os.getenv('IMPEDANCE_TABLE_PATH')
+
+# Synset sizes, built from the synsets graph if the file does not exist yet
+SYNSET_SIZES = os.getenv('SYNSET_SIZES_PATH')
+
+# Optional JSONL file receiving spreading traces of every source
+TRACE_PATH = os.getenv('PAINT_BALL_TRACE_PATH')
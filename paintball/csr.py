@@ -0,0 +1,115 @@
+import numpy as np
+
+
+class CSRGraph(object):
+    """
+    Read-only compressed sparse row view of a BaseGraph.
+
+    Out-edges of vertex v are stored at positions offsets[v]:offsets[v + 1]
+    of the targets, rel_ids and weights arrays. Self-loops are skipped, since
+    spreading never follows them. Edges of an undirected graph are stored in
+    both directions.
+    """
+
+    __slots__ = ['offsets', 'targets', 'rel_ids', 'weights']
+
+    def __init__(self, offsets, targets, rel_ids, weights):
+        self.offsets = self._frozen(offsets, np.int64)
+        self.targets = self._frozen(targets, np.int64)
+        self.rel_ids = self._frozen(rel_ids, np.int64)
+        self.weights = self._frozen(weights, np.float64)
+
+    @staticmethod
+    def _frozen(array, dtype):
+        array = np.asarray(array, dtype=dtype)
+        array.flags.writeable = False
+        return array
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Builds the view from a BaseGraph. Edges without 'rel_id' get -1
+        and edges without 'weight' get 1.0.
+        """
+        g = graph.use_graph_tool()
+        num_vertices = g.num_vertices(ignore_filter=True)
+
+        edges = g.get_edges([g.edge_index])
+        sources = edges[:, 0].astype(np.int64)
+        targets = edges[:, 1].astype(np.int64)
+        edge_index = edges[:, 2].astype(np.int64)
+
+        if graph.has_edge_attribute('rel_id'):
+            rel_ids = np.asarray(g.edge_properties['rel_id'].a)[edge_index]
+        else:
+            rel_ids = np.full(len(edge_index), -1, dtype=np.int64)
+
+        if graph.has_edge_attribute('weight'):
+            weights = np.asarray(g.edge_properties['weight'].a)[edge_index]
+        else:
+            weights = np.ones(len(edge_index), dtype=np.float64)
+
+        if not g.is_directed():
+            sources, targets = (np.concatenate([sources, targets]),
+                                np.concatenate([targets, sources]))
+            rel_ids = np.concatenate([rel_ids, rel_ids])
+            weights = np.concatenate([weights, weights])
+
+        return cls.from_edges(num_vertices, sources, targets, rel_ids, weights)
+
+    @classmethod
+    def from_edges(cls, num_vertices, sources, targets, rel_ids, weights):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        loops = sources == targets
+        order = np.argsort(sources[~loops], kind='mergesort')
+        sources = sources[~loops][order]
+
+        offsets = np.zeros(num_vertices + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_vertices), out=offsets[1:])
+
+        return cls(
+            offsets=offsets,
+            targets=targets[~loops][order],
+            rel_ids=np.asarray(rel_ids)[~loops][order],
+            weights=np.asarray(weights)[~loops][order],
+        )
+
+    @property
+    def num_vertices(self):
+        return len(self.offsets) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    def out_degrees(self, vertices):
+        return self.offsets[vertices + 1] - self.offsets[vertices]
+
+    def out_edges(self, vertices):
+        """
+        Gathers out-edges of many vertices at once.
+
+        Returns the edge positions and, for each of them, the position of its
+        source vertex in the given vertices array.
+        """
+        vertices = np.asarray(vertices, dtype=np.int64)
+        starts = self.offsets[vertices]
+        counts = self.offsets[vertices + 1] - starts
+
+        owners = np.repeat(np.arange(len(vertices)), counts)
+        first = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        edges = first + np.arange(counts.sum())
+        return edges, owners
+
+    def undirected(self):
+        """ View of the same graph with every edge stored in both directions """
+        sources = np.repeat(np.arange(self.num_vertices), np.diff(self.offsets))
+        return CSRGraph.from_edges(
+            self.num_vertices,
+            np.concatenate([sources, self.targets]),
+            np.concatenate([self.targets, sources]),
+            np.concatenate([self.rel_ids, self.rel_ids]),
+            np.concatenate([self.weights, self.weights]),
+        )
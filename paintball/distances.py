@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class DistanceEvaluator(object):
+    """
+    Bounded breadth-first distances over a BaseGraph, edges taken as
+    undirected. Works on the CSR view of the graph, visited vertices are
+    marked with a per-search stamp so the marks are never cleared.
+    """
+
+    def __init__(self, graph, max_dist=6):
+        csr = graph.csr()
+        if graph.is_directed():
+            csr = csr.undirected()
+        self._csr = csr
+        self.max_dist = max_dist
+
+        self._seen = np.zeros(csr.num_vertices, dtype=np.int64)
+        self._stamp = 0
+
+    def distances_to_nearest(self, sources, targets):
+        """
+        Distance from each of sources to the closest of targets, -1 when all
+        targets are farther than max_dist or unreachable.
+
+        A single search is started from all targets at once and serves all
+        sources, it stops as soon as every source is reached.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        frontier = np.unique(np.asarray(targets, dtype=np.int64))
+        distances = np.full(len(sources), -1, dtype=np.int64)
+        if not len(sources) or not len(frontier):
+            return distances
+
+        self._stamp += 1
+        self._seen[frontier] = self._stamp
+
+        for distance in range(self.max_dist + 1):
+            reached = (distances == -1) & np.isin(sources, frontier)
+            distances[reached] = distance
+            if distance == self.max_dist or (distances != -1).all():
+                break
+
+            edges, _ = self._csr.out_edges(frontier)
+            frontier = np.unique(self._csr.targets[edges])
+            frontier = frontier[self._seen[frontier] != self._stamp]
+            if not len(frontier):
+                break
+            self._seen[frontier] = self._stamp
+
+        return distances
+
+
+def evaluate_lemma(graph, evaluator, source_lemma, targets_synset_ids):
+    """ Distances from every node of source_lemma to its closest target synset """
+    source_nodes = graph.lemma_to_nodes_dict[source_lemma]
+    if not source_nodes:
+        return []
+
+    target_nodes = [graph.get_node_for_synset_id(int(target_synset_id))
+                    for target_synset_id in targets_synset_ids]
+    distances = evaluator.distances_to_nearest(
+        [int(node) for node in source_nodes],
+        [int(node) for node in target_nodes if node is not None]
+    )
+    return distances.tolist()
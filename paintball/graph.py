@@ -1,11 +1,18 @@
 import logging
 
+import numpy as np
+
 import graph_tool as gt
 from graph_tool import Graph, load_graph
 from graph_tool.generation import graph_union
 
 from collections import defaultdict
 
+from csr import CSRGraph
+from graph_delta import DeltaReport, LexicalUnit, Synset
+from lemma_index import LemmaIndex, LemmaNodesMapping
+from snapshot import load_snapshot, save_snapshot
+
 
 class BaseNode(object):
     __slots__ = ['_graph', '_node']
@@ -154,7 +161,11 @@ class BaseGraph(object):
         self._node_dict = {}
         self._syn_to_vertex_map = None
         self._lemma_to_nodes_dict = None
+        self._lemma_index = None
         self._lu_on_vertex_dict = None
+        self._csr = None
+        self._snapshot = None
+        self._revision = 0
 
     def use_graph_tool(self):
         """
@@ -168,6 +179,10 @@ class BaseGraph(object):
         the graph. The building of map is made only on the first funcion call.
         The first and the next calls of this function will return the built map.
         """
+        if self._snapshot is not None and self._snapshot.has_synset_index:
+            vertex = self._snapshot.vertex_for_synset(syn_id)
+            return self.node_for_vertex(vertex) if vertex >= 0 else None
+
         if not self._syn_to_vertex_map:
             self._syn_to_vertex_map = {}
             for node in self.all_nodes():
@@ -176,26 +191,141 @@ class BaseGraph(object):
                     self._syn_to_vertex_map[synset_id] = node
         return self._syn_to_vertex_map.get(syn_id, None)
 
+    def node_for_vertex(self, vertex_id):
+        """ Returns node wrapping the vertex with given index """
+        return BaseNode(self._g, self._g.vertex(vertex_id))
+
+    def csr(self, rebuild=False):
+        """
+        Returns read-only CSR arrays of the graph. They are built on the first
+        call and reused until the topology changes or rebuild is requested,
+        e.g. after edge weights were modified.
+        """
+        if self._csr is None or rebuild:
+            self._csr = CSRGraph.from_graph(self)
+        return self._csr
+
+    def connected_components(self, nodes):
+        """
+        Groups nodes into connected components of the subgraph induced by
+        them, ignoring edge directions. Only edges of the given nodes are
+        visited, the rest of the graph is neither traversed nor copied.
+
+        Returns lists of nodes ordered by vertex index, the largest
+        component first.
+        """
+        nodes = sorted(nodes, key=int)
+        position = dict((int(node), i) for i, node in enumerate(nodes))
+        parent = list(range(len(nodes)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, node in enumerate(nodes):
+            for neighbour in node._node.all_neighbours():
+                j = position.get(int(neighbour))
+                if j is not None:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        components = defaultdict(list)
+        for i, node in enumerate(nodes):
+            components[find(i)].append(node)
+
+        return [components[root] for root in sorted(components, key=lambda root: (-len(components[root]), root))]
+
+    @property
+    def snapshot(self):
+        """ GraphSnapshot the graph was loaded from, if any """
+        return self._snapshot
+
+    def node_synset_id(self, node):
+        """ Synset id of a node of the synset or lexical unit graph """
+        if self._snapshot is not None:
+            return int(self._snapshot.synset_ids[int(node)])
+        if self.has_node_attribute('synset'):
+            return node.synset.synset_id
+        return node.synset_id
+
+    def node_lemmas(self, node):
+        """ Lemmas of the lexical unit or of all lexical units of the synset """
+        if self._snapshot is not None:
+            return self._snapshot.lemmas(int(node))
+        if self.has_node_attribute('synset'):
+            return [lu.lemma for lu in node.synset.lu_set]
+        return [node.lu.lemma]
+
     def pickle(self, filename):
         self._g.save(filename)
 
     def unpickle(self, filename):
         self._g = load_graph(filename)
+        self._csr = None
+        self._snapshot = None
+
+    def save_snapshot(self, filename):
+        """
+        Saves topology, rel_id and weight edge attributes, lexical unit and
+        synset ids, lemmas and lemma/synset indexes into a binary snapshot.
+        """
+        save_snapshot(self, filename)
+
+    def load_snapshot(self, filename, mmap=True):
+        """
+        Loads a graph saved with save_snapshot. Snapshot arrays are memory
+        mapped, so processes loading the same file share them. Scalar
+        attributes become graph attributes (rel_id, weight, lu_id,
+        synset_id), lemmas are served from the snapshot through node_lemmas
+        and lemma_to_nodes_dict, the latter being ready without calling
+        generate_lemma_to_nodes_dict_*. Object attributes (lu, synset) are
+        not restored.
+        """
+        snapshot = load_snapshot(filename, mmap)
+
+        self._g = Graph(directed=snapshot.directed)
+        if snapshot.num_vertices:
+            self._g.add_vertex(snapshot.num_vertices)
+        self._g.add_edge_list(np.column_stack([snapshot.sources(), snapshot.targets]))
+
+        self.create_edge_attribute('rel_id', 'int')
+        self.set_edge_attribute_array('rel_id', snapshot.rel_ids)
+        self.create_edge_attribute('weight', 'float')
+        self.set_edge_attribute_array('weight', snapshot.weights)
+        self.create_node_attribute('lu_id', 'int')
+        self.set_node_attribute_array('lu_id', snapshot.lu_ids)
+        self.create_node_attribute('synset_id', 'int')
+        self.set_node_attribute_array('synset_id', snapshot.synset_ids)
+
+        self._snapshot = snapshot
+        self._csr = snapshot.csr()
+        self._syn_to_vertex_map = None
+        self._set_lemma_index(snapshot.lemma_index)
 
     def init_graph(self, drctd=False):
         self._g = Graph(directed=drctd)
+        self._csr = None
+        self._snapshot = None
 
     def copy_graph_from(self, g):
         self._g = g._g.copy()
+        self._csr = None
+        self._snapshot = None
 
     def set_directed(self, drctd):
         self._g.set_directed(drctd)
+        self._csr = None
 
     def is_directed(self):
         return self._g.is_directed()
 
     def merge_graphs(self, g1, g2):
         self._g = graph_union(g1._g, g2._g, internal_props=True)
+        self._csr = None
+        self._snapshot = None
 
     # Node operations:
     def all_nodes(self):
@@ -217,6 +347,14 @@ class BaseGraph(object):
         """ Checks if a node attribute already exists """
         return name in self._g.vertex_properties
 
+    def get_node_attribute_array(self, name):
+        """ Values of a scalar node attribute for all nodes, indexed by vertex id """
+        return self._g.vertex_properties[name].a
+
+    def set_node_attribute_array(self, name, values):
+        """ Sets a scalar node attribute for all nodes at once """
+        self._g.vertex_properties[name].a = values
+
     def delete_node_attribute(self, name):
         """ Delete node attribute """
         del self._g.vertex_properties[name]
@@ -238,6 +376,7 @@ class BaseGraph(object):
     def remove_node(self, name):
         self._g.remove_vertex(self._node_dict[name]._node)
         del self._node_dict[name]
+        self._csr = None
 
     def nodes_filter(self, nodes_to_filter_set, inverted=False,
                      replace=False, soft=False):
@@ -253,8 +392,8 @@ class BaseGraph(object):
           soft (bool): Hide nodes without removing them so they can be restored
             with reset_nodes_filter. Defaults to False.
         """
-        predicate = lambda node: node not in nodes_to_filter_set
-        self.nodes_filter_conditional(predicate, inverted, replace, soft)
+        vertices = np.fromiter((int(node) for node in nodes_to_filter_set), dtype=np.int64)
+        self.nodes_filter_array(vertices, inverted, replace, soft)
 
     def nodes_filter_conditional(self, predicate, inverted=False,
                                  replace=False, soft=False):
@@ -270,18 +409,57 @@ class BaseGraph(object):
           soft (bool): Hide nodes without removing them so they can be restored
             with reset_nodes_filter. Defaults to False.
         """
+        kept = np.zeros(self._g.num_vertices(ignore_filter=True), dtype=bool)
+        for node in self.all_nodes():
+            kept[int(node)] = predicate(node)
+
+        self.nodes_filter_mask(kept, inverted, replace, soft)
+
+    def nodes_filter_array(self, vertices, inverted=False,
+                           replace=False, soft=False):
+        """
+        Filters out nodes given by vertex ids, see nodes_filter
+
+        Args:
+          vertices (numpy.ndarray): Ids of vertices which will be filtered out.
+          inverted (bool): If True, vertices NOT in array will be filtered out.
+            Defaults to False.
+          replace (bool): Replace current filter instead of combining the two.
+            Defaults to False.
+          soft (bool): Hide nodes without removing them so they can be restored
+            with reset_nodes_filter. Defaults to False.
+        """
+        kept = np.ones(self._g.num_vertices(ignore_filter=True), dtype=bool)
+        kept[np.asarray(vertices, dtype=np.int64)] = False
+        self.nodes_filter_mask(kept, inverted, replace, soft)
+
+    def nodes_filter_mask(self, kept, inverted=False,
+                          replace=False, soft=False):
+        """
+        Filters nodes with a boolean mask, see nodes_filter_conditional
 
+        Args:
+          kept (numpy.ndarray): Mask over all vertex ids, False for nodes that
+            should be filtered out.
+          inverted (bool): Invert condition. Defaults to False.
+          replace (bool): Replace current filter instead of combining the two.
+            Defaults to False.
+          soft (bool): Hide nodes without removing them so they can be restored
+            with reset_nodes_filter. Defaults to False.
+        """
+        kept = np.asarray(kept, dtype=bool) != inverted
+
+        # Nodes hidden by the current filter stay hidden, also with replace:
+        # the new filter is only decided for nodes visible so far.
         (old_filter, old_inverted) = self._g.get_vertex_filter()
-        new_filter = self._g.new_vertex_property("bool")
+        if old_filter is not None:
+            kept &= np.asarray(old_filter.a, dtype=bool) != old_inverted
 
-        for node in self.all_nodes():
-            kept = predicate(node) != inverted
-            if not replace and old_filter:
-                old_kept = bool(old_filter[node._node]) != old_inverted
-                kept = kept and old_kept
-            new_filter[node._node] = kept
+        new_filter = self._g.new_vertex_property("bool")
+        new_filter.a = kept
 
         self._g.set_vertex_filter(new_filter, False)
+        self._csr = None
         if not soft:
             self.apply_nodes_filter()
 
@@ -292,6 +470,7 @@ class BaseGraph(object):
     def reset_nodes_filter(self):
         """ Clears node filter """
         self._g.set_vertex_filter(None)
+        self._csr = None
 
     # Edge operations:
     def num_edges(self):
@@ -346,6 +525,14 @@ class BaseGraph(object):
         """ Checks if an edge attribute already existst """
         return name in self._g.edge_properties
 
+    def get_edge_attribute_array(self, name):
+        """ Values of a scalar edge attribute for all edges, indexed by edge index """
+        return self._g.edge_properties[name].a
+
+    def set_edge_attribute_array(self, name, values):
+        """ Sets a scalar edge attribute for all edges at once """
+        self._g.edge_properties[name].a = values
+
     def delete_edge_attribute(self, name):
         """ Delete edge attribute """
         del self._g.edge_properties[name]
@@ -355,22 +542,38 @@ class BaseGraph(object):
             edge_attributes_list = []
 
         new_edge = self._g.add_edge(parent._node, child._node)
+        self._csr = None
         for attr in edge_attributes_list:
             self._g.edge_properties[attr[0]][new_edge] = attr[1]
 
         return BaseEdge(self._g, new_edge)
 
     def edges_filter(self, edges_to_filter_set):
-        edge_filter = self._g.new_edge_property("bool")
+        """ Removes edges from set """
+        edges = np.fromiter((self._g.edge_index[e._edge] for e in edges_to_filter_set), dtype=np.int64)
+        self.edges_filter_array(edges)
 
-        for e in self.all_edges():
-            if e in edges_to_filter_set:
-                edge_filter[e._edge] = False
-            else:
-                edge_filter[e._edge] = True
+    def edges_filter_array(self, edges):
+        """ Removes edges given by edge indexes """
+        kept = np.ones(self._g.edge_index_range, dtype=bool)
+        kept[np.asarray(edges, dtype=np.int64)] = False
+        self.edges_filter_mask(kept)
+
+    def edges_filter_mask(self, kept):
+        """
+        Removes edges with a boolean mask over edge indexes, False for edges
+        that should be removed. Edges hidden by the current filters are
+        removed as well.
+        """
+        visible = np.zeros(self._g.edge_index_range, dtype=bool)
+        visible[self._g.get_edges([self._g.edge_index])[:, 2].astype(np.int64)] = True
+
+        edge_filter = self._g.new_edge_property("bool")
+        edge_filter.a = visible & np.asarray(kept, dtype=bool)
 
         self._g.set_edge_filter(edge_filter)
         self._g.purge_edges()
+        self._csr = None
 
     def ungraph_tool(self, thingy, lemma_on_only_synset_node_dict):
         """
@@ -404,42 +607,51 @@ class BaseGraph(object):
     def generate_lemma_to_nodes_dict_synsets(self):
         """
         This method generates a utility dictionary, which maps lemmas to
-        corresponding node objects. It is expensive in menas of time
-        needed to generate the dictionary. It should therefore be executed
-        at the beginning of the runtime and later its results should be reused
-        as many times as needed without re-executing the function.
-        """
-        lemma_to_nodes_dict = defaultdict(set)
-        for node in self.all_nodes():
-            try:
-                lu_set = node.synset.lu_set
-            except KeyError:
-                continue
-
-            for lu in lu_set:
-                lemma = lu.lemma.lower()
-                lemma_to_nodes_dict[lemma].add(node)
-
-        self._lemma_to_nodes_dict = lemma_to_nodes_dict
+        corresponding node objects. It is backed by a LemmaIndex of vertex
+        ids, so it is cheap to keep, but it should still be generated once
+        at the beginning of the runtime and reused afterwards.
+        """
+        lemmas = []
+        vertices = []
+        if self.has_node_attribute('synset'):
+            synsets = self._g.vertex_properties['synset']
+            for v in self._g.vertices():
+                synset = synsets[v]
+                if not synset:
+                    continue
+                for lu in synset.lu_set:
+                    lemmas.append(lu.lemma.lower())
+                    vertices.append(int(v))
+
+        self._set_lemma_index(LemmaIndex.from_pairs(lemmas, vertices))
 
     def generate_lemma_to_nodes_dict_lexical_units(self):
         """
         This method generates a utility dictionary, which maps lemmas to
-        corresponding node objects. It is expensive in menas of time
-        needed to generate the dictionary. It should therefore be executed
-        at the beginning of the runtime and later its results should be reused
-        as many times as needed without re-executing the function.
-        """
-        lemma_to_nodes_dict = defaultdict(set)
+        corresponding node objects. It is backed by a LemmaIndex of vertex
+        ids, so it is cheap to keep, but it should still be generated once
+        at the beginning of the runtime and reused afterwards.
+        """
+        lemmas = []
+        vertices = []
+        if self.has_node_attribute('lu'):
+            lus = self._g.vertex_properties['lu']
+            for v in self._g.vertices():
+                lu = lus[v]
+                if lu:
+                    lemmas.append(lu.lemma.lower())
+                    vertices.append(int(v))
+
+        self._set_lemma_index(LemmaIndex.from_pairs(lemmas, vertices))
+
+    def _set_lemma_index(self, index):
+        self._lemma_index = index
+        self._lemma_to_nodes_dict = LemmaNodesMapping(self, index)
 
-        for node in self.all_nodes():
-            try:
-                lemma = node.lu.lemma.lower()
-                lemma_to_nodes_dict[lemma].add(node)
-            except:
-                continue
-
-        self._lemma_to_nodes_dict = lemma_to_nodes_dict
+    @property
+    def lemma_index(self):
+        """ LemmaIndex of lower-cased lemmas, see generate_lemma_to_nodes_dict_* """
+        return self._lemma_index
 
     @property
     def lemma_to_nodes_dict(self):
@@ -450,6 +662,12 @@ class BaseGraph(object):
         Makes dictionary lu on vertex
         """
         lu_on_vertex_dict = defaultdict(set)
+        if self._snapshot is not None:
+            for vertex in np.flatnonzero(self._snapshot.lu_ids != -1).tolist():
+                lu_on_vertex_dict[int(self._snapshot.lu_ids[vertex])] = self.node_for_vertex(vertex)
+            self._lu_on_vertex_dict = lu_on_vertex_dict
+            return
+
         for node in self.all_nodes():
             try:
                 nl = node.lu
@@ -460,3 +678,202 @@ class BaseGraph(object):
                 lu_on_vertex_dict[node.lu.lu_id] = node
 
         self._lu_on_vertex_dict = lu_on_vertex_dict
+
+    # Incremental updates:
+    @property
+    def revision(self):
+        """ Number of deltas applied to the graph, see apply_delta """
+        return self._revision
+
+    def _is_synset_graph(self):
+        if self._snapshot is not None:
+            return self._snapshot.has_synset_index
+        return self.has_node_attribute('synset')
+
+    def _node_lu_id(self, node):
+        if self.has_node_attribute('lu_id'):
+            return node.lu_id
+        if self.has_node_attribute('lu') and node.lu:
+            return node.lu.lu_id
+        return -1
+
+    def _set_node_ids(self, node, lu=None, synset=None, lu_id=-1, synset_id=-1):
+        """ Sets lexical unit, synset and their ids of a node, for the attributes the graph has """
+        for name, value in (('lu', lu), ('synset', synset), ('lu_id', lu_id), ('synset_id', synset_id)):
+            if self.has_node_attribute(name):
+                setattr(node, name, value)
+
+    def apply_delta(self, delta, edge_weights=None):
+        """
+        Applies a graph_delta.GraphDelta. The lemma index, the lexical unit
+        and synset maps and the lemmas of the snapshot are patched with the
+        changed vertices instead of being rebuilt by visiting all nodes.
+        Topology arrays of the snapshot and the CSR arrays, if built, are
+        read again from the edge arrays of the graph. Removals go first,
+        then additions.
+
+        Nodes of a synsets graph are synsets, lexical units are added to and
+        removed from their synset nodes. Nodes of other graphs are lexical
+        units, their synsets exist only as 'synset_id' values. A removed node
+        loses its edges, lexical unit and synset but keeps its vertex, so
+        that vertex ids held by indexes and caches stay valid.
+
+        edge_weights maps relation ids to weights of added edges, e.g. the
+        transmittance of PaintBall; added edges keep the default weight
+        without it.
+
+        Returns a graph_delta.DeltaReport.
+        """
+        report = DeltaReport()
+        synset_graph = self._is_synset_graph()
+        directed = self._g.is_directed()
+        has_rel_id = self.has_edge_attribute('rel_id')
+
+        if not synset_graph and self._lu_on_vertex_dict is None:
+            self._make_lu_on_v_dict()
+        # lookups of synsets changed by this delta, the snapshot index knows the old ones only
+        changed_synsets = {}
+
+        def vertex_for(key):
+            if not synset_graph:
+                node = self._lu_on_vertex_dict.get(key)
+            elif key in changed_synsets:
+                return changed_synsets[key]
+            else:
+                node = self.get_node_for_synset_id(key)
+            return int(node) if node is not None else -1
+
+        def touch(source, target):
+            report.changed_vertices.add(source)
+            if not directed:
+                report.changed_vertices.add(target)
+
+        def new_synset_node(synset_id):
+            node = BaseNode(self._g, self._g.add_vertex())
+            self._set_node_ids(node, synset=Synset(synset_id, []), synset_id=synset_id)
+            changed_synsets[synset_id] = int(node)
+            if self._syn_to_vertex_map:
+                self._syn_to_vertex_map[synset_id] = node
+            report.added_vertices.append(int(node))
+            return node
+
+        removed_pairs = []
+        added_pairs = []
+
+        # Removals:
+        removed = set()
+        if synset_graph:
+            for synset_id in delta.removed_synsets:
+                vertex = vertex_for(synset_id)
+                if vertex < 0:
+                    report.skipped.append(('-synset', synset_id))
+                    continue
+                removed.add(vertex)
+                changed_synsets[synset_id] = -1
+            for lu_id, synset_id, lemma in delta.removed_lus:
+                if synset_id in changed_synsets:
+                    # removed together with its synset
+                    continue
+                vertex = vertex_for(synset_id)
+                if vertex < 0 or lemma not in self.node_lemmas(self.node_for_vertex(vertex)):
+                    report.skipped.append(('-lu', lu_id))
+                    continue
+                if self.has_node_attribute('synset'):
+                    node = self.node_for_vertex(vertex)
+                    lu_set = [lu for lu in node.synset.lu_set if lu.lu_id != lu_id]
+                    node.synset = Synset(synset_id, lu_set)
+                removed_pairs.append((lemma, vertex))
+        else:
+            if delta.removed_synsets:
+                synset_ids = self.get_node_attribute_array('synset_id')
+                removed.update(np.flatnonzero(np.isin(synset_ids, delta.removed_synsets)).tolist())
+            for lu_id, _, _ in delta.removed_lus:
+                vertex = vertex_for(lu_id)
+                if vertex < 0:
+                    report.skipped.append(('-lu', lu_id))
+                    continue
+                removed.add(vertex)
+
+        for source, target, rel_id in delta.removed_relations:
+            s, t = vertex_for(source), vertex_for(target)
+            edges = [] if s < 0 or t < 0 else [
+                e for e in self._g.edge(s, t, all_edges=True)
+                if not has_rel_id or self._g.edge_properties['rel_id'][e] == rel_id
+            ]
+            if not edges:
+                report.skipped.append(('-rel', (source, target, rel_id)))
+                continue
+            for e in edges:
+                self._g.remove_edge(e)
+            touch(s, t)
+
+        for vertex in sorted(removed):
+            node = self.node_for_vertex(vertex)
+            report.changed_lemmas.update(lemma.lower() for lemma in self.node_lemmas(node))
+            for e in list(node._node.all_edges()):
+                touch(int(e.source()), int(e.target()))
+                self._g.remove_edge(e)
+
+            if synset_graph:
+                synset_id = self.node_synset_id(node)
+                if self._syn_to_vertex_map and self._syn_to_vertex_map.get(synset_id) == node:
+                    del self._syn_to_vertex_map[synset_id]
+            else:
+                self._lu_on_vertex_dict.pop(self._node_lu_id(node), None)
+            self._set_node_ids(node)
+        report.removed_vertices = sorted(removed)
+
+        # Additions:
+        if synset_graph:
+            for synset_id in delta.added_synsets:
+                if vertex_for(synset_id) < 0:
+                    new_synset_node(synset_id)
+
+        for lu_id, synset_id, lemma in delta.added_lus:
+            lu = LexicalUnit(lu_id, lemma)
+            if synset_graph:
+                vertex = vertex_for(synset_id)
+                node = self.node_for_vertex(vertex) if vertex >= 0 else new_synset_node(synset_id)
+                if self.has_node_attribute('synset'):
+                    node.synset = Synset(synset_id, list(node.synset.lu_set) + [lu])
+            elif vertex_for(lu_id) >= 0:
+                report.skipped.append(('+lu', lu_id))
+                continue
+            else:
+                node = BaseNode(self._g, self._g.add_vertex())
+                self._set_node_ids(node, lu=lu, lu_id=lu_id, synset_id=synset_id)
+                self._lu_on_vertex_dict[lu_id] = node
+                report.added_vertices.append(int(node))
+            added_pairs.append((lemma, int(node)))
+
+        for source, target, rel_id in delta.added_relations:
+            s, t = vertex_for(source), vertex_for(target)
+            if s < 0 or t < 0:
+                report.skipped.append(('+rel', (source, target, rel_id)))
+                continue
+            e = self._g.add_edge(s, t)
+            if has_rel_id:
+                self._g.edge_properties['rel_id'][e] = rel_id
+            if edge_weights is not None and self.has_edge_attribute('weight'):
+                self._g.edge_properties['weight'][e] = edge_weights.get(rel_id, 0.0)
+            report.added_edges.append(int(self._g.edge_index[e]))
+            touch(s, t)
+
+        report.changed_vertices -= removed
+        report.changed_lemmas.update(lemma.lower() for lemma, _ in removed_pairs + added_pairs)
+
+        # Derived indexes:
+        if self._lemma_index is not None:
+            self._set_lemma_index(self._lemma_index.updated(
+                report.removed_vertices,
+                [(lemma.lower(), vertex) for lemma, vertex in removed_pairs],
+                [(lemma.lower(), vertex) for lemma, vertex in added_pairs]
+            ))
+        if self._snapshot is not None:
+            self._snapshot = self._snapshot.updated(
+                self, self._lemma_index, report.removed_vertices, removed_pairs, added_pairs)
+        if self._csr is not None:
+            self._csr = CSRGraph.from_graph(self)
+        self._revision += 1
+
+        return report
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import io
+
+import numpy as np
+
+ADDED = '+'
+REMOVED = '-'
+
+LEXICAL_UNIT = 'lu'
+SYNSET = 'synset'
+RELATION = 'rel'
+
+DELTA_SEPARATOR = '\t'
+
+
+class LexicalUnit(object):
+    """ Stands for a plWordNet lexical unit added by a delta: lu_id and lemma """
+
+    def __init__(self, lu_id, lemma):
+        self.lu_id = lu_id
+        self.lemma = lemma
+
+
+class Synset(object):
+    """ Stands for a plWordNet synset changed by a delta: synset_id and its lexical units """
+
+    def __init__(self, synset_id, lu_set):
+        self.synset_id = synset_id
+        self.lu_set = lu_set
+
+
+class GraphDelta(object):
+    """
+    Lexical units, synsets and relations added to and removed from
+    plWordNet since a graph was built, see read_delta.
+
+    Lexical units are (lu_id, synset_id, lemma), relations are (source,
+    target, rel_id) with lexical unit ids as source and target in a delta
+    of the lexical unit graph and synset ids in a delta of the synsets
+    graph.
+    """
+
+    def __init__(self):
+        self.added_lus = []
+        self.removed_lus = []
+        self.added_synsets = []
+        self.removed_synsets = []
+        self.added_relations = []
+        self.removed_relations = []
+
+    def __len__(self):
+        return (len(self.added_lus) + len(self.removed_lus) + len(self.added_synsets) +
+                len(self.removed_synsets) + len(self.added_relations) + len(self.removed_relations))
+
+    def add(self, change, kind, fields):
+        """ Records a change given as in a diff file, e.g. ('+', 'lu', ['12', '7', 'dom']) """
+        if change not in (ADDED, REMOVED):
+            raise ValueError('Unknown change: {}'.format(change))
+
+        if kind == LEXICAL_UNIT:
+            lu_id, synset_id, lemma = fields
+            record = (int(lu_id), int(synset_id), lemma)
+            records = self.added_lus if change == ADDED else self.removed_lus
+        elif kind == SYNSET:
+            synset_id, = fields
+            record = int(synset_id)
+            records = self.added_synsets if change == ADDED else self.removed_synsets
+        elif kind == RELATION:
+            source, target, rel_id = fields
+            record = (int(source), int(target), int(rel_id))
+            records = self.added_relations if change == ADDED else self.removed_relations
+        else:
+            raise ValueError('Unknown record kind: {}'.format(kind))
+        records.append(record)
+
+
+def read_delta(path):
+    """
+    Reads a diff file of tab separated records, one per line, each marked
+    with + when added and - when removed:
+
+        +lu     <lu_id>     <synset_id>     <lemma>
+        -lu     <lu_id>     <synset_id>     <lemma>
+        +synset <synset_id>
+        -synset <synset_id>
+        +rel    <source>    <target>        <rel_id>
+        -rel    <source>    <target>        <rel_id>
+
+    Removing a synset removes its lexical units as well. Relations of
+    graphs without relation ids, such as the synsets graph, have rel_id -1.
+    Empty lines and lines starting with # are skipped.
+    """
+    delta = GraphDelta()
+    with io.open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            fields = line.split(DELTA_SEPARATOR)
+            try:
+                delta.add(fields[0][:1], fields[0][1:], fields[1:])
+            except ValueError as e:
+                raise ValueError('{}:{}: {}, got {!r}'.format(path, line_number, e, line))
+    return delta
+
+
+class DeltaReport(object):
+    """
+    Outcome of BaseGraph.apply_delta.
+
+    added_vertices, removed_vertices – vertex ids of added and removed
+    nodes; removed nodes stay in the graph without edges, lexical unit and
+    synset, so that other vertex ids do not change.
+
+    changed_vertices – vertices whose out-edges were added or removed,
+    spreading results passing through them are no longer valid.
+
+    added_edges – edge indexes of the added relations.
+
+    changed_lemmas – lower-cased lemmas whose nodes changed, sources with
+    such targets start from other nodes now.
+
+    skipped – (record kind, key) of records not applied, they refer to
+    lexical units, synsets or relations missing in the graph or add
+    lexical units it already has.
+
+    invalid_starts – start vertices of cached activation profiles dropped
+    by PaintBall.apply_delta.
+    """
+
+    def __init__(self):
+        self.added_vertices = []
+        self.removed_vertices = []
+        self.changed_vertices = set()
+        self.added_edges = []
+        self.changed_lemmas = set()
+        self.skipped = []
+        self.invalid_starts = []
+
+    def touched_vertices(self):
+        """ Removed and changed vertices as an array """
+        return np.union1d(np.array(self.removed_vertices, dtype=np.int64),
+                          np.array(sorted(self.changed_vertices), dtype=np.int64))
+
+    def __str__(self):
+        return '{} vertices added, {} removed, {} changed, {} edges added, {} lemmas changed, {} skipped'.format(
+            len(self.added_vertices), len(self.removed_vertices), len(self.changed_vertices),
+            len(self.added_edges), len(self.changed_lemmas), len(self.skipped))
@@ -1,5 +1,16 @@
+import heapq
+import itertools
+import os
+
 from collections import defaultdict
-from pathlib import Path
+
+try:
+    from pathlib import Path
+except ImportError:
+    from pathlib2 import Path
+
+CSV_SEPARATOR = ';'
+TSV_SEPARATOR = '\t'
 
 
 class KnowledgeSource:
@@ -12,6 +23,10 @@ class KnowledgeSource:
         for file_path in self.source_path.glob('*.tsv'):
             self._load_knowledge(file_path)
 
+    def stream(self):
+        """ Lazy reader of the same files, see KnowledgeSourceStream """
+        return KnowledgeSourceStream(sorted(str(p) for p in self.source_path.glob('*.tsv')))
+
     def _load_knowledge(self, file_path):
         with open(str(file_path), 'r') as f:
             for line in f:
@@ -20,3 +35,81 @@ class KnowledgeSource:
                     self.knowledge_dict[source][target].append(support)
                 except:
                     self.knowledge_dict[source][target] = [support]
+
+
+def separator_for(path):
+    """ Tab for *.tsv files, semicolon otherwise """
+    return TSV_SEPARATOR if path.endswith('.tsv') else CSV_SEPARATOR
+
+
+def read_triples(path, separator=None):
+    """ Yields (source, target, support) of a source;target;support file """
+    separator = separator or separator_for(path)
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                source, target, support = line.split(separator)
+                yield source, target, float(support)
+            except ValueError:
+                raise ValueError('{}:{}: expected source{sep}target{sep}support, got {!r}'.format(
+                    path, line_number, line, sep=separator))
+
+
+def _checked_sorted(triples, path):
+    previous = None
+    for triple in triples:
+        if previous is not None and triple[0] < previous:
+            raise ValueError('{} is not sorted by source: {!r} after {!r}'.format(path, triple[0], previous))
+        previous = triple[0]
+        yield triple
+
+
+def group_by_source(triples):
+    """ Groups consecutive triples of a source: yields (source, [(target, support), ...]) """
+    for source, group in itertools.groupby(triples, key=lambda triple: triple[0]):
+        yield source, [(target, support) for _, target, support in group]
+
+
+class KnowledgeSourceStream(object):
+    """
+    Knowledge source read lazily from one or more files, holding a single
+    source in memory at a time. A single file must have the lines of each
+    source next to each other; many files must each be sorted by source and
+    are merged with a k-way merge, so sources split across files are
+    joined. A directory stands for its *.tsv and *.csv files.
+
+    items() can be iterated many times and can replace the dict returned by
+    utils.load_knowledge_source, e.g. as knowledge source of PaintBall.
+    """
+
+    def __init__(self, paths, separator=None):
+        if isinstance(paths, str):
+            paths = [paths]
+        self.paths = []
+        for path in paths:
+            if os.path.isdir(path):
+                self.paths.extend(sorted(
+                    os.path.join(path, name) for name in os.listdir(path)
+                    if name.endswith('.tsv') or name.endswith('.csv')
+                ))
+            else:
+                self.paths.append(path)
+        self.separator = separator
+
+    def triples(self):
+        if len(self.paths) == 1:
+            return read_triples(self.paths[0], self.separator)
+        return heapq.merge(*[
+            _checked_sorted(read_triples(path, self.separator), path)
+            for path in self.paths
+        ])
+
+    def items(self):
+        return group_by_source(self.triples())
+
+    def __iter__(self):
+        for source, _ in self.items():
+            yield source
@@ -0,0 +1,212 @@
+import numpy as np
+
+from arrayfile import StringTable
+
+
+def _text(s):
+    if isinstance(s, bytes):
+        return s.decode('utf-8')
+    return s
+
+
+def merge_strings(table, ids, strings):
+    """
+    Byte-sorted table of the distinct strings of a table at ids and of
+    new strings. Returns (table, ids, string_ids) with the ids and the new
+    strings numbered by their position in the merged table.
+    """
+    encoded = [_text(s).encode('utf-8') for s in strings]
+    used = np.unique(ids).tolist()
+    unique = sorted(set(table._bytes(i) for i in used) | set(encoded))
+    position = dict((s, i) for i, s in enumerate(unique))
+
+    renumbered = np.full(len(table), -1, dtype=np.int64)
+    renumbered[used] = [position[table._bytes(i)] for i in used]
+    string_ids = np.array([position[s] for s in encoded], dtype=np.int64)
+    return StringTable.from_strings(unique), renumbered[np.asarray(ids, dtype=np.int64)], string_ids
+
+
+class LemmaIndex(object):
+    """
+    Compact lemma -> vertices index.
+
+    Distinct lemmas are kept in a byte-sorted string table, a lemma id is the
+    position of the lemma in the table. Vertices of lemma i are stored at
+    vertices[offsets[i]:offsets[i + 1]]. Lookups use a fixed-width bytes
+    array built lazily from the table, so many lemmas are searched with a
+    single np.searchsorted call.
+    """
+
+    __slots__ = ['lemmas', 'offsets', 'vertices', '_keys']
+
+    def __init__(self, lemmas, offsets, vertices):
+        self.lemmas = lemmas
+        self.offsets = offsets
+        self.vertices = vertices
+        self._keys = None
+
+    @classmethod
+    def from_pairs(cls, lemmas, vertices):
+        """ Builds the index from parallel sequences of lemmas and vertex ids """
+        encoded = [_text(lemma).encode('utf-8') for lemma in lemmas]
+        unique = sorted(set(encoded))
+        position = dict((lemma, i) for i, lemma in enumerate(unique))
+        lemma_ids = np.array([position[lemma] for lemma in encoded], dtype=np.int64)
+
+        order = np.argsort(lemma_ids, kind='mergesort')
+        offsets = np.zeros(len(unique) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lemma_ids, minlength=len(unique)), out=offsets[1:])
+        vertices = np.asarray(vertices, dtype=np.int64)[order]
+
+        return cls(StringTable.from_strings(unique), offsets, vertices)
+
+    def updated(self, removed_vertices, removed_pairs, added_pairs):
+        """
+        Index without the pairs of removed vertices and the removed (lemma,
+        vertex) pairs, with the added pairs. Pairs are regrouped with array
+        operations, only distinct lemmas are handled one by one. Vertices of
+        a lemma stay in the order from_pairs gives them when pairs are listed
+        by vertex, lemmas left without vertices are dropped.
+        """
+        lemma_ids = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+        kept = ~np.isin(self.vertices, np.asarray(removed_vertices, dtype=np.int64))
+        for lemma, vertex in removed_pairs:
+            lemma_id = self.lemma_id(lemma)
+            if lemma_id < 0:
+                continue
+            positions = self.offsets[lemma_id] + np.flatnonzero(self.vertices_of_id(lemma_id) == vertex)
+            positions = positions[kept[positions]]
+            if len(positions):
+                kept[positions[0]] = False
+
+        table, kept_ids, added_ids = merge_strings(
+            self.lemmas, lemma_ids[kept], [lemma for lemma, _ in added_pairs])
+        lemma_ids = np.concatenate([kept_ids, added_ids])
+        vertices = np.concatenate([
+            self.vertices[kept],
+            np.array([vertex for _, vertex in added_pairs], dtype=np.int64)
+        ])
+
+        order = np.lexsort((vertices, lemma_ids))
+        offsets = np.zeros(len(table) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lemma_ids, minlength=len(table)), out=offsets[1:])
+
+        return LemmaIndex(table, offsets, vertices[order])
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(
+            StringTable(arrays[prefix + 'key_data'], arrays[prefix + 'key_offsets']),
+            arrays[prefix + 'offsets'],
+            arrays[prefix + 'vertices']
+        )
+
+    def to_arrays(self, prefix):
+        return {
+            prefix + 'key_data': self.lemmas.data,
+            prefix + 'key_offsets': self.lemmas.offsets,
+            prefix + 'offsets': self.offsets,
+            prefix + 'vertices': self.vertices,
+        }
+
+    def __len__(self):
+        return len(self.lemmas)
+
+    def __iter__(self):
+        return iter(self.lemmas)
+
+    def __contains__(self, lemma):
+        return self.lemma_id(lemma) >= 0
+
+    def _fixed_width_keys(self):
+        if self._keys is None:
+            lengths = np.diff(self.lemmas.offsets)
+            width = max(int(lengths.max()) if len(lengths) else 0, 1)
+            rows = np.repeat(np.arange(len(lengths)), lengths)
+            columns = np.arange(int(lengths.sum())) - np.repeat(self.lemmas.offsets[:-1], lengths)
+
+            matrix = np.zeros((len(lengths), width), dtype=np.uint8)
+            matrix[rows, columns] = self.lemmas.data
+            self._keys = matrix.view('S{}'.format(width)).ravel()
+        return self._keys
+
+    def lemma_ids(self, lemmas):
+        """ Ids of many lemmas at once, -1 for unknown ones """
+        keys = self._fixed_width_keys()
+        width = keys.dtype.itemsize
+        encoded = [_text(lemma).encode('utf-8') for lemma in lemmas]
+
+        queries = np.array(encoded, dtype='S{}'.format(width)) if encoded else np.zeros(0, dtype=keys.dtype)
+        positions = np.searchsorted(keys, queries)
+        positions[positions == len(keys)] = 0
+
+        ids = np.full(len(encoded), -1, dtype=np.int64)
+        if len(keys):
+            # too long queries are truncated by the conversion, never match them
+            fits = np.array([len(lemma) <= width for lemma in encoded], dtype=bool)
+            found = fits & (keys[positions] == queries)
+            ids[found] = positions[found]
+        return ids
+
+    def lemma_id(self, lemma):
+        return int(self.lemma_ids([lemma])[0])
+
+    def vertices_of(self, lemma):
+        """ Vertex ids of a lemma, empty for unknown lemmas """
+        return self.vertices_of_id(self.lemma_id(lemma))
+
+    def vertices_of_id(self, lemma_id):
+        if lemma_id < 0:
+            return self.vertices[:0]
+        return self.vertices[self.offsets[lemma_id]:self.offsets[lemma_id + 1]]
+
+    def batch_lookup(self, lemmas):
+        """ Vertex id arrays of many lemmas, found with a single search """
+        return [self.vertices_of_id(lemma_id) for lemma_id in self.lemma_ids(lemmas).tolist()]
+
+
+class LemmaNodesMapping(object):
+    """
+    Read-only lemma -> set of nodes view of a LemmaIndex. Lookups behave like
+    the defaultdict(set) it replaces: unknown lemmas give an empty set.
+    """
+
+    def __init__(self, graph, index):
+        self._graph = graph
+        self._index = index
+
+    def _nodes(self, vertices):
+        return set(self._graph.node_for_vertex(v) for v in vertices.tolist())
+
+    def __getitem__(self, lemma):
+        return self._nodes(self._index.vertices_of(lemma))
+
+    def get(self, lemma, default=None):
+        lemma_id = self._index.lemma_id(lemma)
+        if lemma_id < 0:
+            return default
+        return self._nodes(self._index.vertices_of_id(lemma_id))
+
+    def get_many(self, lemmas):
+        """ Node sets of many lemmas, see LemmaIndex.batch_lookup """
+        return [self._nodes(vertices) for vertices in self._index.batch_lookup(lemmas)]
+
+    def __contains__(self, lemma):
+        return lemma in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        for lemma_id, lemma in enumerate(self._index):
+            yield lemma, self._nodes(self._index.vertices_of_id(lemma_id))
+
+    def values(self):
+        for _, nodes in self.items():
+            yield nodes
@@ -1,13 +1,20 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import argparse
 import logging
 import sys
 
-from .constants import PAINT_BALL_GRAPH, IMPEDANCE_TABLE, SYNSETS_GRAPH
-from .paint_ball import PaintBall, Params
-from .plwn_utils import PLWN
-from .utils import load_knowledge_source, load_graph, load_impedance_table
+from .constants import PAINT_BALL_GRAPH, IMPEDANCE_TABLE, SYNSETS_GRAPH, SYNSET_SIZES, TRACE_PATH
+from .budget import SpreadingBudget
+from .knowledge_source import KnowledgeSourceStream
+from .metrics import SourceMetrics
+from .paint_ball import PaintBall, Params, FRONTIER, VECTORIZED, BEST_FIRST, SPARSE, BATCHED
+from .parallel import run_parallel
+from .profile_cache import ActivationProfileCache
+from .similarity_cache import SIMILARITY_CACHE_EXTENSION, SimilarityCache
+from .tracing import JsonlTracer, NullTracer
+from .utils import load_knowledge_source, load_graph, load_impedance_table, load_synset_sizes
 
 logging.basicConfig(level=logging.ERROR, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -17,40 +24,136 @@ def log(message):
     logger.info(message)
 
 
-def main():
-    log("Loading knowledge source")
-    knowledge_source = load_knowledge_source(sys.argv[1])
+def add_engine_arguments(parser):
+    """ Spreading options shared by main and the server """
+    parser.add_argument('--engine', choices=[FRONTIER, VECTORIZED, BEST_FIRST, SPARSE, BATCHED], default=FRONTIER,
+                        help='spreading implementation')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='number of worker processes attaching sources in parallel')
+    parser.add_argument('--profile-cache', type=int, default=0, metavar='ENTRIES',
+                        help='cache activation profiles of start nodes, bounded by the number of entries')
+    parser.add_argument('--max-relaxations', type=int, default=None,
+                        help='{} engine: edges relaxed per source'.format(BEST_FIRST))
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='{} engine: spreading time per source'.format(BEST_FIRST))
+    parser.add_argument('--top-k', type=int, default=None,
+                        help='{} engine: stop once the top k synsets above tau_3 are stable'.format(BEST_FIRST))
+    parser.add_argument('--batch-size', type=int, default=256,
+                        help='{} and {} engines: number of sources spread together'.format(SPARSE, BATCHED))
+    parser.add_argument('--batch-width', type=int, default=16,
+                        help='{} engine: number of start vertices spread in one dense block'.format(BATCHED))
 
-    log("Loading paintball graph")
-    graph = load_graph(PAINT_BALL_GRAPH)
-    # graph = None
 
-    log("Loading impedance table")
-    impedance_table = load_impedance_table(IMPEDANCE_TABLE)
+def parse_args():
+    parser = argparse.ArgumentParser(description='Attaches new lemmas to the synset graph')
+    parser.add_argument('knowledge_source', nargs='+',
+                        help='files with source;target;support lines (source\ttarget\tsupport for *.tsv) '
+                             'or a similarity cache (*{})'.format(SIMILARITY_CACHE_EXTENSION))
+    parser.add_argument('--stream', action='store_true',
+                        help='read the knowledge source lazily; lines of a source must be adjacent and '
+                             'many files must be sorted by source')
+    add_engine_arguments(parser)
+    parser.add_argument('--shard-size', type=int, default=64,
+                        help='number of sources sent to a worker at once')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='write per-source metrics to PATH, as JSON for *.json and CSV otherwise')
+    parser.add_argument('--slowest', type=int, default=10,
+                        help='number of the slowest sources summarized when metrics are written')
+    return parser.parse_args()
 
-    log("\nSetting params:")
-    params = Params(
+
+def make_params():
+    return Params(
         mikro=0.80,
         tau_0=0.45,
         epsilon=(0.5 / 4),
         tau_3=1.2,
         tau_4=1
     )
+
+
+def load_paint_ball(args, knowledge_source, tracer, metrics=None):
+    """
+    Loads graphs, the impedance table and synset sizes and sets PaintBall
+    up as given by add_engine_arguments options. Returns (PaintBall, synsets
+    graph).
+    """
+    log("Loading paintball graph")
+    graph = load_graph(PAINT_BALL_GRAPH)
+    # graph = None
+
+    log("Loading impedance table")
+    impedance_table = load_impedance_table(IMPEDANCE_TABLE)
+
+    log("Loading synsets graph")
+    syn_graph = load_graph(SYNSETS_GRAPH)
+
+    log("Loading synset sizes")
+    synset_sizes = load_synset_sizes(SYNSET_SIZES, syn_graph)
+
+    log("\nSetting params:")
+    params = make_params()
     log(params)
 
+    profile_cache = ActivationProfileCache(args.profile_cache) if args.profile_cache else None
+
+    budget = None
+    if args.engine == BEST_FIRST:
+        budget = SpreadingBudget(
+            max_relaxations=args.max_relaxations,
+            max_seconds=args.max_seconds,
+            top_k=args.top_k
+        )
+        log(budget)
+
     pb = PaintBall(
         graph=graph,
         params=params,
         impedance_table=impedance_table,
         knowledge_source=knowledge_source,
-        plwn=PLWN()
+        plwn=None,
+        engine=args.engine,
+        tracer=tracer,
+        profile_cache=profile_cache,
+        synset_sizes=synset_sizes,
+        budget=budget,
+        batch_size=args.batch_size,
+        batch_width=args.batch_width,
+        metrics=metrics
     )
+    return pb, syn_graph
 
-    log("Loading synsets graph")
-    syn_graph = load_graph(SYNSETS_GRAPH)
 
-    log("Run algorithm")
-    pb.run(syn_graph)
+def main():
+    args = parse_args()
+
+    if len(args.knowledge_source) == 1 and args.knowledge_source[0].endswith(SIMILARITY_CACHE_EXTENSION):
+        log("Loading similarity cache")
+        knowledge_source = SimilarityCache(args.knowledge_source[0], tau_0=make_params().tau_0)
+    elif args.stream:
+        knowledge_source = KnowledgeSourceStream(args.knowledge_source)
+    else:
+        log("Loading knowledge source")
+        knowledge_source = load_knowledge_source(args.knowledge_source)
+
+    tracer = JsonlTracer(TRACE_PATH) if TRACE_PATH else NullTracer()
+    metrics = SourceMetrics() if args.metrics else None
+    try:
+        pb, syn_graph = load_paint_ball(args, knowledge_source, tracer, metrics)
+
+        log("Run algorithm")
+        if args.processes > 1:
+            run_parallel(pb, syn_graph, args.processes, args.shard_size)
+        else:
+            pb.run(syn_graph)
+            if pb.profile_cache is not None:
+                sys.stderr.write("Profile cache: {}\n".format(pb.profile_cache.stats()))
+    finally:
+        tracer.close()
+
+    if metrics is not None:
+        metrics.save(args.metrics)
+        sys.stderr.write(metrics.summary(args.slowest) + "\n")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,20 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import argparse
+
+from .similarity_cache import convert_similarities
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Converts similarity lists into a binary similarity cache')
+    parser.add_argument('similarities', nargs='+',
+                        help='files with source;target;score lines, e.g. res/mono_mono_sim.csv')
+    parser.add_argument('cache', help='output file, loaded by main as the knowledge source when named *.pbsim')
+    args = parser.parse_args()
+
+    convert_similarities(args.similarities, args.cache)
+
+
+if __name__ == '__main__':
+    main()
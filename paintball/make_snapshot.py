@@ -0,0 +1,27 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import argparse
+
+from .graph import BaseGraph
+from .graph_delta import read_delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Converts a graph_tool graph into a binary snapshot')
+    parser.add_argument('graph', help='graph_tool graph file, e.g. res/plwn_synsets_graph.xml.gz')
+    parser.add_argument('snapshot', help='output file, loaded by utils.load_graph when named *.pbs')
+    parser.add_argument('--delta', nargs='+', default=[], metavar='PATH',
+                        help='plWordNet diff files applied to the graph before saving, see graph_delta.read_delta')
+    args = parser.parse_args()
+
+    graph = BaseGraph()
+    graph.unpickle(args.graph)
+    for path in args.delta:
+        report = graph.apply_delta(read_delta(path))
+        print('{}: {}'.format(path, report))
+    graph.save_snapshot(args.snapshot)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import csv
+import json
+
+from collections import OrderedDict
+
+START_NODES = 'start_nodes'
+EDGES_RELAXED = 'edges_relaxed'
+MAX_FRONTIER = 'max_frontier'
+Q_SIZE = 'q_size'
+ACTIVATED_SYNSETS = 'activated_synsets'
+COMPONENTS = 'components'
+
+INITIAL_ACTIVATION = 'initial_activation'
+SPREADING = 'spreading'
+SYNSET_AGGREGATION = 'synset_aggregation'
+SUBGRAPH_SEARCH = 'subgraph_search'
+PHASES = [INITIAL_ACTIVATION, SPREADING, SYNSET_AGGREGATION, SUBGRAPH_SEARCH]
+
+FIELDS = ['source', START_NODES, EDGES_RELAXED, MAX_FRONTIER, Q_SIZE, ACTIVATED_SYNSETS, COMPONENTS] + \
+    ['seconds_' + phase for phase in PHASES] + ['seconds']
+
+
+class NullMetrics(object):
+    """
+    Metrics recorder doing nothing. As with tracers, PaintBall checks the
+    enabled flag before measuring anything.
+    """
+
+    enabled = False
+
+    def begin_source(self, source):
+        pass
+
+    def set(self, name, value):
+        pass
+
+    def add(self, name, value):
+        pass
+
+    def maximum(self, name, value):
+        pass
+
+    def phase(self, name, seconds):
+        pass
+
+    def end_source(self):
+        pass
+
+
+class SourceMetrics(NullMetrics):
+    """
+    Records one row of FIELDS per attached source: the number of start
+    nodes, edges relaxed and the largest number of states expanded at one
+    level (by a single start node in the frontier engine, waiting in the
+    heap in the best-first one), sizes of Q, of activated synsets and the
+    number of components, and seconds spent in each of PHASES and in total.
+
+    Edges of start nodes whose activation profile was taken from the cache
+    are not relaxed, so they are not counted. The sparse and batched engines
+    spread a batch of sources at once, each of them is given an even share
+    of the spreading time.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.records = []
+        self._record = None
+
+    def begin_source(self, source):
+        self._record = OrderedDict((field, 0) for field in FIELDS)
+        self._record['source'] = source
+        for phase in PHASES:
+            self._record['seconds_' + phase] = 0.0
+
+    def set(self, name, value):
+        self._record[name] = value
+
+    def add(self, name, value):
+        self._record[name] += value
+
+    def maximum(self, name, value):
+        self._record[name] = max(self._record[name], value)
+
+    def phase(self, name, seconds):
+        self._record['seconds_' + name] += seconds
+
+    def end_source(self):
+        record = self._record
+        record['seconds'] = sum(record['seconds_' + phase] for phase in PHASES)
+        self.records.append(record)
+        self._record = None
+
+    def take(self):
+        """ Returns the records and forgets them, used by worker processes """
+        records, self.records = self.records, []
+        return records
+
+    def extend(self, records):
+        self.records.extend(records)
+
+    def slowest(self, n):
+        return sorted(self.records, key=lambda record: record['seconds'], reverse=True)[:n]
+
+    def summary(self, n=10):
+        """ Table of the n slowest sources """
+        lines = ["{} sources, {:.3f}s in total, the slowest {}:".format(
+            len(self.records), sum(record['seconds'] for record in self.records), min(n, len(self.records)))]
+        lines.append("{:>10} {:>10} {:>10} {:>10} {:>8} {:>8}  {}".format(
+            'seconds', 'spreading', 'starts', 'relaxed', 'frontier', 'synsets', 'source'))
+        for record in self.slowest(n):
+            lines.append("{:>10.4f} {:>10.4f} {:>10} {:>10} {:>8} {:>8}  {}".format(
+                record['seconds'],
+                record['seconds_' + SPREADING],
+                record[START_NODES],
+                record[EDGES_RELAXED],
+                record[MAX_FRONTIER],
+                record[ACTIVATED_SYNSETS],
+                record['source']
+            ))
+        return "\n".join(lines)
+
+    def write_csv(self, f):
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for record in self.records:
+            writer.writerow([record[field] for field in FIELDS])
+
+    def write_json(self, f):
+        json.dump(self.records, f, indent=1)
+
+    def save(self, path):
+        """ Writes records to path as JSON for *.json files, as CSV otherwise """
+        with open(path, 'w') as f:
+            if path.endswith('.json'):
+                self.write_json(f)
+            else:
+                self.write_csv(f)
@@ -1,14 +1,30 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import heapq
+import itertools
 import operator
 import logging
+import time
 
-import graph_tool as gt
-from graph_tool.topology import label_largest_component
+import numpy as np
+import scipy.sparse as sp
 
 from collections import defaultdict, OrderedDict
 
+from activations import DenseActivations, SparseActivations
+from batch_spreading import BatchSpreader
+from budget import EXHAUSTED, RELAXATIONS, TIME, TOP_K, SpreadingBudget, SpreadingReport
+from metrics import (NullMetrics, START_NODES, EDGES_RELAXED, MAX_FRONTIER, Q_SIZE, ACTIVATED_SYNSETS, COMPONENTS,
+                     INITIAL_ACTIVATION, SPREADING, SYNSET_AGGREGATION, SUBGRAPH_SEARCH)
+from paths import group_paths
+from relations import RelationIndex, compile_impedance, compile_transmitance
+from sparse_operator import SpreadingOperator
+from sweep import SpreadingRecord
+from synset_mapping import SynsetMapping
+from profile_cache import ActivationProfile
+from tracing import NullTracer
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,6 +57,13 @@ class Params(object):
             )
 
 
+FRONTIER = 'frontier'
+VECTORIZED = 'vectorized'
+BEST_FIRST = 'best_first'
+SPARSE = 'sparse'
+BATCHED = 'batched'
+
+
 class PaintBall:
     """
     µ (mikro) – a decay factor, defines what portion of activity is spread the next node, applied with each traversed
@@ -55,10 +78,58 @@ class PaintBall:
 
     τ4 (tau_4) – strong support threshold
 
+    engine – spreading implementation; FRONTIER expands (vertex, relation,
+    path activation) states one level at a time, walking the CSR arrays of
+    the graph as lists, VECTORIZED does the same with NumPy operations, for
+    all start nodes of a source at once;
+    BEST_FIRST expands the most activated pending states first and stops
+    when the budget is spent; SPARSE multiplies state activations of a
+    batch of sources by a sparse spreading operator, see
+    sparse_operator.SpreadingOperator; BATCHED spreads start vertices of a
+    batch of sources in dense blocks of batch_width columns, sharing the
+    traversal of every edge and the columns of start nodes of the same
+    vertex, see batch_spreading.BatchSpreader. With the
+    last two, run attaches batch_size sources at once.
+
+    tracer – receives every expanded state (vertex, relation id, activation)
+    of each source, see tracing.JsonlTracer; nothing is traced by default.
+
+    profile_cache – profile_cache.ActivationProfileCache reused by the
+    FRONTIER engine across sources; profiles taken from the cache are not
+    traced.
+
+    synset_sizes – synset_sizes.SynsetSizeTable used by synset_activation;
+    without it sizes are looked up one by one in plwn.
+
+    budget – budget.SpreadingBudget of the BEST_FIRST engine, unlimited by
+    default, so that all paths are spread as with the other engines; the
+    outcome of the last spreading is kept in spread_report.
+
+    metrics – receives sizes and phase timings of every attached source, see
+    metrics.SourceMetrics; nothing is measured by default.
+
     """
 
-    def __init__(self, graph, params, impedance_table, knowledge_source, plwn):
+    def __init__(self, graph, params, impedance_table, knowledge_source, plwn, engine=FRONTIER,
+                 tracer=None, profile_cache=None, synset_sizes=None, budget=None, batch_size=256, metrics=None,
+                 batch_width=16):
+        if engine not in (FRONTIER, VECTORIZED, BEST_FIRST, SPARSE, BATCHED):
+            raise ValueError('Unknown spreading engine: {}'.format(engine))
+        if profile_cache is not None and engine != FRONTIER:
+            raise ValueError('Activation profiles are only cached by the {} engine'.format(FRONTIER))
+        if budget is not None and engine != BEST_FIRST:
+            raise ValueError('A spreading budget is only used by the {} engine'.format(BEST_FIRST))
+        if engine in (SPARSE, BATCHED) and tracer is not None and tracer.enabled:
+            raise ValueError('Tracing is not supported by the {} engine'.format(engine))
+
         self.graph = graph
+        self.engine = engine
+        self.tracer = tracer or NullTracer()
+        self.metrics = metrics or NullMetrics()
+        self.profile_cache = profile_cache
+        self.budget = budget or SpreadingBudget()
+        self.spread_report = None
+        self.batch_size = batch_size
 
         self.decay = params.mikro
         self.tau_0 = params.tau_0
@@ -69,9 +140,76 @@ class PaintBall:
         self._transmitance_dict = self.make_transmitance_dict()
         self._init_transmitance()
         self._impedance_table = impedance_table
+        self._impedance = compile_impedance(impedance_table, self._relations)
+        self._impedance_rows = self._impedance.tolist()
         self._knowledge_source = knowledge_source
 
+        self.batch_width = batch_width
+        self._init_spreading(rebuild=True)
+        if engine in (FRONTIER, VECTORIZED, BEST_FIRST):
+            # Q of the current source, reset after every spreading
+            self._activations = DenseActivations(self._csr.num_vertices)
+        # aggregates Q to synsets and finds their nodes in synset graphs
+        self.synset_mapping = SynsetMapping.from_graph(self.graph)
+
         self.plwn = plwn
+        self.synset_sizes = synset_sizes
+
+    def _init_spreading(self, rebuild):
+        """
+        Sets up CSR arrays of the engine for the current graph, rebuild the
+        CSR arrays after edge weights were set.
+        """
+        engine = self.engine
+        self._csr = self.graph.csr(rebuild=rebuild)
+        self._csr_rel = self._relations.positions(self._csr.rel_ids)
+        if engine == FRONTIER:
+            # plain lists are indexed faster than NumPy arrays in the frontier loop
+            self._out_offsets = self._csr.offsets.tolist()
+            self._out_targets = self._csr.targets.tolist()
+            self._out_rels = self._csr_rel.tolist()
+        if engine == SPARSE:
+            self._batch_spreader = SpreadingOperator(self._csr, self._csr_rel, self._impedance, self.decay)
+        if engine == BATCHED:
+            self._batch_spreader = BatchSpreader(
+                self._csr, self._csr_rel, self._impedance, self.decay, self.batch_width)
+
+    def apply_delta(self, delta):
+        """
+        Applies a graph_delta.GraphDelta to the lexical unit graph, see
+        BaseGraph.apply_delta, which gives added edges the transmittance of
+        their relations as weights. Relation positions are set for the
+        added edges only, unless the delta brings relations new to the
+        graph: these move the positions of all relations, so positions,
+        weights and the impedance matrix are then compiled again for all
+        edges. The synset mapping and the accumulator are patched for the
+        added and removed vertices, while the CSR arrays of the engine are
+        set up again from the CSR arrays of the graph.
+
+        Cached activation profiles that reached a vertex whose edges
+        changed are dropped, their start vertices are listed in
+        invalid_starts of the returned report.
+        """
+        report = self.graph.apply_delta(delta, self._transmitance_dict)
+
+        added_edges = np.array(report.added_edges, dtype=np.int64)
+        rel_ids = np.asarray(self.graph.get_edge_attribute_array('rel_id'))[added_edges]
+        if all(rel_id in self._relations for rel_id in set(rel_ids.tolist())):
+            self.graph.get_edge_attribute_array('rel_idx')[added_edges] = self._relations.positions(rel_ids)
+        else:
+            self._init_transmitance()
+            self._impedance = compile_impedance(self._impedance_table, self._relations)
+            self._impedance_rows = self._impedance.tolist()
+        self._init_spreading(rebuild=False)
+
+        vertices = np.array(report.added_vertices + report.removed_vertices, dtype=np.int64)
+        self.synset_mapping.update(vertices, np.asarray(self.graph.get_node_attribute_array('synset_id'))[vertices])
+        if self.engine in (FRONTIER, VECTORIZED, BEST_FIRST):
+            self._activations.resize(self._csr.num_vertices)
+
+        if self.profile_cache is not None:
+            report.invalid_starts = self.profile_cache.invalidate(report.touched_vertices().tolist())
+        return report
 
     @staticmethod
     def make_transmitance_dict():
@@ -92,187 +230,640 @@ class PaintBall:
         return transmitance
 
     def _init_transmitance(self, edge_weight=1.0):
+        """
+        Remaps relation ids of the graph to contiguous positions, stored in
+        the 'rel_idx' edge attribute, and sets edge weights from the dense
+        transmittance vector.
+        """
         self.graph.create_edge_attribute('weight', 'float', value=edge_weight)
+        self.graph.create_edge_attribute('rel_idx', 'int')
 
-        for edge in self.graph.all_edges():
-            try:
-                edge.weight = self._transmitance_dict[edge.rel_id]
-            except KeyError:
-                edge.weight = 0
+        rel_ids = self.graph.get_edge_attribute_array('rel_id')
+        self._relations = RelationIndex(rel_ids)
+        self._transmitance = compile_transmitance(self._transmitance_dict, self._relations)
+        # plain lists are indexed faster than NumPy arrays in the frontier loop
+        self._transmitance_values = self._transmitance.tolist()
+
+        rel_idx = self._relations.positions(rel_ids)
+        self.graph.set_edge_attribute_array('rel_idx', rel_idx)
+        self.graph.set_edge_attribute_array('weight', self._transmitance[rel_idx])
 
     def _setup_initial_activation(self, lemma_activations):
-        Q = defaultdict(float)
+        """ Start vertices with activation above tau_0, the most activated first """
+        Q = SparseActivations()
 
         for la in lemma_activations:
             for node in la.nodes:
-                Q[node] += la.activation
+                Q.add(int(node), la.activation)
 
-        T = {node: activation for node, activation in Q.items() if activation > self.tau_0}
+        T = {vertex: activation for vertex, activation in Q.items() if activation > self.tau_0}
         T = OrderedDict(sorted(T.items(), key=operator.itemgetter(1), reverse=True))
         return T
 
-    def _act_replication(self, node, activation_value, Q):
-        log("\n# NODE {} : {:>15} - activation: {:>3} - lu_id: {:>5} #".format(node, node.lu.lemma, activation_value, node.lu.lu_id))
-        log("EDGES: ")
-        for edge in node.all_edges():
-            log("{:>20} ===> {:>20} lu_id: {:>5} node_id: {:>5} - weight: {:>3} - relation_id: {:>3} -".format(
-                node.lu.lemma, edge.target().lu.lemma, edge.target().lu.lu_id, edge.target(), edge.weight, edge.rel_id))
+    def _act_replication(self, vertex, activation_value, Q):
+        """
+        Spreads activation from the start vertex level by level, adding it
+        to the activation accumulator Q.
+
+        As in the recursive version, every path is cut off on its own once
+        its activation falls below epsilon, and each path adds its
+        activation to the vertices it reaches. Paths arriving at the same
+        (vertex, incoming relation) state within a level with the same
+        activation have the same continuations, so they are expanded once
+        as a (vertex, relation, activation) state counting them, and the
+        cost depends on the number of distinct states reached instead of
+        the number of paths. Transmittance and impedance do not exceed 1,
+        so the activation of a path falls by at least the decay with each
+        edge and spreading ends on cycles, e.g. of synonymy, too.
+        """
+        tracer = self.tracer
+        metrics = self.metrics
+        vertex = int(vertex)
 
         if activation_value < self.epsilon:
-            log("Returning act_replication")
             return
 
-        for edge in node.all_edges():
-            self._act_rep_trans(node, edge, self._f_T(edge, self.decay * activation_value), Q)
-
-    def _act_rep_trans(self, node, edge, activation_value, Q):
-        if node == edge.target():
-            log("The same")
-            return
-        node = edge.target()
-        log("\n# NODE {} : {:>15} - activation: {:>3} - lu_id: {:>5} #".format(node, node.lu.lemma, activation_value, node.lu.lu_id))
-        log("EDGES: ")
-        for edge in node.all_edges():
-            log("{:>20} ===> {:>20} lu_id: {:>5} node_id: {:>5} - weight: {:>3} - relation_id: {:>3} -".format(edge.source().lu.lemma, edge.target().lu.lemma, edge.target().lu.lu_id, edge.target(), edge.weight, edge.rel_id))
-
-        if activation_value < self.epsilon:            
-            log("Returning act_rep_trans")
+        if tracer.enabled:
+            tracer.visit(vertex, -1, activation_value)
+        if metrics.enabled:
+            self._record_level([vertex])
+
+        frontier = self._act_rep_trans(vertex, self._relations.start, activation_value, 1.0, defaultdict(float))
+        while frontier:
+            if metrics.enabled:
+                self._record_level([vertex for vertex, _, _ in frontier])
+            next_frontier = defaultdict(float)
+            for (vertex, rel_idx, activation_value), paths in frontier.items():
+                if tracer.enabled:
+                    tracer.visit(vertex, self._relations.rel_ids[rel_idx], activation_value * paths)
+                Q.add(vertex, activation_value * paths)
+                self._act_rep_trans(vertex, rel_idx, activation_value, paths, next_frontier)
+            frontier = next_frontier
+
+    def _record_level(self, vertices):
+        """ Records a level of states of the frontier or vectorized engine, expanded at the given vertices """
+        offsets = self._csr.offsets
+        vertices = np.array(vertices, dtype=np.int64)
+        self.metrics.maximum(MAX_FRONTIER, len(vertices))
+        self.metrics.add(EDGES_RELAXED, int((offsets[vertices + 1] - offsets[vertices]).sum()))
+
+    def _act_rep_trans(self, vertex, in_rel_idx, activation_value, paths, frontier):
+        """
+        Transmits activation of the paths of a (vertex, in_rel_idx,
+        activation_value) state through all outgoing edges of the vertex,
+        adding the paths to the states they reach in the next frontier and
+        skipping transmissions below epsilon. Relations are given as
+        positions of the relation index, the start position marks a start
+        vertex. Self-loops are not in the CSR arrays, so they are never
+        followed.
+        """
+        impedance = self._impedance_rows[in_rel_idx]
+        transmitance = self._transmitance_values
+        targets = self._out_targets
+        rels = self._out_rels
+        epsilon = self.epsilon
+        decayed = self.decay * activation_value
+
+        begin, end = self._out_offsets[vertex], self._out_offsets[vertex + 1]
+        for target, rel_idx in zip(targets[begin:end], rels[begin:end]):
+            value = impedance[rel_idx] * (transmitance[rel_idx] * decayed)
+            if value >= epsilon:
+                frontier[(target, rel_idx, value)] += paths
+
+        return frontier
+
+    def _act_replication_cached(self, vertex, activation_value, Q):
+        """
+        Adds the activation profile of the start vertex, scaled by its
+        activation, to Q. The profile is taken from the cache if it is valid
+        for the cutoff, see ActivationProfile.
+        """
+        if activation_value < self.epsilon:
             return
 
-        for edge_prim in edge.target().all_edges():
-            self._act_rep_trans(node, edge_prim, self._f_I(edge, edge_prim, self._f_T(edge_prim, self.decay * activation_value)), Q)
-
-        Q[edge.target()] = Q[edge.target()] + activation_value
-
-    def _f_T(self, edge, activation_value):
-        return edge.weight * activation_value
-
-    def _f_I(self, edge_in, edge_out, activation_value):
-        val = self._get_impedance(edge_in.rel_id, edge_out.rel_id) * activation_value
-        log("{} {} impedance {}  activation {} \n".format(edge_in.rel_id, edge_out.rel_id, val, activation_value))
-
-        return self._get_impedance(edge_in.rel_id, edge_out.rel_id) * activation_value
-
-    def _get_impedance(self, in_rel_id, out_rel_id):
-        try:
-            return self._impedance_table[in_rel_id][out_rel_id]
-        except KeyError:
-            return 1
+        vertex = int(vertex)
+        cutoff = self.epsilon / activation_value
+        profile = self.profile_cache.get(vertex, cutoff)
+        if profile is None:
+            profile = self._make_profile(vertex, cutoff)
+            self.profile_cache.put(vertex, profile)
+
+        profile.add_to(Q, activation_value)
+
+    def _make_profile(self, vertex, cutoff):
+        """
+        Spreads activation 1 from the start vertex as _act_replication does,
+        with the cutoff in place of epsilon.
+        """
+        Q = SparseActivations()
+        bounds = [0.0, float('inf')]
+
+        if self.metrics.enabled:
+            self._record_level([vertex])
+        frontier = self._profile_trans(vertex, self._relations.start, 1.0, 1.0, cutoff, defaultdict(float), bounds)
+        while frontier:
+            if self.metrics.enabled:
+                self._record_level([vertex for vertex, _, _ in frontier])
+            next_frontier = defaultdict(float)
+            for (vertex, rel_idx, activation_value), paths in frontier.items():
+                Q.add(vertex, activation_value * paths)
+                self._profile_trans(vertex, rel_idx, activation_value, paths, cutoff, next_frontier, bounds)
+            frontier = next_frontier
+
+        items = Q.items()
+        return ActivationProfile(
+            nodes=[vertex for vertex, _ in items],
+            activations=[activation_value for _, activation_value in items],
+            lower=bounds[0],
+            upper=bounds[1]
+        )
+
+    def _profile_trans(self, vertex, in_rel_idx, activation_value, paths, cutoff, frontier, bounds):
+        """
+        _act_rep_trans recording the largest dropped and the smallest kept
+        transmission of a single path in bounds.
+        """
+        impedance = self._impedance_rows[in_rel_idx]
+        transmitance = self._transmitance_values
+        targets = self._out_targets
+        rels = self._out_rels
+        decayed = self.decay * activation_value
+
+        begin, end = self._out_offsets[vertex], self._out_offsets[vertex + 1]
+        for target, rel_idx in zip(targets[begin:end], rels[begin:end]):
+            value = impedance[rel_idx] * (transmitance[rel_idx] * decayed)
+            if value >= cutoff:
+                frontier[(target, rel_idx, value)] += paths
+                bounds[1] = min(bounds[1], value)
+            elif value > bounds[0]:
+                bounds[0] = value
+
+        return frontier
+
+    def _spread(self, T):
+        if self.engine in (FRONTIER, VECTORIZED, BEST_FIRST):
+            # left over only if the previous spreading was interrupted
+            self._activations.reset()
+        if self.engine == VECTORIZED:
+            return self._spread_vectorized(T)
+        if self.engine == BEST_FIRST:
+            return self._spread_best_first(T)
+        if self.engine in (SPARSE, BATCHED):
+            if not self.metrics.enabled:
+                return self._spread_batch([T])[0]
+            source_stats = []
+            Q = self._spread_batch([T], source_stats)[0]
+            self.metrics.add(EDGES_RELAXED, source_stats[0][0])
+            self.metrics.maximum(MAX_FRONTIER, source_stats[0][1])
+            return Q
+
+        Q = self._activations
+        for start_vertex, activation_value in T.items():
+            if self.profile_cache is None:
+                self._act_replication(start_vertex, activation_value, Q)
+            else:
+                self._act_replication_cached(start_vertex, activation_value, Q)
+        return self._take_activations()
+
+    def _take_activations(self):
+        """ Q of the accumulator as (vertices, activations) arrays, the accumulator is reset for the next source """
+        Q = self._activations.arrays()
+        self._activations.reset()
+        return Q
+
+    def _spread_vectorized(self, T):
+        """
+        Array counterpart of _act_replication run for all start nodes of T
+        together. States are (start node, node, incoming relation, path
+        activation) with the number of paths in them, so activation of
+        different start nodes is never merged and every path is cut off on
+        its own, just as with the frontier engine.
+        """
+        vertices = np.array([int(node) for node in T.keys()], dtype=np.int64)
+        activations = np.array(list(T.values()), dtype=np.float64)
+        active = activations >= self.epsilon
+
+        vertices = vertices[active]
+        activations = activations[active]
+        paths = np.ones(len(vertices))
+        starts = np.arange(len(vertices))
+        rels = np.full(len(vertices), self._relations.start, dtype=np.int64)
+
+        if self.tracer.enabled:
+            self.tracer.visit_many(vertices, np.full(len(vertices), -1), activations)
+
+        Q = self._activations
+        while len(vertices):
+            if self.metrics.enabled:
+                self._record_level(vertices)
+            (_, owners, _, merged), (starts, vertices, rels, activations) = \
+                self._expand_level(starts, vertices, rels, activations)
+            paths = np.bincount(merged, weights=paths[owners], minlength=len(vertices))
+
+            Q.add_many(vertices, activations * paths)
+            if self.tracer.enabled:
+                self.tracer.visit_many(vertices, self._relations.rel_ids[rels], activations * paths)
+
+        return self._take_activations()
+
+    def _expand_level(self, starts, vertices, rels, activations):
+        """
+        Expands a level of (start node, node, incoming relation, path
+        activation) states, given as arrays, of the vectorized engine and of
+        record_spreading. Activation is transmitted through all out-edges,
+        paths falling below epsilon are dropped and the rest are grouped by
+        the state they reach. Returns the transmissions, as (edges, owners,
+        impedance, merged) arrays holding the edge, the position of the
+        expanded state, the impedance met and the position of the reached
+        state, and the reached states as (starts, vertices, rels,
+        activations).
+        """
+        csr = self._csr
+        num_vertices = csr.num_vertices
+        num_rels = len(self._relations)
+
+        edges, owners = csr.out_edges(vertices)
+        impedance = self._impedance[rels[owners], self._csr_rel[edges]]
+        values = self.decay * activations[owners] * csr.weights[edges] * impedance
+
+        transmitted = values >= self.epsilon
+        edges = edges[transmitted]
+        owners = owners[transmitted]
+        keys = (starts[owners] * num_vertices + csr.targets[edges]) * num_rels + self._csr_rel[edges]
+
+        keys, activations, merged = group_paths(keys, values[transmitted])
+        states = (keys // num_rels // num_vertices, keys // num_rels % num_vertices, keys % num_rels, activations)
+        return (edges, owners, impedance[transmitted], merged), states
+
+    def record_spreading(self, T):
+        """
+        Spreads T as _spread_vectorized does and returns the expanded states
+        with the transmissions between them as a SpreadingRecord, which
+        replays the spreading for stricter settings, see sweep.ParamSweep.
+        Needs the VECTORIZED engine.
+        """
+        if self.engine != VECTORIZED:
+            raise ValueError('Spreading is only recorded by the {} engine'.format(VECTORIZED))
+
+        vertices = np.array([int(node) for node in T.keys()], dtype=np.int64)
+        activations = np.array(list(T.values()), dtype=np.float64)
+        active = activations >= self.epsilon
+        record = SpreadingRecord(vertices[active], activations[active], [])
+
+        vertices = record.vertices
+        activations = record.activations
+        starts = np.arange(len(vertices))
+        rels = np.full(len(vertices), self._relations.start, dtype=np.int64)
+
+        while len(vertices):
+            (edges, owners, impedance, merged), (starts, vertices, rels, activations) = \
+                self._expand_level(starts, vertices, rels, activations)
+            if len(vertices):
+                record.levels.append((owners, self._csr.weights[edges], impedance, merged, vertices))
+
+        return record
+
+    def _spread_best_first(self, T):
+        """
+        Expands pending states, kept in a heap, the most activated paths
+        first, until nothing is left or the budget is spent. States are
+        (start node, node, incoming relation, path activation), so as in
+        the level by level engines every path is cut off on its own and
+        paths with equal activation are counted in one state. Activation of
+        a path falls with every edge, so all paths into a state are counted
+        before it is expanded, and spreading ends without a budget too.
+        Stores a SpreadingReport in spread_report.
+        """
+        budget = self.budget
+        tracer = self.tracer
+        csr = self._csr
+        start_rel = self._relations.start
+        track_synsets = budget.top_k is not None
+        vertex_synsets = self.synset_mapping.vertex_synsets
+        started = time.time()
+
+        pending = {}
+        heap = []
+        for start, (node, activation_value) in enumerate(T.items()):
+            if activation_value >= self.epsilon:
+                key = (start, int(node), start_rel, activation_value)
+                pending[key] = 1.0
+                heap.append((-activation_value, key))
+        heapq.heapify(heap)
+
+        Q = self._activations
+        Q_synset = SparseActivations()
+        expansions = relaxations = 0
+        stopped_by = EXHAUSTED
+        top, stable = None, 0
+
+        while heap:
+            if budget.max_relaxations is not None and relaxations >= budget.max_relaxations:
+                stopped_by = RELAXATIONS
+                break
+            if budget.max_seconds is not None and time.time() - started >= budget.max_seconds:
+                stopped_by = TIME
+                break
+
+            _, key = heapq.heappop(heap)
+            if self.metrics.enabled:
+                self.metrics.maximum(MAX_FRONTIER, len(pending))
+            paths = pending.pop(key)
+            start, vertex, rel_idx, path_value = key
+            activation_value = path_value * paths
+            expansions += 1
+
+            if rel_idx != start_rel:
+                if tracer.enabled:
+                    tracer.visit(vertex, self._relations.rel_ids[rel_idx], activation_value)
+                Q.add(vertex, activation_value)
+                if track_synsets and vertex_synsets[vertex] != -1:
+                    Q_synset.add(vertex_synsets[vertex], activation_value)
+            elif tracer.enabled:
+                tracer.visit(vertex, -1, activation_value)
+
+            edges = np.arange(csr.offsets[vertex], csr.offsets[vertex + 1])
+            relaxations += len(edges)
+            values = self.decay * path_value * csr.weights[edges] * \
+                self._impedance[rel_idx, self._csr_rel[edges]]
+            transmitted = values >= self.epsilon
+            for target, target_rel, value in zip(csr.targets[edges][transmitted].tolist(),
+                                                 self._csr_rel[edges][transmitted].tolist(),
+                                                 values[transmitted].tolist()):
+                next_key = (start, target, target_rel, value)
+                if next_key in pending:
+                    pending[next_key] += paths
+                else:
+                    pending[next_key] = paths
+                    heapq.heappush(heap, (-value, next_key))
+
+            if track_synsets and expansions % budget.check_every == 0:
+                current = self._top_synsets(Q_synset, budget.top_k)
+                stable = stable + 1 if current is not None and current == top else 0
+                top = current
+                if stable >= budget.patience:
+                    stopped_by = TOP_K
+                    break
+
+        self.spread_report = SpreadingReport(
+            expansions=expansions,
+            relaxations=relaxations,
+            seconds=time.time() - started,
+            stopped_by=stopped_by,
+            unexpanded_mass=sum(key[3] * paths for key, paths in pending.items()),
+            unexpanded_states=len(pending)
+        )
+        log(self.spread_report)
+        self.metrics.add(EDGES_RELAXED, relaxations)
+
+        return self._take_activations()
+
+    def _top_synsets(self, Q_synset, k):
+        """ Indices of the k most activated synsets above tau_3, None if there are fewer """
+        top = Q_synset.top_k(k)
+        if len(top) < k or top[-1][1] <= self.tau_3:
+            return None
+        return frozenset(synset_id for synset_id, _ in top)
+
+    def _spread_batch(self, Ts, source_stats=None):
+        """
+        Spreads initial activations of many sources with the sparse
+        operator or the batch spreader. Every start node gets its own
+        column of the result, so as in the other engines activation of
+        different start nodes is never merged.
+
+        Given a source_stats list, appends (edges relaxed, max frontier) of
+        every source to it.
+        """
+        vertices = []
+        activations = []
+        owners = []
+        for i, T in enumerate(Ts):
+            for node, activation_value in T.items():
+                vertices.append(int(node))
+                activations.append(activation_value)
+                owners.append(i)
+
+        stats = {} if source_stats is not None else None
+        per_start = self._batch_spreader.spread(vertices, activations, self.epsilon, stats)
+        per_source = per_start.dot(sp.csr_matrix(
+            (np.ones(len(owners)), (np.arange(len(owners)), owners)),
+            shape=(len(owners), len(Ts))
+        )).tocsc()
+
+        if stats is not None:
+            owners = np.array(owners, dtype=np.int64)
+            relaxations = np.bincount(owners, weights=stats['relaxations'], minlength=len(Ts))
+            frontiers = np.zeros(len(Ts))
+            for level in stats['levels']:
+                frontiers = np.maximum(frontiers, np.bincount(owners, weights=level, minlength=len(Ts)))
+            source_stats.extend(zip(relaxations.astype(np.int64).tolist(), frontiers.astype(np.int64).tolist()))
+
+        Qs = []
+        for i in range(len(Ts)):
+            column = per_source.getcol(i)
+            activated = column.data != 0
+            Qs.append((column.indices[activated].astype(np.int64), column.data[activated]))
+        return Qs
 
     def find_place_in_graph(self, Q, syn_graph):
+        metrics = self.metrics
+        if metrics.enabled:
+            started = time.time()
+
         Q_synset = self.synset_activation(Q)
+        if metrics.enabled:
+            metrics.phase(SYNSET_AGGREGATION, time.time() - started)
+            metrics.set(Q_SIZE, len(Q[0]))
+            metrics.set(ACTIVATED_SYNSETS, len(Q_synset))
+            started = time.time()
 
-        log("\nQ_synset:")
-        for synset_id, activation in Q_synset.iteritems():
-            log("{} {}".format(synset_id, activation))
+        if logger.isEnabledFor(logging.INFO):
+            log("\nQ_synset:")
+            for synset_id, activation in Q_synset.items():
+                log("{} {}".format(synset_id, activation))
 
         lead_nodes = self.find_subgraphs(Q_synset, syn_graph)
+        if metrics.enabled:
+            metrics.phase(SUBGRAPH_SEARCH, time.time() - started)
+            metrics.set(COMPONENTS, len(lead_nodes))
         return lead_nodes
 
     def synset_activation(self, Q):
-        _Q_synset = defaultdict(float)
-
-        for node, activation_value in Q.iteritems():
-            synset_id = node.synset_id
-            if synset_id != -1:
-                _Q_synset[synset_id] += activation_value
-
-        Q_synset = defaultdict(float)
-        for synset_id, activation_value in _Q_synset.iteritems():
-            activated = self._delta(1, activation_value, self.plwn.synset_len(synset_id))
-            if activated:
-                Q_synset[synset_id] = activation_value
-
-        return Q_synset
-
-    def find_subgraphs(self, Q_synset, syn_graph):
-        nodes = dict()
-
-        for syn_id, activation_value in Q_synset.iteritems():
-            if activation_value > self.tau_3:
-                try:
-                    node = syn_graph.get_node_for_synset_id(syn_id)
-                    nodes[node.use_graph_tool()] = node
-                except Exception:
-                    continue
-
-        filt = syn_graph.use_graph_tool().new_vertex_property('boolean')
-        for vertex, node in nodes.iteritems():
-            filt[vertex] = True
-
-        g = gt.GraphView(syn_graph.use_graph_tool(), filt)
-
-        lead_nodes = []
-        for graph in self.subgraphs(g):
-            lead = None
-            for vertex in graph.vertices():
-                if not lead:
-                    lead = nodes[vertex]
-                else:
-                    lead_id = lead.synset.synset_id
-                    new_id = nodes[vertex].synset.synset_id
-                    if Q_synset[lead_id] < Q_synset[new_id]:
-                        lead = nodes[vertex]
-            lead_nodes.append(lead)
-
-        return lead_nodes
-
-    def subgraphs(self, g):
-        if g.num_vertices() == 0:
-            raise StopIteration
-        prop = label_largest_component(g, False)
-        filt = g.new_vertex_property('boolean')
-        for v in g.vertices():
-            if prop[v] > 0:
-                filt[v] = True
-        yield gt.GraphView(g, filt)
-
-        filt = g.new_vertex_property('boolean')
-        for v in g.vertices():
-            if prop[v] <= 0:
-                filt[v] = True
-        gv = gt.GraphView(g, filt)
-
-        for sgv in self.subgraphs(gv):
-            yield sgv
+        """
+        Sums activation of Q, (vertices, activations) arrays as the engines
+        return it, per synset and returns synset id -> activation of synsets
+        passing _delta.
+        """
+        vertices, activations = Q
+        indices, activations = self.synset_mapping.aggregate(vertices, activations)
+        synset_ids = self.synset_mapping.synset_ids[indices]
+        activated = self._delta(1, activations, self._synset_sizes(synset_ids))
+
+        return defaultdict(float, zip(synset_ids[activated].tolist(), activations[activated].tolist()))
+
+    def _synset_sizes(self, synset_ids):
+        if self.synset_sizes is not None:
+            return self.synset_sizes.sizes_of(synset_ids)
+        return np.array([self.plwn.synset_len(synset_id) for synset_id in synset_ids.tolist()], dtype=np.int32)
+
+    def find_subgraphs(self, Q_synset, syn_graph, tau_3=None):
+        return [lead for lead, _ in self.find_components(Q_synset, syn_graph, tau_3)]
+
+    def find_components(self, Q_synset, syn_graph, tau_3=None):
+        """
+        Splits synsets activated above tau_3, of the params unless given,
+        into connected components of syn_graph. Returns (lead node,
+        component nodes) pairs, the lead being the most activated synset of
+        its component.
+        """
+        if tau_3 is None:
+            tau_3 = self.tau_3
+
+        synset_ids = np.fromiter(Q_synset.keys(), np.int64, len(Q_synset))
+        values = np.fromiter(Q_synset.values(), np.float64, len(Q_synset))
+        above = values > tau_3
+
+        indices = self.synset_mapping.indices_of(synset_ids[above])
+        vertices = np.full(len(indices), -1, dtype=np.int64)
+        known = indices != -1
+        vertices[known] = self.synset_mapping.synset_vertices(syn_graph)[indices[known]]
+        found = vertices != -1
+        activations = dict(
+            (syn_graph.node_for_vertex(vertex), activation_value)
+            for vertex, activation_value in zip(vertices[found].tolist(), values[above][found].tolist())
+        )
+
+        return [
+            (max(component, key=activations.get), component)
+            for component in syn_graph.connected_components(activations.keys())
+        ]
 
     def _delta(self, h, n, s):
+        """
+        Activation test of synsets, n and s can be arrays of activations and
+        synset sizes, the result is then a boolean mask.
+        """
         n_limit = 1.2  # 1.5
         n_limit_2 = 2  # 2
 
-        if ((n >= n_limit * h) and (s <= 2)) or ((n >= n_limit_2 * h) and s > 2):
-            return True
-        else:
-            return False
+        return ((n >= n_limit * h) & (s <= 2)) | ((n >= n_limit_2 * h) & (s > 2))
+
+    @property
+    def knowledge_source(self):
+        return self._knowledge_source
+
+    def attach(self, source, targets_supports, syn_graph):
+        """
+        Finds lead nodes of syn_graph for a single source lemma supported by
+        (target lemma, support) pairs.
+        """
+        log("\nAttach - {} - to {} lemmas".format(source, len(targets_supports)))
+        metrics = self.metrics
+        metrics.begin_source(source)
+        self.tracer.begin_source(source)
+
+        started = time.time()
+        T = self._initial_activation(targets_supports)
+        if metrics.enabled:
+            metrics.phase(INITIAL_ACTIVATION, time.time() - started)
+            metrics.set(START_NODES, len(T))
+            started = time.time()
+
+        Q = self._spread(T)
+        if metrics.enabled:
+            metrics.phase(SPREADING, time.time() - started)
+        self.tracer.end_source()
+
+        if logger.isEnabledFor(logging.INFO):
+            log("Q TABLE")
+            log(dict(zip(Q[0].tolist(), Q[1].tolist())))
+        lead_nodes = self.find_place_in_graph(Q, syn_graph)
+        metrics.end_source()
+        return lead_nodes
+
+    def attach_batch(self, items, syn_graph):
+        """
+        Finds lead nodes for many (source, targets_supports) items, spread
+        together by the SPARSE and BATCHED engines and one by one by the
+        others.
+        """
+        if self.engine not in (SPARSE, BATCHED):
+            return [self.attach(source, targets_supports, syn_graph) for source, targets_supports in items]
+
+        log("\nAttach batch of {} sources".format(len(items)))
+        metrics = self.metrics
+        if not metrics.enabled:
+            Ts = [self._initial_activation(targets_supports) for _, targets_supports in items]
+            return [self.find_place_in_graph(Q, syn_graph) for Q in self._spread_batch(Ts)]
+
+        Ts = []
+        initial_seconds = []
+        for _, targets_supports in items:
+            started = time.time()
+            Ts.append(self._initial_activation(targets_supports))
+            initial_seconds.append(time.time() - started)
+
+        started = time.time()
+        source_stats = []
+        Qs = self._spread_batch(Ts, source_stats)
+        spreading_seconds = (time.time() - started) / max(len(items), 1)
+
+        results = []
+        for (source, _), T, Q, seconds, (relaxations, frontier) in zip(items, Ts, Qs, initial_seconds, source_stats):
+            metrics.begin_source(source)
+            metrics.set(START_NODES, len(T))
+            metrics.set(EDGES_RELAXED, relaxations)
+            metrics.set(MAX_FRONTIER, frontier)
+            metrics.phase(INITIAL_ACTIVATION, seconds)
+            metrics.phase(SPREADING, spreading_seconds)
+            results.append(self.find_place_in_graph(Q, syn_graph))
+            metrics.end_source()
+        return results
+
+    def _initial_activation(self, targets_supports):
+        targets = [target for target, _ in targets_supports]
+        nodes_of_targets = self.graph.lemma_to_nodes_dict.get_many(targets)
+
+        lemma_activations = []
+        for (target, support), nodes in zip(targets_supports, nodes_of_targets):
+            la = LemmaActivations(
+                lemma=target,
+                nodes=nodes,
+                activation=support
+            )
+            lemma_activations.append(la)
+
+        return self._setup_initial_activation(lemma_activations)
 
     def run(self, syn_graph):
+        if self.engine in (SPARSE, BATCHED):
+            items = iter(self._knowledge_source.items())
+            batch = list(itertools.islice(items, self.batch_size))
+            while batch:
+                for (source, _), lead_nodes in zip(batch, self.attach_batch(batch, syn_graph)):
+                    print(format_lead_nodes(source, lead_nodes, syn_graph))
+                batch = list(itertools.islice(items, self.batch_size))
+            return
+
         for source, targets_supports in self._knowledge_source.items():
-            # logger.error(source)
-            log("\nAttach - {} - to {} lemmas".format(source, len(targets_supports)))
-            Q = defaultdict(float)
-
-            lemma_activations = []
-            for target, support in targets_supports:
-                nodes = self.graph.lemma_to_nodes_dict[target]
-                la = LemmaActivations(
-                    lemma=target,
-                    nodes=nodes,
-                    activation=support
-                )
-                lemma_activations.append(la)
-
-            T = self._setup_initial_activation(lemma_activations)
-
-            for start_node, activation_value in T.items():
-                self._act_replication(start_node, activation_value, Q)
-            
-            log("Q TABLE")
-            log(Q)
-            lead_nodes = self.find_place_in_graph(Q, syn_graph)
+            lead_nodes = self.attach(source, targets_supports, syn_graph)
+            print(format_lead_nodes(source, lead_nodes, syn_graph))
+
+
+def format_lead_nodes(source, lead_nodes, syn_graph):
+    lines = ["\n{}".format(source)]
+    for node in lead_nodes:
+        lines.append("{};{};{}".format(source, syn_graph.node_synset_id(node), " ".join(syn_graph.node_lemmas(node))))
+    return "\n".join(lines)
+
 
-            print "\n{}".format(source)
-            for node in lead_nodes:
-                print("{};{};{}".format(source, node.synset.synset_id, " ".join(lu.lemma for lu in node.synset.lu_set)))
+def lead_synsets(lead_nodes, syn_graph):
+    """ JSON-serializable counterpart of format_lead_nodes """
+    return [
+        {'synset_id': syn_graph.node_synset_id(node), 'lemmas': syn_graph.node_lemmas(node)}
+        for node in lead_nodes
+    ]
 
 
 class LemmaActivations(object):
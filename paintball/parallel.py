@@ -0,0 +1,110 @@
+import itertools
+import multiprocessing
+
+from collections import deque
+
+from .paint_ball import format_lead_nodes, lead_synsets
+
+# Set in the parent right before the pool is created, so forked workers
+# inherit the loaded graphs instead of receiving pickled copies.
+_worker_state = {}
+
+
+def _attach_shard(shard):
+    """ Returns formatted results of the shard and metrics records of its sources, if measured """
+    paint_ball = _worker_state['paint_ball']
+    syn_graph = _worker_state['syn_graph']
+
+    results = [
+        format_lead_nodes(source, lead_nodes, syn_graph)
+        for (source, _), lead_nodes in zip(shard, paint_ball.attach_batch(shard, syn_graph))
+    ]
+    records = paint_ball.metrics.take() if paint_ball.metrics.enabled else []
+    return results, records
+
+
+def _attach_item(item):
+    paint_ball = _worker_state['paint_ball']
+    syn_graph = _worker_state['syn_graph']
+
+    source, targets_supports = item
+    return lead_synsets(paint_ball.attach(source, targets_supports, syn_graph), syn_graph)
+
+
+def make_shards(items, shard_size):
+    """ Lazily splits an iterable of knowledge source items into lists """
+    iterator = iter(items)
+    while True:
+        shard = list(itertools.islice(iterator, shard_size))
+        if not shard:
+            return
+        yield shard
+
+
+def iter_parallel(paint_ball, syn_graph, processes=None, shard_size=64):
+    """
+    Attaches all sources of the knowledge source of paint_ball in a pool of
+    worker processes and yields formatted results in the knowledge source
+    order.
+
+    Workers are forked from the current process, so the graphs, the
+    impedance table and indexes loaded before the call are shared
+    copy-on-write rather than loaded or pickled once per worker. This needs
+    the 'fork' start method (the default on Linux).
+
+    Only a few shards per worker are read ahead, so a lazy knowledge source
+    such as knowledge_source.KnowledgeSourceStream is never loaded whole.
+
+    Metrics records made by workers are added to the metrics of paint_ball.
+    """
+    pool = start_pool(paint_ball, syn_graph, processes)
+    max_pending = 2 * (processes or multiprocessing.cpu_count())
+
+    def collect(pending_result):
+        results, records = pending_result.get()
+        if records:
+            paint_ball.metrics.extend(records)
+        return results
+
+    try:
+        pending = deque()
+        for shard in make_shards(paint_ball.knowledge_source.items(), shard_size):
+            pending.append(pool.apply_async(_attach_shard, (shard,)))
+            if len(pending) >= max_pending:
+                for result in collect(pending.popleft()):
+                    yield result
+        while pending:
+            for result in collect(pending.popleft()):
+                yield result
+        pool.close()
+    finally:
+        stop_pool(pool)
+
+
+def start_pool(paint_ball, syn_graph, processes=None):
+    """
+    Creates a pool of workers forked with paint_ball and syn_graph, see
+    iter_parallel. It must be stopped with stop_pool.
+    """
+    if paint_ball.tracer.enabled:
+        raise ValueError('Tracing is not supported in parallel runs')
+
+    _worker_state['paint_ball'] = paint_ball
+    _worker_state['syn_graph'] = syn_graph
+    return multiprocessing.Pool(processes)
+
+
+def stop_pool(pool):
+    pool.terminate()
+    pool.join()
+    _worker_state.clear()
+
+
+def attach_async(pool, source, targets_supports):
+    """ Schedules a single attach in a pool from start_pool, the result holds its lead_synsets """
+    return pool.apply_async(_attach_item, ((source, targets_supports),))
+
+
+def run_parallel(paint_ball, syn_graph, processes=None, shard_size=64):
+    for result in iter_parallel(paint_ball, syn_graph, processes, shard_size):
+        print(result)
@@ -0,0 +1,25 @@
+import numpy as np
+
+
+def group_paths(keys, values):
+    """
+    Groups paths by the state they reach, given as an integer key, and by
+    their activation, since paths of a state with equal activation have the
+    same continuations. Returns (keys, values, groups): the key and the
+    activation of every group, sorted by key and activation, and the group
+    of every path, as np.unique(keys, return_inverse=True) does for keys
+    alone.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    # activations are positive, so equal bit patterns mean equal values
+    bits = values.view(np.int64)
+
+    order = np.lexsort((bits, keys))
+    keys, bits = keys[order], bits[order]
+    firsts = np.ones(len(order), dtype=bool)
+    firsts[1:] = (keys[1:] != keys[:-1]) | (bits[1:] != bits[:-1])
+
+    groups = np.empty(len(order), dtype=np.int64)
+    groups[order] = np.cumsum(firsts) - 1
+    return keys[firsts], values[order][firsts], groups
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+
+class ActivationProfile(object):
+    """
+    Q contribution of a single start node spread with activation 1.
+
+    Spreading is linear in the start activation except for the epsilon
+    test, so spreading activation a with threshold epsilon equals spreading
+    activation 1 with cutoff epsilon / a and scaling the result by a.
+
+    A profile built with some cutoff remembers the smallest transmission it
+    kept (upper) and the largest one it dropped (lower). For every cutoff in
+    (lower, upper] each transmission is kept or dropped exactly as when the
+    profile was built, hence the scaled profile equals a fresh spread, up to
+    floating point rounding. Outside of this range the profile must be
+    rebuilt.
+    """
+
+    __slots__ = ['nodes', 'activations', 'lower', 'upper']
+
+    def __init__(self, nodes, activations, lower, upper):
+        self.nodes = nodes
+        self.activations = activations
+        self.lower = lower
+        self.upper = upper
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def covers(self, cutoff):
+        return self.lower < cutoff <= self.upper
+
+    def add_to(self, Q, activation_value):
+        for node, value in zip(self.nodes, self.activations):
+            Q.add(node, activation_value * value)
+
+
+class ActivationProfileCache(object):
+    """
+    LRU cache of activation profiles keyed by start node. The total number of
+    (node, activation) entries of all profiles is kept under max_entries.
+    """
+
+    def __init__(self, max_entries=1000000):
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()
+        self._entries = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def get(self, node, cutoff):
+        """
+        Returns the profile of node if it is valid for the cutoff, None
+        otherwise.
+        """
+        profile = self._profiles.pop(node, None)
+        if profile is None or not profile.covers(cutoff):
+            if profile is not None:
+                self._entries -= len(profile)
+            self.misses += 1
+            return None
+
+        self._profiles[node] = profile
+        self.hits += 1
+        return profile
+
+    def put(self, node, profile):
+        old = self._profiles.pop(node, None)
+        if old is not None:
+            self._entries -= len(old)
+
+        if len(profile) > self.max_entries:
+            return
+
+        self._profiles[node] = profile
+        self._entries += len(profile)
+        while self._entries > self.max_entries:
+            _, evicted = self._profiles.popitem(last=False)
+            self._entries -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._profiles.clear()
+        self._entries = 0
+
+    def invalidate(self, vertices):
+        """
+        Drops profiles of start nodes whose spreading reached any of the
+        vertices, e.g. vertices whose edges changed. Returns start nodes of
+        the dropped profiles.
+        """
+        vertices = set(vertices)
+        dropped = [node for node, profile in self._profiles.items()
+                   if node in vertices or not vertices.isdisjoint(profile.nodes)]
+        for node in dropped:
+            self._entries -= len(self._profiles.pop(node))
+        return dropped
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'profiles': len(self._profiles),
+            'entries': self._entries,
+        }
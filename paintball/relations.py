@@ -0,0 +1,72 @@
+import numpy as np
+
+
+class RelationIndex(object):
+    """
+    Maps raw relation identifiers (10, 11, ..., 777, 888) to contiguous
+    positions 0..n-1, so that relation properties can be kept in small dense
+    arrays. Position n (start) stands for the missing incoming relation of
+    a start node.
+    """
+
+    __slots__ = ['rel_ids', '_positions']
+
+    def __init__(self, rel_ids):
+        self.rel_ids = np.unique(np.asarray(rel_ids, dtype=np.int64))
+        self._positions = dict((rel_id, i) for i, rel_id in enumerate(self.rel_ids.tolist()))
+
+    def __len__(self):
+        return len(self.rel_ids)
+
+    def __contains__(self, rel_id):
+        return rel_id in self._positions
+
+    @property
+    def start(self):
+        return len(self.rel_ids)
+
+    def position(self, rel_id):
+        return self._positions[rel_id]
+
+    def positions(self, rel_ids):
+        """ Positions of all given relation ids, raises KeyError for unknown ones """
+        rel_ids = np.asarray(rel_ids, dtype=np.int64)
+        positions = np.searchsorted(self.rel_ids, rel_ids)
+        known = positions < len(self.rel_ids)
+        known[known] = self.rel_ids[positions[known]] == rel_ids[known]
+        if not known.all():
+            raise KeyError(rel_ids[~known][0])
+        return positions
+
+
+def compile_transmitance(transmitance_dict, relations):
+    """
+    Dense transmittance vector indexed by relation position. Lookups follow
+    the given mapping, so a defaultdict yields its default for relations it
+    does not list.
+    """
+    transmitance = np.zeros(len(relations))
+    for i, rel_id in enumerate(relations.rel_ids.tolist()):
+        try:
+            transmitance[i] = transmitance_dict[rel_id]
+        except KeyError:
+            transmitance[i] = 0
+    return transmitance
+
+
+def compile_impedance(impedance_table, relations):
+    """
+    Dense impedance matrix, rows are incoming and columns outgoing relation
+    positions. Pairs missing in the table get 1, unless the table itself
+    provides a default (as the nested defaultdict from load_impedance_table
+    does). The start row is all ones, edges of start nodes are not impeded.
+    """
+    impedance = np.ones((len(relations) + 1, len(relations)))
+    rel_ids = relations.rel_ids.tolist()
+    for i, in_rel_id in enumerate(rel_ids):
+        for j, out_rel_id in enumerate(rel_ids):
+            try:
+                impedance[i, j] = impedance_table[in_rel_id][out_rel_id]
+            except KeyError:
+                impedance[i, j] = 1
+    return impedance
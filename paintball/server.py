@@ -0,0 +1,212 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import logging
+import threading
+import time
+
+from collections import deque
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from .main import add_engine_arguments, load_paint_ball
+from .paint_ball import lead_synsets
+from .parallel import attach_async, start_pool, stop_pool
+from .tracing import NullTracer
+
+logging.basicConfig(level=logging.ERROR, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+
+def log(message):
+    logger.info(message)
+
+
+class LatencyMetrics(object):
+    """
+    Thread-safe request counters with latency percentiles computed over a
+    window of the most recent requests.
+    """
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self._recent.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            requests, errors = self.requests, self.errors
+            total_seconds, max_seconds = self.total_seconds, self.max_seconds
+
+        def percentile(p):
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))]
+
+        return {
+            'requests': requests,
+            'errors': errors,
+            'mean_ms': 1000 * total_seconds / requests if requests else 0.0,
+            'max_ms': 1000 * max_seconds,
+            'p50_ms': 1000 * percentile(0.50),
+            'p90_ms': 1000 * percentile(0.90),
+            'p99_ms': 1000 * percentile(0.99),
+        }
+
+
+class Attacher(object):
+    """
+    Attaches single sources for concurrent requests, either in a pool of
+    worker processes forked with the loaded PaintBall or, without a pool,
+    one at a time in the calling thread.
+    """
+
+    def __init__(self, paint_ball, syn_graph, processes=1):
+        self._paint_ball = paint_ball
+        self._syn_graph = syn_graph
+        self._lock = threading.Lock()
+        self._pool = start_pool(paint_ball, syn_graph, processes) if processes > 1 else None
+
+    def attach(self, source, targets_supports):
+        if self._pool is not None:
+            return attach_async(self._pool, source, targets_supports).get()
+
+        with self._lock:
+            lead_nodes = self._paint_ball.attach(source, targets_supports, self._syn_graph)
+            return lead_synsets(lead_nodes, self._syn_graph)
+
+    def close(self):
+        if self._pool is not None:
+            stop_pool(self._pool)
+
+
+def parse_attach_request(body):
+    """
+    Reads {"source": lemma, "targets": [[lemma, support], ...]}; targets may
+    also be given as a {lemma: support} object. Returns (source,
+    targets_supports) or raises ValueError.
+    """
+    request = json.loads(body)
+    if not isinstance(request, dict) or 'source' not in request or 'targets' not in request:
+        raise ValueError('Expected an object with source and targets')
+
+    targets = request['targets']
+    if isinstance(targets, dict):
+        targets = targets.items()
+    targets_supports = [(target, float(support)) for target, support in targets]
+    return request['source'], targets_supports
+
+
+class PaintBallRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /attach attaches a source, GET /metrics returns latency metrics
+    and GET /health answers once everything is loaded.
+    """
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send_json(200, self.server.metrics.snapshot())
+        elif self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        else:
+            self._send_json(404, {'error': 'Unknown path {}'.format(self.path)})
+
+    def do_POST(self):
+        if self.path != '/attach':
+            self._send_json(404, {'error': 'Unknown path {}'.format(self.path)})
+            return
+
+        started = time.time()
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            source, targets_supports = parse_attach_request(self.rfile.read(length))
+        except (ValueError, TypeError) as e:
+            self.server.metrics.record(time.time() - started, error=True)
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            synsets = self.server.attacher.attach(source, targets_supports)
+        except Exception as e:
+            logger.exception('Attaching %s failed', source)
+            self.server.metrics.record(time.time() - started, error=True)
+            self._send_json(500, {'error': str(e)})
+            return
+
+        seconds = time.time() - started
+        self.server.metrics.record(seconds)
+        self._send_json(200, {
+            'source': source,
+            'lead_synsets': synsets,
+            'latency_ms': 1000 * seconds,
+        })
+
+    def _send_json(self, status, value):
+        body = json.dumps(value).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log(format % args)
+
+
+class PaintBallServer(ThreadingMixIn, HTTPServer):
+    """ HTTP server handling every request in its own thread """
+
+    daemon_threads = True
+
+    def __init__(self, address, attacher):
+        HTTPServer.__init__(self, address, PaintBallRequestHandler)
+        self.attacher = attacher
+        self.metrics = LatencyMetrics()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Serves attach requests with graphs loaded once')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='port to listen on')
+    add_engine_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    pb, syn_graph = load_paint_ball(args, knowledge_source={}, tracer=NullTracer())
+    attacher = Attacher(pb, syn_graph, args.processes)
+    server = PaintBallServer((args.host, args.port), attacher)
+
+    log("Serving on {}:{}".format(args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        attacher.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+from array import array
+
+import numpy as np
+
+from arrayfile import StringTable, read_arrays, write_arrays
+from knowledge_source import read_triples
+
+SIMILARITY_CACHE_EXTENSION = '.pbsim'
+SIMILARITY_CACHE_VERSION = 1
+
+
+def _utf8(lemma):
+    return lemma if isinstance(lemma, bytes) else lemma.encode('utf-8')
+
+
+def convert_similarities(paths, path, separator=None):
+    """
+    Converts source;target;score files into a similarity cache file.
+
+    Lemmas are interned into a byte-sorted string table. Pairs are grouped
+    by source, sources keep the order they first appear in, and repeated
+    (source, target) pairs are merged by summing their scores, as
+    _setup_initial_activation would sum them.
+    """
+    lemma_ids = {}
+    # sources are numbered apart from lemmas, a source seen as a target first keeps its place
+    source_ranks = {}
+    source_lemma_ids = array('l')
+    sources = array('l')
+    targets = array('l')
+    scores = array('d')
+    for input_path in paths:
+        for source, target, score in read_triples(input_path, separator):
+            lemma_id = lemma_ids.setdefault(source, len(lemma_ids))
+            if source not in source_ranks:
+                source_ranks[source] = len(source_ranks)
+                source_lemma_ids.append(lemma_id)
+            sources.append(source_ranks[source])
+            targets.append(lemma_ids.setdefault(target, len(lemma_ids)))
+            scores.append(score)
+
+    source_lemma_ids = np.array(source_lemma_ids, dtype=np.int64)
+    sources = np.array(sources, dtype=np.int64)
+    targets = np.array(targets, dtype=np.int64)
+    scores = np.array(scores, dtype=np.float64)
+
+    # renumber lemmas by their position in the sorted string table
+    strings = sorted(lemma_ids, key=_utf8)
+    table = StringTable.from_strings(strings)
+    position = np.empty(len(strings), dtype=np.int64)
+    position[[lemma_ids[lemma] for lemma in strings]] = np.arange(len(strings))
+
+    # sorting pairs by source ranks keeps sources in the order they first
+    # appear in, each with its targets next to each other
+    num_lemmas = max(len(strings), 1)
+    pair_keys, merged = np.unique(sources * num_lemmas + targets, return_inverse=True)
+    merged_scores = np.bincount(merged, weights=scores)
+    pair_sources = pair_keys // num_lemmas
+    pair_targets = pair_keys % num_lemmas
+
+    ranks, pair_source_index = np.unique(pair_sources, return_inverse=True)
+    source_ids = source_lemma_ids[ranks]
+    offsets = np.zeros(len(source_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pair_source_index, minlength=len(source_ids)), out=offsets[1:])
+
+    arrays = {
+        'lemma_data': table.data,
+        'lemma_offsets': table.offsets,
+        'source_ids': position[source_ids].astype(np.int32),
+        'offsets': offsets,
+        'target_ids': position[pair_targets].astype(np.int32),
+        'scores': merged_scores.astype(np.float32),
+    }
+    meta = {
+        'version': SIMILARITY_CACHE_VERSION,
+        'sources': len(source_ids),
+        'pairs': len(pair_keys),
+    }
+    write_arrays(path, arrays, meta)
+
+
+class SimilarityCache(object):
+    """
+    Similarity lists loaded from a file written by convert_similarities.
+    Targets of the i-th source are target_ids[offsets[i]:offsets[i + 1]]
+    with their scores, lemma ids are positions in the lemma table.
+
+    items() yields (source, [(target, score), ...]) like a knowledge source.
+    With tau_0 given, pairs scoring tau_0 or less are skipped on load: they
+    could only activate nodes that _setup_initial_activation discards,
+    since duplicate pairs are merged by the converter.
+    """
+
+    def __init__(self, path, tau_0=None, mmap=True):
+        arrays, meta = read_arrays(path, mmap)
+        if meta.get('version') != SIMILARITY_CACHE_VERSION:
+            raise ValueError('Unsupported similarity cache version in {}'.format(path))
+
+        self.lemmas = StringTable(arrays['lemma_data'], arrays['lemma_offsets'])
+        self.source_ids = arrays['source_ids']
+        self.offsets = arrays['offsets']
+        self.target_ids = arrays['target_ids']
+        self.scores = arrays['scores']
+        self.tau_0 = tau_0
+
+    def __len__(self):
+        return len(self.source_ids)
+
+    def targets_of(self, i):
+        """ Target lemma ids and scores of the i-th source, tau_0 applied """
+        target_ids = self.target_ids[self.offsets[i]:self.offsets[i + 1]]
+        scores = self.scores[self.offsets[i]:self.offsets[i + 1]]
+        if self.tau_0 is not None:
+            kept = scores > self.tau_0
+            target_ids, scores = target_ids[kept], scores[kept]
+        return target_ids, scores
+
+    def lemma(self, lemma_id):
+        """ Lemma as the str read_triples would give, bytes on Python 2 """
+        lemma = self.lemmas.data[self.lemmas.offsets[lemma_id]:self.lemmas.offsets[lemma_id + 1]].tobytes()
+        return lemma if str is bytes else lemma.decode('utf-8')
+
+    def items(self):
+        lemma = self.lemma
+        for i, source_id in enumerate(self.source_ids.tolist()):
+            target_ids, scores = self.targets_of(i)
+            yield lemma(source_id), [
+                (lemma(target_id), score)
+                for target_id, score in zip(target_ids.tolist(), scores.tolist())
+            ]
+
+    def __iter__(self):
+        for source_id in self.source_ids.tolist():
+            yield self.lemma(source_id)
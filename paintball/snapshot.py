@@ -0,0 +1,253 @@
+import numpy as np
+
+from arrayfile import StringTable, read_arrays, write_arrays
+from csr import CSRGraph
+from lemma_index import LemmaIndex, merge_strings
+
+SNAPSHOT_VERSION = 1
+
+
+def _text(s):
+    if isinstance(s, bytes):
+        return s.decode('utf-8')
+    return s
+
+
+def _unique_strings(strings):
+    """ Byte-sorted unique strings and the position of each given string among them """
+    encoded = [_text(s).encode('utf-8') for s in strings]
+    unique = sorted(set(encoded))
+    position = dict((s, i) for i, s in enumerate(unique))
+    return unique, np.array([position[s] for s in encoded], dtype=np.int64)
+
+
+def _grouped(keys, values, num_keys):
+    """ CSR-like grouping of values by integer keys: (offsets, values) """
+    keys = np.asarray(keys, dtype=np.int64)
+    order = np.argsort(keys, kind='mergesort')
+    offsets = np.zeros(num_keys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=num_keys), out=offsets[1:])
+    return offsets, np.asarray(values, dtype=np.int64)[order]
+
+
+def _topology_arrays(graph):
+    """ Out-edges of all vertices grouped by source, see GraphSnapshot """
+    g = graph.use_graph_tool()
+    num_vertices = g.num_vertices(ignore_filter=True)
+
+    edges = g.get_edges([g.edge_index])
+    edge_index = edges[:, 2].astype(np.int64)
+    offsets, order = _grouped(edges[:, 0], np.arange(len(edges)), num_vertices)
+
+    if graph.has_edge_attribute('rel_id'):
+        rel_ids = np.asarray(graph.get_edge_attribute_array('rel_id'))[edge_index]
+    else:
+        rel_ids = np.full(len(edges), -1, dtype=np.int64)
+    if graph.has_edge_attribute('weight'):
+        weights = np.asarray(graph.get_edge_attribute_array('weight'))[edge_index]
+    else:
+        weights = np.ones(len(edges))
+
+    return {
+        'offsets': offsets,
+        'targets': edges[:, 1].astype(np.int64)[order],
+        'rel_ids': np.asarray(rel_ids, dtype=np.int64)[order],
+        'weights': np.asarray(weights, dtype=np.float64)[order],
+    }
+
+
+def _synset_index(synset_ids):
+    """ Sorted synset ids of vertices and their vertices """
+    with_synset = np.flatnonzero(synset_ids != -1)
+    # as in get_node_for_synset_id, the last vertex of a synset wins
+    synset_order = np.argsort(synset_ids[with_synset], kind='mergesort')
+    sorted_ids = synset_ids[with_synset][synset_order]
+    last = np.append(sorted_ids[1:] != sorted_ids[:-1], True) if len(sorted_ids) else sorted_ids.astype(bool)
+    return sorted_ids[last], with_synset[synset_order][last]
+
+
+def snapshot_arrays(graph):
+    """
+    Collects topology, scalar properties and lemma/synset indexes of a
+    BaseGraph. Lexical unit graphs take lemmas and ids from the 'lu' node
+    attribute and synsets from 'synset_id'; synset graphs take them from the
+    'synset' node attribute, which also enables the synset index.
+    """
+    g = graph.use_graph_tool()
+    num_vertices = g.num_vertices(ignore_filter=True)
+
+    has_lu = graph.has_node_attribute('lu')
+    has_synset = graph.has_node_attribute('synset')
+    has_synset_id = graph.has_node_attribute('synset_id')
+
+    lu_ids = np.full(num_vertices, -1, dtype=np.int64)
+    synset_ids = np.full(num_vertices, -1, dtype=np.int64)
+    lemma_vertices = []
+    lemmas = []
+    for node in graph.all_nodes():
+        vertex = int(node)
+        node_lemmas = []
+        if has_lu and node.lu:
+            lu_ids[vertex] = node.lu.lu_id
+            node_lemmas = [node.lu.lemma]
+        if has_synset:
+            if node.synset:
+                synset_ids[vertex] = node.synset.synset_id
+                node_lemmas = [lu.lemma for lu in node.synset.lu_set]
+        elif has_synset_id:
+            synset_ids[vertex] = node.synset_id
+        lemma_vertices.extend([vertex] * len(node_lemmas))
+        lemmas.extend(node_lemmas)
+
+    lemma_strings, lemma_ids = _unique_strings(lemmas)
+    lemma_table = StringTable.from_strings(lemma_strings)
+    vertex_lemma_offsets, vertex_lemma_ids = _grouped(lemma_vertices, lemma_ids, num_vertices)
+
+    # lower-cased as in generate_lemma_to_nodes_dict_*
+    lemma_index = LemmaIndex.from_pairs([lemma.lower() for lemma in lemmas], lemma_vertices)
+
+    if has_synset:
+        synset_index_ids, synset_index_vertices = _synset_index(synset_ids)
+    else:
+        synset_index_ids = np.zeros(0, dtype=np.int64)
+        synset_index_vertices = np.zeros(0, dtype=np.int64)
+
+    arrays = _topology_arrays(graph)
+    arrays.update({
+        'lu_ids': lu_ids,
+        'synset_ids': synset_ids,
+        'lemma_data': lemma_table.data,
+        'lemma_offsets': lemma_table.offsets,
+        'vertex_lemma_offsets': vertex_lemma_offsets,
+        'vertex_lemma_ids': vertex_lemma_ids,
+        'synset_index_ids': synset_index_ids,
+        'synset_index_vertices': synset_index_vertices,
+    })
+    arrays.update(lemma_index.to_arrays('index_'))
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'directed': bool(g.is_directed()),
+        'num_vertices': num_vertices,
+        'synset_index': has_synset,
+    }
+    return arrays, meta
+
+
+def save_snapshot(graph, path):
+    arrays, meta = snapshot_arrays(graph)
+    write_arrays(path, arrays, meta)
+
+
+def load_snapshot(path, mmap=True):
+    arrays, meta = read_arrays(path, mmap)
+    if meta.get('version') != SNAPSHOT_VERSION:
+        raise ValueError('Unsupported snapshot version in {}'.format(path))
+    return GraphSnapshot(arrays, meta)
+
+
+class GraphSnapshot(object):
+    """
+    Read-only graph data loaded from a snapshot file. Out-edges of vertex v
+    are stored at offsets[v]:offsets[v + 1], self-loops included.
+    """
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.directed = meta['directed']
+        self.num_vertices = meta['num_vertices']
+        self.has_synset_index = meta['synset_index']
+
+        self.offsets = arrays['offsets']
+        self.targets = arrays['targets']
+        self.rel_ids = arrays['rel_ids']
+        self.weights = arrays['weights']
+        self.lu_ids = arrays['lu_ids']
+        self.synset_ids = arrays['synset_ids']
+
+        self._lemmas = StringTable(arrays['lemma_data'], arrays['lemma_offsets'])
+        self.lemma_index = LemmaIndex.from_arrays(arrays, 'index_')
+
+    def sources(self):
+        return np.repeat(np.arange(self.num_vertices), np.diff(self.offsets))
+
+    def csr(self):
+        """ CSR view sharing the snapshot arrays whenever possible """
+        if self.directed and not (self.sources() == self.targets).any():
+            return CSRGraph(self.offsets, self.targets, self.rel_ids, self.weights)
+
+        sources, targets = self.sources(), self.targets
+        rel_ids, weights = self.rel_ids, self.weights
+        if not self.directed:
+            sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+            rel_ids = np.concatenate([rel_ids, rel_ids])
+            weights = np.concatenate([weights, weights])
+        return CSRGraph.from_edges(self.num_vertices, sources, targets, rel_ids, weights)
+
+    def updated(self, graph, lemma_index, removed_vertices, removed_pairs, added_pairs):
+        """
+        In-memory snapshot of graph after BaseGraph.apply_delta. Topology,
+        weights and ids are taken from graph, lemmas of vertices are those
+        of this snapshot without the removed vertices and removed (lemma,
+        vertex) pairs, with the added pairs; lemma_index is the updated
+        index of the graph.
+        """
+        num_vertices = graph.use_graph_tool().num_vertices(ignore_filter=True)
+        synset_ids = np.asarray(graph.get_node_attribute_array('synset_id'), dtype=np.int64)
+
+        offsets = self.arrays['vertex_lemma_offsets']
+        lemma_ids = self.arrays['vertex_lemma_ids']
+        lemma_vertices = np.repeat(np.arange(self.num_vertices), np.diff(offsets))
+        kept = ~np.isin(lemma_vertices, np.asarray(removed_vertices, dtype=np.int64))
+        for lemma, vertex in removed_pairs:
+            lemma_id = self._lemmas.find(lemma)
+            positions = offsets[vertex] + np.flatnonzero(lemma_ids[offsets[vertex]:offsets[vertex + 1]] == lemma_id)
+            positions = positions[kept[positions]]
+            if lemma_id >= 0 and len(positions):
+                kept[positions[0]] = False
+
+        lemma_table, kept_ids, added_ids = merge_strings(
+            self._lemmas, lemma_ids[kept], [lemma for lemma, _ in added_pairs])
+        vertex_lemma_offsets, vertex_lemma_ids = _grouped(
+            np.concatenate([lemma_vertices[kept], np.array([vertex for _, vertex in added_pairs], dtype=np.int64)]),
+            np.concatenate([kept_ids, added_ids]),
+            num_vertices
+        )
+
+        if self.has_synset_index:
+            synset_index_ids, synset_index_vertices = _synset_index(synset_ids)
+        else:
+            synset_index_ids = self.arrays['synset_index_ids']
+            synset_index_vertices = self.arrays['synset_index_vertices']
+
+        arrays = _topology_arrays(graph)
+        arrays.update({
+            'lu_ids': np.asarray(graph.get_node_attribute_array('lu_id'), dtype=np.int64),
+            'synset_ids': synset_ids,
+            'lemma_data': lemma_table.data,
+            'lemma_offsets': lemma_table.offsets,
+            'vertex_lemma_offsets': vertex_lemma_offsets,
+            'vertex_lemma_ids': vertex_lemma_ids,
+            'synset_index_ids': synset_index_ids,
+            'synset_index_vertices': synset_index_vertices,
+        })
+        arrays.update(lemma_index.to_arrays('index_'))
+        meta = {
+            'version': SNAPSHOT_VERSION,
+            'directed': self.directed,
+            'num_vertices': num_vertices,
+            'synset_index': self.has_synset_index,
+        }
+        return GraphSnapshot(arrays, meta)
+
+    def lemmas(self, vertex):
+        """ Lemmas of the lexical unit or of all lexical units of the synset """
+        ids = self.arrays['vertex_lemma_ids']
+        offsets = self.arrays['vertex_lemma_offsets']
+        return [self._lemmas[i] for i in ids[offsets[vertex]:offsets[vertex + 1]]]
+
+    def vertex_for_synset(self, synset_id):
+        ids = self.arrays['synset_index_ids']
+        position = np.searchsorted(ids, synset_id)
+        if position < len(ids) and ids[position] == synset_id:
+            return int(self.arrays['synset_index_vertices'][position])
+        return -1
@@ -0,0 +1,110 @@
+import numpy as np
+import scipy.sparse as sp
+
+from paths import group_paths
+
+
+class SpreadingOperator(object):
+    """
+    Spreading of many start vertices as a sequence of sparse matrix
+    products over path states.
+
+    A state is a vertex, the relation of the edge activation arrived
+    through and the factor, decay * transmittance * impedance multiplied
+    along the path, by which the path scales activation of its start
+    vertex. Paths reaching the same vertex through the same relation with
+    the same factor have the same continuations, so they share a state. A
+    level of spreading is a sparse matrix with a row per state and a column
+    per start vertex, counting the paths of the state that left the start
+    vertex. A path is dropped once the activation of its start vertex times
+    its factor falls below epsilon, as in the other engines, see step.
+    """
+
+    def __init__(self, csr, rel_positions, impedance, decay):
+        self._csr = csr
+        self._rel_positions = np.asarray(rel_positions, dtype=np.int64)
+        self._impedance = impedance
+        self._num_rels = impedance.shape[0]
+        self._start_rel = impedance.shape[0] - 1
+        self.decay = decay
+
+    @property
+    def num_vertices(self):
+        return self._csr.num_vertices
+
+    def step(self, states, X, cutoffs):
+        """
+        Spreads paths counted in X by one edge. states are (vertices, rels,
+        factors) arrays of the rows of X, cutoffs the smallest factor a
+        path of each column may have. Out-edges of the states gather rows
+        of X and the edges reaching the same next state are summed, both by
+        sparse matrix products, with the paths below the cutoff of their
+        column dropped in between. Returns the next states and their X.
+        """
+        csr = self._csr
+        vertices, rels, factors = states
+        edges, owners = csr.out_edges(vertices)
+        next_factors = self._impedance[rels[owners], self._rel_positions[edges]] * \
+            (csr.weights[edges] * (self.decay * factors[owners]))
+
+        gather = sp.csr_matrix((np.ones(len(edges)), (np.arange(len(edges)), owners)),
+                               shape=(len(edges), len(vertices)))
+        paths = gather.dot(X).tocoo()
+        kept = next_factors[paths.row] >= cutoffs[paths.col]
+        paths = sp.coo_matrix((paths.data[kept], (paths.row[kept], paths.col[kept])), shape=paths.shape)
+
+        used = np.unique(paths.row)
+        keys, next_factors, groups = group_paths(
+            csr.targets[edges[used]] * self._num_rels + self._rel_positions[edges[used]], next_factors[used])
+        merge = sp.csr_matrix((np.ones(len(used)), (groups, used)), shape=(len(keys), len(edges)))
+
+        next_states = (keys // self._num_rels, keys % self._num_rels, next_factors)
+        return next_states, merge.dot(paths.tocsr())
+
+    def _record_step(self, vertices, X, stats):
+        X = X.tocoo()
+        degrees = self._csr.out_degrees(vertices)
+        stats['relaxations'] += np.bincount(X.col, weights=degrees[X.row], minlength=X.shape[1]).astype(np.int64)
+        stats['levels'].append(np.bincount(X.col, minlength=X.shape[1]))
+
+    def spread(self, vertices, activations, epsilon, stats=None):
+        """
+        Spreads activation from start vertices, one column per start
+        vertex. Returns a sparse (num_vertices, len(vertices)) matrix of
+        activation accumulated by vertices.
+
+        Given a stats dict, fills 'relaxations' with the number of
+        transmissions tried per column and 'levels' with the number of
+        states expanded per column, a row per step.
+        """
+        vertices = np.asarray(vertices, dtype=np.int64)
+        activations = np.asarray(activations, dtype=np.float64)
+        active = np.flatnonzero(activations >= epsilon)
+        cutoffs = np.full(len(vertices), np.inf)
+        cutoffs[active] = epsilon / activations[active]
+
+        state_vertices, rows = np.unique(vertices[active], return_inverse=True)
+        states = (state_vertices, np.full(len(state_vertices), self._start_rel, dtype=np.int64),
+                  np.ones(len(state_vertices)))
+        X = sp.csr_matrix((np.ones(len(active)), (rows, active)), shape=(len(state_vertices), len(vertices)))
+
+        if stats is not None:
+            stats['relaxations'] = np.zeros(len(vertices), dtype=np.int64)
+            stats['levels'] = []
+
+        reached = ([], [], [])
+        while X.nnz:
+            if stats is not None:
+                self._record_step(states[0], X, stats)
+            states, X = self.step(states, X, cutoffs)
+
+            paths = X.tocoo()
+            reached[0].append(states[0][paths.row])
+            reached[1].append(paths.col)
+            reached[2].append(activations[paths.col] * states[2][paths.row] * paths.data)
+
+        rows, columns, values = [np.concatenate(part) if part else np.zeros(0) for part in reached]
+        return sp.csr_matrix(
+            (values, (rows.astype(np.int64), columns.astype(np.int64))),
+            shape=(self.num_vertices, len(vertices))
+        )
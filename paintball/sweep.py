@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class SpreadingRecord(object):
+    """
+    States expanded by spreading the initial activation of one source with
+    the loosest setting of a sweep: the largest decay and the smallest tau_0
+    and epsilon.
+
+    Every level holds the states reached at that depth, as vertices, and
+    the transmissions which reached them: positions of their parent states
+    in the previous level, transmittance and impedance of the edges and
+    positions of the reached states. Level 0 are the start nodes. Paths
+    merged into a state have the same activation, with any decay, since
+    they left the same start node and are as long.
+
+    A stricter setting reaches a subset of these paths, each with no more
+    activation, so replaying the recorded transmissions with its decay and
+    thresholds gives the same Q as spreading from scratch, up to floating
+    point rounding.
+    """
+
+    __slots__ = ['vertices', 'activations', 'levels']
+
+    def __init__(self, vertices, activations, levels):
+        self.vertices = vertices
+        self.activations = activations
+        self.levels = levels
+
+    def __len__(self):
+        return len(self.levels)
+
+    def replay(self, decay, tau_0, epsilon):
+        """ Returns (vertices, activations) arrays of Q spread with the given setting """
+        activations = self.activations
+        activations = np.where((activations > tau_0) & (activations >= epsilon), activations, 0.0)
+
+        paths = (activations > 0).astype(np.float64)
+        reached = []
+        values_of = []
+        for parents, transmitance, impedance, states, vertices in self.levels:
+            values = decay * activations[parents] * transmitance * impedance
+            transmitted = values >= epsilon
+            paths = np.bincount(states[transmitted], weights=paths[parents[transmitted]], minlength=len(vertices))
+            activations = np.zeros(len(vertices))
+            np.maximum.at(activations, states[transmitted], values[transmitted])
+            if not paths.any():
+                break
+            reached.append(vertices)
+            values_of.append(activations * paths)
+
+        if not reached:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        vertices, positions = np.unique(np.concatenate(reached), return_inverse=True)
+        activations = np.bincount(positions, weights=np.concatenate(values_of))
+        activated = activations > 0
+        return vertices[activated], activations[activated]
+
+
+class ParamSweep(object):
+    """
+    Attaches sources with every Params of a grid at the cost of a single
+    spreading per source. paint_ball spreads with the loosest setting of the
+    grid and records it, see SpreadingRecord; Q, synset activation and
+    lead nodes of each setting are derived from the record. Settings
+    differing only in tau_3 or tau_4 share Q and synset activation.
+    """
+
+    def __init__(self, paint_ball, grid):
+        if paint_ball.decay < max(params.mikro for params in grid) or \
+                paint_ball.tau_0 > min(params.tau_0 for params in grid) or \
+                paint_ball.epsilon > min(params.epsilon for params in grid):
+            raise ValueError('PaintBall must spread with the loosest setting of the grid')
+        self.paint_ball = paint_ball
+        self.grid = grid
+
+    def attach(self, targets_supports, syn_graph):
+        """ Lead nodes of a source for every setting of the grid, in grid order """
+        paint_ball = self.paint_ball
+        record = paint_ball.record_spreading(paint_ball._initial_activation(targets_supports))
+
+        Q_synsets = {}
+        lead_nodes = {}
+        results = []
+        for params in self.grid:
+            spreading = (params.mikro, params.tau_0, params.epsilon)
+            if spreading not in Q_synsets:
+                Q_synsets[spreading] = paint_ball.synset_activation(record.replay(*spreading))
+
+            key = spreading + (params.tau_3,)
+            if key not in lead_nodes:
+                lead_nodes[key] = paint_ball.find_subgraphs(Q_synsets[spreading], syn_graph, tau_3=params.tau_3)
+            results.append(lead_nodes[key])
+        return results
+
+    def run(self, items, syn_graph):
+        """ Yields (source, lead nodes of every setting) for (source, targets_supports) items """
+        for source, targets_supports in items:
+            yield source, self.attach(targets_supports, syn_graph)
@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class SynsetMapping(object):
+    """
+    Maps vertices of the lexical unit graph to synsets and synsets to
+    vertices of the synset graph, so that activation is aggregated and
+    synset nodes are found with array operations.
+
+    Synsets of lexical units are numbered by their position in the sorted
+    synset_ids array. vertex_synsets holds that synset index of every
+    lexical unit vertex, -1 for vertices out of synsets.
+    """
+
+    def __init__(self, vertex_synset_ids):
+        vertex_synset_ids = np.asarray(vertex_synset_ids, dtype=np.int64)
+        in_synsets = vertex_synset_ids != -1
+
+        self.synset_ids, positions = np.unique(vertex_synset_ids[in_synsets], return_inverse=True)
+        self.vertex_synsets = np.full(len(vertex_synset_ids), -1, dtype=np.int64)
+        self.vertex_synsets[in_synsets] = positions
+
+        self._syn_graph = None
+        self._syn_graph_revision = None
+        self._synset_vertices = None
+
+    def __len__(self):
+        return len(self.synset_ids)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """ Builds the mapping from the 'synset_id' node attribute of a lexical unit graph """
+        return cls(graph.get_node_attribute_array('synset_id'))
+
+    def update(self, vertices, synset_ids):
+        """
+        Maps vertices, added to the graph or removed from it, to their
+        synset ids, -1 for removed ones. Only these vertices are mapped
+        again, unless a synset is new: it moves the indices of the synsets
+        after it, so all vertices are then renumbered with a single
+        search. Synsets left without vertices keep their index.
+        """
+        vertices = np.asarray(vertices, dtype=np.int64)
+        synset_ids = np.asarray(synset_ids, dtype=np.int64)
+        num_vertices = max(len(self.vertex_synsets), int(vertices.max()) + 1 if len(vertices) else 0)
+        if num_vertices > len(self.vertex_synsets):
+            self.vertex_synsets = np.concatenate([
+                self.vertex_synsets, np.full(num_vertices - len(self.vertex_synsets), -1, dtype=np.int64)])
+
+        indices = self.indices_of(synset_ids)
+        new = (indices == -1) & (synset_ids != -1)
+        if new.any():
+            in_synsets = self.vertex_synsets != -1
+            old_synset_ids = self.synset_ids
+            self.synset_ids = np.union1d(old_synset_ids, synset_ids[new])
+            self.vertex_synsets[in_synsets] = np.searchsorted(
+                self.synset_ids, old_synset_ids[self.vertex_synsets[in_synsets]])
+            indices = self.indices_of(synset_ids)
+            # synset indices of the synset graph moved as well
+            self._syn_graph = None
+        self.vertex_synsets[vertices] = indices
+
+    def indices_of(self, synset_ids):
+        """ Synset indices of many synset ids, -1 for synsets of no lexical unit """
+        synset_ids = np.asarray(synset_ids, dtype=np.int64)
+        positions = np.searchsorted(self.synset_ids, synset_ids)
+        positions[positions == len(self.synset_ids)] = 0
+
+        indices = np.full(len(synset_ids), -1, dtype=np.int64)
+        if len(self.synset_ids):
+            found = self.synset_ids[positions] == synset_ids
+            indices[found] = positions[found]
+        return indices
+
+    def aggregate(self, vertices, activations):
+        """
+        Sums activation of lexical unit vertices per synset. Returns arrays
+        of the activated synset indices and their activation.
+        """
+        synsets = self.vertex_synsets[np.asarray(vertices, dtype=np.int64)]
+        in_synsets = synsets != -1
+
+        indices, merged = np.unique(synsets[in_synsets], return_inverse=True)
+        return indices, np.bincount(merged, weights=np.asarray(activations)[in_synsets], minlength=len(indices))
+
+    def synset_vertices(self, syn_graph):
+        """
+        Vertex of syn_graph of every synset index, -1 for synsets missing in
+        it. As with BaseGraph.get_node_for_synset_id, the last vertex of a
+        synset wins. Built on the first call for a synset graph and again
+        after a delta was applied to it.
+        """
+        if self._syn_graph is not syn_graph or self._syn_graph_revision != syn_graph.revision:
+            self._synset_vertices = self._make_synset_vertices(syn_graph)
+            self._syn_graph = syn_graph
+            self._syn_graph_revision = syn_graph.revision
+        return self._synset_vertices
+
+    def _make_synset_vertices(self, syn_graph):
+        snapshot = syn_graph.snapshot
+        if snapshot is not None and snapshot.has_synset_index:
+            vertex_synset_ids = snapshot.synset_ids
+            vertices = np.arange(len(vertex_synset_ids))
+        else:
+            vertices = []
+            vertex_synset_ids = []
+            for node in syn_graph.all_nodes():
+                if node.synset:
+                    vertices.append(int(node))
+                    vertex_synset_ids.append(node.synset.synset_id)
+            vertices = np.array(vertices, dtype=np.int64)
+
+        indices = self.indices_of(vertex_synset_ids)
+        found = indices != -1
+        indices, vertices = indices[found], vertices[found]
+        last = len(indices) - 1 - np.unique(indices[::-1], return_index=True)[1]
+
+        synset_vertices = np.full(len(self.synset_ids), -1, dtype=np.int64)
+        synset_vertices[indices[last]] = vertices[last]
+        return synset_vertices
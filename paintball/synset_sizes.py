@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class SynsetSizeTable(object):
+    """
+    Number of lexical units of every synset, kept as two arrays sorted by
+    synset id. Synsets missing in the table have size 1, the same value
+    PLWN.synset_len returns for synsets it cannot find.
+    """
+
+    __slots__ = ['synset_ids', 'sizes']
+
+    def __init__(self, synset_ids, sizes):
+        synset_ids = np.asarray(synset_ids, dtype=np.int64)
+        order = np.argsort(synset_ids, kind='mergesort')
+        self.synset_ids = synset_ids[order]
+        self.sizes = np.asarray(sizes, dtype=np.int32)[order]
+
+    def __len__(self):
+        return len(self.synset_ids)
+
+    @classmethod
+    def from_graph(cls, syn_graph):
+        """
+        Builds the table from 'synset' node attributes of a synset graph or
+        from its snapshot arrays.
+        """
+        snapshot = syn_graph.snapshot
+        if snapshot is not None and snapshot.has_synset_index:
+            with_synset = snapshot.synset_ids != -1
+            sizes = np.diff(snapshot.arrays['vertex_lemma_offsets'])
+            return cls(snapshot.synset_ids[with_synset], sizes[with_synset])
+
+        synset_ids = []
+        sizes = []
+        for node in syn_graph.all_nodes():
+            synset = node.synset
+            if synset:
+                synset_ids.append(synset.synset_id)
+                sizes.append(len(synset.lu_set))
+        return cls(synset_ids, sizes)
+
+    @classmethod
+    def from_plwn(cls, plwn, synset_ids):
+        """ Builds the table for given synsets with plwn_utils.PLWN """
+        synset_ids = list(synset_ids)
+        return cls(synset_ids, [plwn.synset_len(synset_id) for synset_id in synset_ids])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['synset_ids'], data['sizes'])
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(f, synset_ids=self.synset_ids, sizes=self.sizes)
+
+    def sizes_of(self, synset_ids):
+        """ Sizes of many synsets at once """
+        synset_ids = np.asarray(synset_ids, dtype=np.int64)
+        positions = np.searchsorted(self.synset_ids, synset_ids)
+        positions[positions == len(self.synset_ids)] = 0
+
+        sizes = np.ones(len(synset_ids), dtype=np.int32)
+        if len(self.synset_ids):
+            found = self.synset_ids[positions] == synset_ids
+            sizes[found] = self.sizes[positions[found]]
+        return sizes
+
+    def synset_len(self, synset_id):
+        return int(self.sizes_of([synset_id])[0])
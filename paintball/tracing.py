@@ -0,0 +1,67 @@
+import json
+
+
+class NullTracer(object):
+    """
+    Tracer doing nothing. Spreading code checks the enabled flag before
+    computing any traced value, so a disabled tracer costs one attribute
+    lookup per visited state.
+    """
+
+    enabled = False
+
+    def begin_source(self, source):
+        pass
+
+    def visit(self, vertex, rel_id, activation):
+        pass
+
+    def visit_many(self, vertices, rel_ids, activations):
+        pass
+
+    def end_source(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonlTracer(NullTracer):
+    """
+    Writes one JSON line per source lemma:
+
+        {"source": "mowa", "visits": [[vertex, rel_id, activation], ...]}
+
+    Visits are expanded spreading states in the order of expansion. Start
+    nodes are reported with rel_id -1.
+    """
+
+    enabled = True
+
+    def __init__(self, path):
+        self._file = open(path, 'w')
+        self._source = None
+        self._visits = []
+
+    def begin_source(self, source):
+        self._source = source
+        self._visits = []
+
+    def visit(self, vertex, rel_id, activation):
+        self._visits.append((int(vertex), int(rel_id), float(activation)))
+
+    def visit_many(self, vertices, rel_ids, activations):
+        self._visits.extend(zip(
+            [int(v) for v in vertices],
+            [int(r) for r in rel_ids],
+            [float(a) for a in activations]
+        ))
+
+    def end_source(self):
+        self._file.write(json.dumps({'source': self._source, 'visits': self._visits}, separators=(',', ':')))
+        self._file.write('\n')
+        self._source = None
+        self._visits = []
+
+    def close(self):
+        self._file.close()
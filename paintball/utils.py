@@ -1,14 +1,24 @@
+import os
+
 from collections import defaultdict
 
 from graph import BaseGraph
+from knowledge_source import read_triples
+from synset_sizes import SynsetSizeTable
 
 
-def load_knowledge_source(path):
-    ks_dict = defaultdict(list)
+def load_knowledge_source(paths):
+    """
+    Loads whole knowledge source files into a dict of source -> [(target,
+    support), ...], see knowledge_source.KnowledgeSourceStream for a lazy
+    alternative.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
 
-    with open(path, 'r') as f:
-        for line in f:
-            source, target, support = line.strip().split(';')
+    ks_dict = defaultdict(list)
+    for path in paths:
+        for source, target, support in read_triples(path):
             ks_dict[source].append((target, support))
 
     return ks_dict
@@ -32,8 +42,33 @@ def load_impedance_table(path):
     return it
 
 
+SNAPSHOT_EXTENSION = '.pbs'
+
+
 def load_graph(graph_path):
+    """
+    Loads a graph_tool graph file and builds its lemma index, or a binary
+    snapshot (*.pbs) with the index already included.
+    """
     graph = BaseGraph()
+    if graph_path.endswith(SNAPSHOT_EXTENSION):
+        graph.load_snapshot(graph_path)
+        return graph
+
     graph.unpickle(graph_path)
     graph.generate_lemma_to_nodes_dict_lexical_units()
     return graph
+
+
+def load_synset_sizes(path, syn_graph):
+    """
+    Loads the synset size table from path. If there is no such file, the
+    table is built from syn_graph and saved there for the next runs.
+    """
+    if path and os.path.exists(path):
+        return SynsetSizeTable.load(path)
+
+    synset_sizes = SynsetSizeTable.from_graph(syn_graph)
+    if path:
+        synset_sizes.save(path)
+    return synset_sizes
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules of paintball import each other as top level modules, e.g. "from csr import CSRGraph",
+# the repository root goes first so that the evaluation package is not shadowed by paintball/evaluation.py
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'paintball')]
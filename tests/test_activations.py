@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from paintball.activations import DenseActivations, SparseActivations
+
+
+def test_dense_activations_reset_and_top_k():
+    Q = DenseActivations(6)
+    Q.add(4, 0.5)
+    Q.add_many([1, 4, 1], [0.25, 0.5, 0.25])
+    Q.add(2, 0.75)
+
+    assert len(Q) == 3
+    assert dict(Q.items()) == {1: 0.5, 2: 0.75, 4: 1.0}
+    assert Q.top_k(2) == [(4, 1.0), (2, 0.75)]
+    assert Q.top_k(5) == [(4, 1.0), (2, 0.75), (1, 0.5)]
+
+    Q.reset()
+    assert len(Q) == 0
+    assert not Q.values.any()
+    Q.add(3, 0.5)
+    assert dict(Q.items()) == {3: 0.5}
+
+    Q.resize(8)
+    Q.add(7, 0.25)
+    assert dict(Q.items()) == {3: 0.5, 7: 0.25}
+
+
+def test_sparse_activations_top_k():
+    Q = SparseActivations()
+    Q.add_many([7, 9, 7, 3], [0.5, 0.125, 0.25, 0.5])
+    assert Q.top_k(2) == [(7, 0.75), (3, 0.5)]
+    assert Q.top_k(5) == [(7, 0.75), (3, 0.5), (9, 0.125)]
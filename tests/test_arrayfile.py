@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from paintball.arrayfile import StringTable, read_arrays, write_arrays
+
+
+def test_write_and_read_arrays(tmpdir):
+    path = str(tmpdir.join('arrays.bin'))
+    arrays = {
+        'offsets': np.array([0, 2, 2, 5], dtype=np.int64),
+        'weights': np.array([0.7, 1.0, 0.4, 0.6, 1.0]),
+        'empty': np.zeros(0, dtype=np.int32),
+    }
+    write_arrays(path, arrays, meta={'directed': True})
+
+    for mmap in (True, False):
+        loaded, meta = read_arrays(path, mmap=mmap)
+        assert meta == {'directed': True}
+        assert sorted(loaded) == sorted(arrays)
+        for name, array in arrays.items():
+            assert loaded[name].dtype == array.dtype
+            assert (loaded[name] == array).all()
+
+
+def test_string_table_find():
+    lemmas = sorted(s.encode('utf-8') for s in [u'kwiat', u'tulipan', u'żółw', u'test'])
+    table = StringTable.from_strings(lemmas)
+
+    assert len(table) == 4
+    assert table[table.find(u'żółw')] == u'żółw'
+    assert table.find(u'testowy') == -1
+    assert [table.find(s) for s in table] == [0, 1, 2, 3]
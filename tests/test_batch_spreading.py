@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from paintball.batch_spreading import BatchSpreader
+from paintball.csr import CSRGraph
+from paintball.sparse_operator import SpreadingOperator
+
+
+def make_graph():
+    # a cycle 0 -> 1 -> 2 -> 0 with a shortcut 0 -> 2 of the second relation
+    csr = CSRGraph.from_edges(
+        4,
+        sources=[0, 1, 2, 0, 2],
+        targets=[1, 2, 0, 2, 3],
+        rel_ids=[0, 0, 0, 1, 1],
+        weights=[1.0, 0.7, 1.0, 0.6, 1.0]
+    )
+    # rows are incoming relations and the start row, columns outgoing ones
+    impedance = np.array([[1.0, 0.0], [1.0, 1.0], [1.0, 1.0]])
+    return csr, csr.rel_ids, impedance
+
+
+def test_batch_spreader_matches_operator():
+    csr, rel_positions, impedance = make_graph()
+    vertices = [0, 2, 0, 1]
+    activations = [1.0, 0.5, 0.3, 0.05]
+
+    expected = SpreadingOperator(csr, rel_positions, impedance, 0.8).spread(vertices, activations, 0.1).toarray()
+    for width in (1, 2, 64):
+        spreader = BatchSpreader(csr, rel_positions, impedance, 0.8, width)
+        assert np.allclose(spreader.spread(vertices, activations, 0.1).toarray(), expected)
+
+
+def test_batch_spreader_stats():
+    csr, rel_positions, impedance = make_graph()
+    stats = {}
+    BatchSpreader(csr, rel_positions, impedance, 0.8).spread([0, 3], [1.0, 1.0], 0.5, stats)
+
+    # vertex 3 has no out-edges, so its column stops at the start
+    assert stats['levels'][0].tolist() == [1, 1]
+    assert stats['relaxations'][1] == 0
+    assert stats['relaxations'][0] > 0
+
+
+def test_batch_spreader_ends_on_synonym_cycles():
+    # three synonyms linked both ways, with full transmittance
+    csr = CSRGraph.from_edges(
+        3,
+        sources=[0, 1, 1, 2, 0, 2],
+        targets=[1, 0, 2, 1, 2, 0],
+        rel_ids=[0] * 6,
+        weights=[1.0] * 6
+    )
+    impedance = np.ones((2, 1))
+    vertices = [0, 0, 1]
+    activations = [1.0, 0.5, 1.0]
+
+    # 2 ** d paths of length d leave a start vertex, each passing its
+    # activation times 0.8 ** d, down to 0.125
+    expected = [sum(1.6 ** d for d in range(1, 10)),
+                sum(0.5 * 1.6 ** d for d in range(1, 7)),
+                sum(1.6 ** d for d in range(1, 10))]
+    operator = SpreadingOperator(csr, csr.rel_ids, impedance, 0.8).spread(vertices, activations, 0.125).toarray()
+    assert np.allclose(operator.sum(axis=0), expected)
+    for width in (1, 2, 64):
+        spreader = BatchSpreader(csr, csr.rel_ids, impedance, 0.8, width)
+        assert np.allclose(spreader.spread(vertices, activations, 0.125).toarray(), operator)
+
+
+def test_batch_spreader_shares_columns_of_a_vertex():
+    csr, rel_positions, impedance = make_graph()
+    stats = {}
+    spreader = BatchSpreader(csr, rel_positions, impedance, 0.8)
+    spread = spreader.spread([0, 0], [1.0, 0.2], 0.15, stats).toarray()
+
+    # the less activated start node leaves vertex 0 with the stricter cutoff
+    expected_stats = {}
+    expected = SpreadingOperator(csr, rel_positions, impedance, 0.8).spread([0, 0], [1.0, 0.2], 0.15, expected_stats)
+    assert np.allclose(spread, expected.toarray())
+    assert stats['relaxations'].tolist() == expected_stats['relaxations'].tolist()
+    assert stats['levels'][0].tolist() == [1, 1]
+    assert stats['levels'][1][1] < stats['levels'][1][0]
+
+
+def test_batch_spreader_growing_factors():
+    # the second edge raises the factor of the path, so it may not be
+    # followed by paths whose first edge fell below the cutoff
+    csr = CSRGraph.from_edges(
+        3,
+        sources=[0, 1],
+        targets=[1, 2],
+        rel_ids=[0, 0],
+        weights=[0.5, 1.5]
+    )
+    impedance = np.ones((2, 1))
+    vertices = [0, 0]
+    activations = [1.0, 0.3]
+
+    expected = SpreadingOperator(csr, csr.rel_ids, impedance, 0.8).spread(vertices, activations, 0.13).toarray()
+    assert np.allclose(expected[:, 1], 0.0)
+    spread = BatchSpreader(csr, csr.rel_ids, impedance, 0.8).spread(vertices, activations, 0.13)
+    assert np.allclose(spread.toarray(), expected)
@@ -0,0 +1,65 @@
+import random
+
+from collections import defaultdict, deque
+
+import numpy as np
+
+from paintball.csr import CSRGraph
+from paintball.distances import DistanceEvaluator
+
+
+class GraphStub(object):
+    """ Directed graph of random edges with its CSR view """
+
+    def __init__(self, num_vertices, num_edges, seed):
+        rnd = random.Random(seed)
+        self.edges = [(rnd.randrange(num_vertices), rnd.randrange(num_vertices)) for _ in range(num_edges)]
+        self.num_vertices = num_vertices
+
+    def is_directed(self):
+        return True
+
+    def csr(self):
+        sources, targets = zip(*self.edges)
+        return CSRGraph.from_edges(self.num_vertices, sources, targets,
+                                   np.zeros(len(self.edges)), np.ones(len(self.edges)))
+
+
+def shortest_distance(edges, source, targets, max_dist):
+    """ Plain breadth-first search from source over undirected edges """
+    neighbours = defaultdict(set)
+    for a, b in edges:
+        neighbours[a].add(b)
+        neighbours[b].add(a)
+
+    distances = {source: 0}
+    queue = deque([source])
+    while queue:
+        vertex = queue.popleft()
+        if vertex in targets:
+            return distances[vertex]
+        if distances[vertex] == max_dist:
+            continue
+        for neighbour in sorted(neighbours[vertex]):
+            if neighbour not in distances:
+                distances[neighbour] = distances[vertex] + 1
+                queue.append(neighbour)
+    return -1
+
+
+def test_distances_to_nearest_like_breadth_first_search():
+    rnd = random.Random(5)
+    for seed in range(10):
+        graph = GraphStub(60, 70, seed)
+        evaluator = DistanceEvaluator(graph, max_dist=4)
+        for _ in range(10):
+            sources = [rnd.randrange(60) for _ in range(rnd.randrange(1, 6))]
+            targets = [rnd.randrange(60) for _ in range(rnd.randrange(0, 4))]
+            expected = [shortest_distance(graph.edges, source, set(targets), 4) for source in sources]
+            assert evaluator.distances_to_nearest(sources, targets).tolist() == expected
+
+
+def test_distances_to_nearest_without_sources_or_targets():
+    evaluator = DistanceEvaluator(GraphStub(5, 4, 0))
+    assert evaluator.distances_to_nearest([], [1, 2]).tolist() == []
+    assert evaluator.distances_to_nearest([1, 2], []).tolist() == [-1, -1]
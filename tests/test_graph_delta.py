@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+import io
+
+import numpy as np
+import pytest
+
+from paintball.graph_delta import GraphDelta, LexicalUnit, Synset, read_delta
+from paintball.lemma_index import LemmaIndex
+from paintball.profile_cache import ActivationProfile, ActivationProfileCache
+
+WEIGHTS = {10: 0.5, 11: 0.5, 12: 0.3, 888: 0.9, -1: 1.0}
+
+# lexical units (lu_id, synset_id, lemma) by vertex and relations between
+# them before and after LU_DELTA, a removed lexical unit keeps its vertex
+LUS = [(100, 1, u'kot'), (101, 1, u'kocur'), (102, 2, u'pies'), (103, 3, u'żółw'), (104, 3, u'Kot')]
+RELATIONS = [(100, 101, 888), (101, 100, 888), (100, 102, 11), (102, 100, 10),
+             (103, 104, 888), (104, 103, 888), (102, 103, 12)]
+LUS_AFTER = LUS[:3] + [None, LUS[4], (105, 2, u'pies domowy'), (106, 4, u'kot')]
+RELATIONS_AFTER = [(100, 101, 888), (101, 100, 888), (102, 100, 10),
+                   (105, 102, 888), (102, 105, 888), (106, 100, 11)]
+
+# synsets (synset_id, lemmas) by vertex before and after SYNSET_DELTA
+SYNSETS = [(1, [u'kot', u'kocur']), (2, [u'pies']), (3, [u'żółw']), (4, [u'Kot'])]
+SYNSET_RELATIONS = [(1, 2), (2, 1), (3, 4), (4, 1)]
+SYNSETS_AFTER = [(1, [u'kot']), (2, [u'pies', u'pies domowy']), None, (4, [u'Kot']), (5, [u'kot'])]
+SYNSET_RELATIONS_AFTER = [(2, 1), (4, 1), (5, 2)]
+
+
+def lu_delta():
+    delta = GraphDelta()
+    delta.add('-', 'lu', ['103', '3', u'żółw'])
+    delta.add('-', 'rel', ['100', '102', '11'])
+    delta.add('+', 'lu', ['105', '2', u'pies domowy'])
+    delta.add('+', 'lu', ['106', '4', u'kot'])
+    for source, target, rel_id in RELATIONS_AFTER[3:]:
+        delta.add('+', 'rel', [str(source), str(target), str(rel_id)])
+    return delta
+
+
+def synset_delta():
+    delta = GraphDelta()
+    delta.add('-', 'synset', ['3'])
+    delta.add('-', 'lu', ['101', '1', u'kocur'])
+    delta.add('-', 'rel', ['1', '2', '-1'])
+    delta.add('+', 'lu', ['105', '2', u'pies domowy'])
+    delta.add('+', 'lu', ['106', '5', u'kot'])
+    delta.add('+', 'rel', ['5', '2', '-1'])
+    return delta
+
+
+def make_lu_graph(lus, relations):
+    from paintball.graph import BaseGraph
+
+    graph = BaseGraph()
+    graph.init_graph(drctd=True)
+    graph.create_node_attribute('lu', 'object')
+    graph.create_node_attribute('synset_id', 'int')
+    graph.create_edge_attribute('rel_id', 'int')
+    graph.create_edge_attribute('weight', 'float')
+    for vertex, lu in enumerate(lus):
+        if lu is None:
+            graph.add_node(vertex, [('lu', None), ('synset_id', -1)])
+        else:
+            graph.add_node(lu[0], [('lu', LexicalUnit(lu[0], lu[2])), ('synset_id', lu[1])])
+    for source, target, rel_id in relations:
+        graph.add_edge(graph.get_node(source), graph.get_node(target),
+                       [('rel_id', rel_id), ('weight', WEIGHTS[rel_id])])
+    graph.generate_lemma_to_nodes_dict_lexical_units()
+    graph.csr()
+    return graph
+
+
+def make_synset_graph(synsets, relations):
+    from paintball.graph import BaseGraph
+
+    graph = BaseGraph()
+    graph.init_graph(drctd=True)
+    graph.create_node_attribute('synset', 'object')
+    for vertex, synset in enumerate(synsets):
+        if synset is None:
+            graph.add_node(-vertex, [('synset', None)])
+        else:
+            synset_id, lemmas = synset
+            lus = [LexicalUnit(100 * synset_id + i, lemma) for i, lemma in enumerate(lemmas)]
+            graph.add_node(synset_id, [('synset', Synset(synset_id, lus))])
+    for source, target in relations:
+        graph.add_edge(graph.get_node(source), graph.get_node(target))
+    graph.generate_lemma_to_nodes_dict_synsets()
+    return graph
+
+
+def out_edges(offsets, targets, rel_ids, weights):
+    """ Out-edges of every vertex as sorted (target, rel_id, weight), edge order within a vertex aside """
+    offsets = np.asarray(offsets)
+    return [sorted(zip(np.asarray(targets)[begin:end].tolist(), np.asarray(rel_ids)[begin:end].tolist(),
+                       np.asarray(weights)[begin:end].tolist()))
+            for begin, end in zip(offsets[:-1], offsets[1:])]
+
+
+def assert_same_lemma_index(index, expected):
+    assert list(index.lemmas) == list(expected.lemmas)
+    assert index.offsets.tolist() == expected.offsets.tolist()
+    assert index.vertices.tolist() == expected.vertices.tolist()
+
+
+def assert_same_snapshot(snapshot, graph):
+    from paintball.snapshot import snapshot_arrays
+
+    arrays, meta = snapshot_arrays(graph)
+    assert snapshot.num_vertices == meta['num_vertices']
+    topology = ('offsets', 'targets', 'rel_ids', 'weights')
+    assert out_edges(*[snapshot.arrays[name] for name in topology]) == \
+        out_edges(*[arrays[name] for name in topology])
+    for name, values in arrays.items():
+        if name not in topology:
+            assert np.asarray(snapshot.arrays[name]).tolist() == values.tolist(), name
+
+
+def test_read_delta(tmpdir):
+    path = str(tmpdir.join('plwn.delta'))
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(u'# new lexical units\n'
+                u'+lu\t12\t7\tdom towarowy\n'
+                u'-lu\t13\t7\tżółw\n'
+                u'\n'
+                u'-synset\t8\n'
+                u'+rel\t12\t4\t11\n'
+                u'-rel\t4\t13\t10\n')
+
+    delta = read_delta(path)
+    assert len(delta) == 5
+    assert delta.added_lus == [(12, 7, u'dom towarowy')]
+    assert delta.removed_lus == [(13, 7, u'żółw')]
+    assert delta.removed_synsets == [8]
+    assert delta.added_relations == [(12, 4, 11)]
+    assert delta.removed_relations == [(4, 13, 10)]
+
+    with io.open(path, 'a', encoding='utf-8') as f:
+        f.write(u'*rel\t4\t13\t10\n')
+    with pytest.raises(ValueError) as e:
+        read_delta(path)
+    assert ':8:' in str(e.value)
+
+
+def test_lemma_index_updated_like_rebuilt():
+    index = LemmaIndex.from_pairs([u'kot', u'pies', u'kot', u'żółw', u'pies'], [0, 1, 2, 3, 3])
+    updated = index.updated(
+        removed_vertices=[2],
+        removed_pairs=[(u'pies', 3)],
+        added_pairs=[(u'dom', 4), (u'kot', 1)]
+    )
+    rebuilt = LemmaIndex.from_pairs([u'kot', u'kot', u'pies', u'żółw', u'dom'], [0, 1, 1, 3, 4])
+
+    assert list(updated.lemmas) == list(rebuilt.lemmas)
+    assert updated.offsets.tolist() == rebuilt.offsets.tolist()
+    assert updated.vertices.tolist() == rebuilt.vertices.tolist()
+
+
+def test_invalidate_profiles_reaching_vertices():
+    cache = ActivationProfileCache()
+    cache.put(0, ActivationProfile([0, 1, 2], [1.0, 0.8, 0.5], 0.0, 1.0))
+    cache.put(5, ActivationProfile([5, 6], [1.0, 0.7], 0.0, 1.0))
+    cache.put(7, ActivationProfile([7], [1.0], 0.0, 1.0))
+
+    assert sorted(cache.invalidate([2, 7])) == [0, 7]
+    assert len(cache) == 1
+    assert cache.stats()['entries'] == 2
+
+
+def test_apply_delta_to_lexical_unit_graph_like_rebuilt(tmpdir):
+    pytest.importorskip('graph_tool')
+    from paintball.csr import CSRGraph
+    from paintball.graph import BaseGraph
+
+    path = str(tmpdir.join('lu.pbs'))
+    graph = make_lu_graph(LUS, RELATIONS)
+    graph.save_snapshot(path)
+    report = graph.apply_delta(lu_delta(), WEIGHTS)
+    rebuilt = make_lu_graph(LUS_AFTER, RELATIONS_AFTER)
+
+    assert report.removed_vertices == [3]
+    assert report.added_vertices == [5, 6]
+    assert not report.skipped
+    assert_same_lemma_index(graph.lemma_index, rebuilt.lemma_index)
+    rebuilt._make_lu_on_v_dict()
+    assert dict((lu_id, int(node)) for lu_id, node in graph._lu_on_vertex_dict.items()) == \
+        dict((lu_id, int(node)) for lu_id, node in rebuilt._lu_on_vertex_dict.items())
+    for csr in (graph.csr(), CSRGraph.from_graph(graph)):
+        assert out_edges(csr.offsets, csr.targets, csr.rel_ids, csr.weights) == \
+            out_edges(rebuilt.csr().offsets, rebuilt.csr().targets, rebuilt.csr().rel_ids, rebuilt.csr().weights)
+
+    loaded = BaseGraph()
+    loaded.load_snapshot(path)
+    loaded.apply_delta(lu_delta(), WEIGHTS)
+    assert_same_lemma_index(loaded.lemma_index, rebuilt.lemma_index)
+    assert_same_snapshot(loaded.snapshot, rebuilt)
+
+
+def test_apply_delta_to_synset_graph_like_rebuilt(tmpdir):
+    pytest.importorskip('graph_tool')
+    from paintball.graph import BaseGraph
+
+    path = str(tmpdir.join('synsets.pbs'))
+    graph = make_synset_graph(SYNSETS, SYNSET_RELATIONS)
+    graph.save_snapshot(path)
+    report = graph.apply_delta(synset_delta(), WEIGHTS)
+    rebuilt = make_synset_graph(SYNSETS_AFTER, SYNSET_RELATIONS_AFTER)
+
+    assert report.removed_vertices == [2]
+    assert report.added_vertices == [4]
+    assert not report.skipped
+    assert_same_lemma_index(graph.lemma_index, rebuilt.lemma_index)
+
+    loaded = BaseGraph()
+    loaded.load_snapshot(path)
+    loaded.apply_delta(synset_delta(), WEIGHTS)
+    assert_same_lemma_index(loaded.lemma_index, rebuilt.lemma_index)
+    assert_same_snapshot(loaded.snapshot, rebuilt)
+
+    for synset_id in range(7):
+        expected = rebuilt.get_node_for_synset_id(synset_id)
+        for changed in (graph, loaded):
+            node = changed.get_node_for_synset_id(synset_id)
+            assert (node is None) == (expected is None), synset_id
+            if node is not None:
+                assert int(node) == int(expected)
+                assert sorted(changed.node_lemmas(node)) == sorted(rebuilt.node_lemmas(expected))
@@ -0,0 +1,128 @@
+import itertools
+
+import numpy as np
+import pytest
+
+pytest.importorskip('graph_tool')
+from paintball.graph import BaseGraph
+
+EDGES = [(0, 1, 10), (1, 2, 11), (2, 0, 10), (2, 3, 12), (3, 4, 10), (4, 5, 11), (5, 3, 10), (6, 7, 12), (1, 6, 10)]
+NUM_NODES = 8
+
+
+def make_graph(hidden=None, hidden_inverted=False):
+    """ Graph of nodes named by lu_id, with nodes of the hidden mask, if given, soft filtered out """
+    graph = BaseGraph()
+    graph.init_graph(drctd=True)
+    graph.create_node_attribute('lu_id', 'int')
+    graph.create_edge_attribute('rel_id', 'int')
+    for lu_id in range(NUM_NODES):
+        graph.add_node(lu_id, [('lu_id', lu_id)])
+    for source, target, rel_id in EDGES:
+        graph.add_edge(graph.get_node(source), graph.get_node(target), [('rel_id', rel_id)])
+
+    if hidden is not None:
+        g = graph.use_graph_tool()
+        old_filter = g.new_vertex_property('bool')
+        old_filter.a = np.asarray(hidden, dtype=bool) == hidden_inverted
+        g.set_vertex_filter(old_filter, hidden_inverted)
+    return graph
+
+
+def nodes_filter_conditional(graph, predicate, inverted=False, replace=False, soft=False):
+    """ Node filter by predicate as BaseGraph had it before nodes_filter_mask """
+    g = graph.use_graph_tool()
+    (old_filter, old_inverted) = g.get_vertex_filter()
+    new_filter = g.new_vertex_property("bool")
+
+    for node in graph.all_nodes():
+        kept = predicate(node) != inverted
+        if not replace and old_filter:
+            old_kept = bool(old_filter[node._node]) != old_inverted
+            kept = kept and old_kept
+        new_filter[node._node] = kept
+
+    g.set_vertex_filter(new_filter, False)
+    if not soft:
+        graph.apply_nodes_filter()
+
+
+def edges_filter(graph, edges_to_filter_set):
+    """ Edge filter by set as BaseGraph had it before edges_filter_mask """
+    g = graph.use_graph_tool()
+    edge_filter = g.new_edge_property("bool")
+
+    for e in graph.all_edges():
+        if e in edges_to_filter_set:
+            edge_filter[e._edge] = False
+        else:
+            edge_filter[e._edge] = True
+
+    g.set_edge_filter(edge_filter)
+    g.purge_edges()
+
+
+def visible(graph):
+    nodes = sorted(node.lu_id for node in graph.all_nodes())
+    edges = sorted((e.source().lu_id, e.target().lu_id, e.rel_id) for e in graph.all_edges())
+    return nodes, edges
+
+
+def assert_same_graphs(expected, *graphs):
+    """ Compares visible nodes and edges of graphs, then once more with node filters reset """
+    for graph in graphs:
+        assert visible(graph) == visible(expected)
+    for graph in (expected,) + graphs:
+        graph.reset_nodes_filter()
+    for graph in graphs:
+        assert visible(graph) == visible(expected)
+
+
+HIDDEN = [False, True, False, False, True, False, False, False]
+FILTERED = [1, 3, 6]
+
+
+@pytest.mark.parametrize('hidden, hidden_inverted', [(None, False), (HIDDEN, False), (HIDDEN, True)])
+def test_nodes_filters_like_predicate_filter(hidden, hidden_inverted):
+    for inverted, replace, soft in itertools.product([False, True], repeat=3):
+        flags = (inverted, replace, soft)
+
+        expected = make_graph(hidden, hidden_inverted)
+        nodes = set(expected.get_node(lu_id) for lu_id in FILTERED)
+        nodes_filter_conditional(expected, lambda node: node not in nodes, *flags)
+
+        by_set = make_graph(hidden, hidden_inverted)
+        by_set.nodes_filter(set(by_set.get_node(lu_id) for lu_id in FILTERED), *flags)
+        by_array = make_graph(hidden, hidden_inverted)
+        by_array.nodes_filter_array(np.array(FILTERED), *flags)
+        assert_same_graphs(expected, by_set, by_array)
+
+        expected = make_graph(hidden, hidden_inverted)
+        nodes_filter_conditional(expected, lambda node: node.lu_id % 2 == 0, *flags)
+        graph = make_graph(hidden, hidden_inverted)
+        graph.nodes_filter_mask(np.arange(NUM_NODES) % 2 == 0, *flags)
+        assert_same_graphs(expected, graph)
+
+
+@pytest.mark.parametrize('hidden', [None, HIDDEN])
+def test_edges_filters_like_set_filter(hidden):
+    removed = [(2, 0, 10), (4, 5, 11), (6, 7, 12)]
+
+    def edges_of(graph):
+        return set(e for e in graph.all_edges() if (e.source().lu_id, e.target().lu_id, e.rel_id) in removed)
+
+    expected = make_graph(hidden)
+    edges_filter(expected, edges_of(expected))
+
+    by_set = make_graph(hidden)
+    by_set.edges_filter(edges_of(by_set))
+    by_array = make_graph(hidden)
+    g = by_array.use_graph_tool()
+    by_array.edges_filter_array([g.edge_index[e._edge] for e in edges_of(by_array)])
+    assert_same_graphs(expected, by_set, by_array)
+
+    expected = make_graph(hidden)
+    edges_filter(expected, set(e for e in expected.all_edges() if e.rel_id == 10))
+    graph = make_graph(hidden)
+    graph.edges_filter_mask(np.asarray(graph.get_edge_attribute_array('rel_id')) != 10)
+    assert_same_graphs(expected, graph)
@@ -1,4 +1,6 @@
-from paintball.knowledge_source import KnowledgeSource
+import pytest
+
+from paintball.knowledge_source import KnowledgeSource, KnowledgeSourceStream
 
 
 TEST_KNOWLEDGE_SOURCES_DIR = './knowledge_source'
@@ -20,3 +22,46 @@ def test_load_knowledge_source():
     ks.load()
 
     assert str(ks.knowledge_dict) == TEST_KNOWLEDGE_SOURCE_DICT
+
+
+def _write(path, lines):
+    path.write('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_stream_groups_adjacent_lines(tmpdir):
+    path = _write(tmpdir.join('ks.csv'), [
+        'test;testowy;0.600',
+        'test;tester;0.500',
+        '',
+        'tulipan;kwiat;0.400',
+    ])
+
+    items = list(KnowledgeSourceStream(path).items())
+
+    assert items == [
+        ('test', [('testowy', 0.6), ('tester', 0.5)]),
+        ('tulipan', [('kwiat', 0.4)]),
+    ]
+
+
+def test_stream_merges_sorted_files(tmpdir):
+    first = _write(tmpdir.join('a.tsv'), ['test\ttestowy\t0.600', 'tulipan\tkwiat\t0.400'])
+    second = _write(tmpdir.join('b.tsv'), ['test\ttesterski\t0.700', 'tulipan\ttyskie\t0.700'])
+
+    stream = KnowledgeSourceStream([first, second])
+
+    assert list(stream.items()) == [
+        ('test', [('testerski', 0.7), ('testowy', 0.6)]),
+        ('tulipan', [('kwiat', 0.4), ('tyskie', 0.7)]),
+    ]
+    assert list(stream) == ['test', 'tulipan']
+    assert list(KnowledgeSourceStream(str(tmpdir)).items()) == list(stream.items())
+
+
+def test_stream_rejects_unsorted_files(tmpdir):
+    first = _write(tmpdir.join('a.csv'), ['tulipan;kwiat;0.4', 'test;testowy;0.6'])
+    second = _write(tmpdir.join('b.csv'), ['test;tester;0.5'])
+
+    with pytest.raises(ValueError):
+        list(KnowledgeSourceStream([first, second]).items())
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+
+import pytest
+
+from paintball.metrics import FIELDS, PHASES, SourceMetrics
+from paintball.paint_ball import BATCHED, BEST_FIRST, FRONTIER, SPARSE, VECTORIZED
+from test_spreading import SYNSET_SIZES, SynsetGraphStub, make_paint_ball
+
+ITEMS = [
+    ('kotek', [(u'kot', '1.0'), (u'zwierzę', '0.2')]),
+    ('szczeniak', [(u'kundel', '0.1')]),
+]
+
+
+def attach_measured(engine):
+    metrics = SourceMetrics()
+    paint_ball = make_paint_ball(engine, 0.8, 0.05, metrics=metrics, synset_sizes=SYNSET_SIZES)
+    lead_nodes = paint_ball.attach_batch(ITEMS, SynsetGraphStub([10, 20, 30]))
+    return lead_nodes, metrics
+
+
+def test_records_of_attached_sources():
+    relaxed = {}
+    for engine in (FRONTIER, VECTORIZED, BEST_FIRST, SPARSE, BATCHED):
+        lead_nodes, metrics = attach_measured(engine)
+        paint_ball = make_paint_ball(engine, 0.8, 0.05, synset_sizes=SYNSET_SIZES)
+        assert [record['source'] for record in metrics.records] == [source for source, _ in ITEMS]
+
+        for record, (_, targets_supports), leads in zip(metrics.records, ITEMS, lead_nodes):
+            assert list(record) == FIELDS
+            T = paint_ball._initial_activation(targets_supports)
+            Q = paint_ball._spread(T)
+            assert record['start_nodes'] == len(T)
+            assert record['q_size'] == len(Q[0])
+            assert record['activated_synsets'] == len(paint_ball.synset_activation(Q))
+            assert record['components'] == len(leads)
+            assert record['max_frontier'] > 0
+            assert all(record['seconds_' + phase] >= 0 for phase in PHASES)
+            assert record['seconds'] == pytest.approx(sum(record['seconds_' + phase] for phase in PHASES))
+        relaxed[engine] = [record['edges_relaxed'] for record in metrics.records]
+
+    # every engine relaxes the out-edges of the same states
+    assert all(edges_relaxed == relaxed[FRONTIER] for edges_relaxed in relaxed.values())
+    assert relaxed[FRONTIER][0] > relaxed[FRONTIER][1] > 0
+
+
+def test_csv_json_and_summary(tmpdir):
+    _, metrics = attach_measured(FRONTIER)
+
+    csv_path = str(tmpdir.join('metrics.csv'))
+    metrics.save(csv_path)
+    with open(csv_path) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == FIELDS
+    assert [row[0] for row in rows[1:]] == [source for source, _ in ITEMS]
+    assert [int(row[FIELDS.index('start_nodes')]) for row in rows[1:]] == \
+        [record['start_nodes'] for record in metrics.records]
+
+    json_path = str(tmpdir.join('metrics.json'))
+    metrics.save(json_path)
+    with open(json_path) as f:
+        assert json.load(f) == json.loads(json.dumps(metrics.records))
+
+    lines = metrics.summary(1).splitlines()
+    assert lines[0].startswith('2 sources') and lines[0].endswith('the slowest 1:')
+    assert len(lines) == 3
+    assert lines[2].endswith(metrics.slowest(1)[0]['source'])
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+from paintball.metrics import SourceMetrics
+from paintball.paint_ball import format_lead_nodes
+from paintball.parallel import iter_parallel, make_shards
+from paintball.tracing import NullTracer
+
+
+class SynsetGraphStub(object):
+    """ Synsets graph whose nodes are synset ids """
+
+    def node_synset_id(self, node):
+        return node
+
+    def node_lemmas(self, node):
+        return ['lemma{}'.format(node)]
+
+
+class PaintBallStub(object):
+    """ Attaches every source to the synset numbered by its number of targets """
+
+    def __init__(self, knowledge_source):
+        self.knowledge_source = knowledge_source
+        self.tracer = NullTracer()
+        self.metrics = SourceMetrics()
+
+    def attach_batch(self, items, syn_graph):
+        for source, _ in items:
+            self.metrics.begin_source(source)
+            self.metrics.end_source()
+        return [[len(targets_supports)] for _, targets_supports in items]
+
+
+def test_make_shards():
+    assert list(make_shards(iter(range(10)), 4)) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert list(make_shards([], 4)) == []
+
+
+def test_iter_parallel_keeps_source_order():
+    knowledge_source = OrderedDict(
+        ('source{}'.format(i), [('target{}'.format(j), '0.5') for j in range(i % 7)]) for i in range(50))
+    paint_ball = PaintBallStub(knowledge_source)
+    syn_graph = SynsetGraphStub()
+
+    results = list(iter_parallel(paint_ball, syn_graph, processes=2, shard_size=3))
+
+    assert results == [
+        format_lead_nodes(source, [len(targets_supports)], syn_graph)
+        for source, targets_supports in knowledge_source.items()
+    ]
+    # every source was attached once, by one of the workers
+    assert sorted(record['source'] for record in paint_ball.metrics.records) == sorted(knowledge_source)
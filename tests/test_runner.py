@@ -0,0 +1,90 @@
+import os
+
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from paintball.csr import CSRGraph
+
+# evaluation.evaluation loads synset graphs with paintball.graph.BaseGraph
+pytest.importorskip('graph_tool')
+from evaluation.runner import DISTANCES_FILE, FREQUENCIES_FILE, _shard_paths, _write_progress, evaluate
+
+# synsets 100 + vertex, a chain 0-1-2-3 and an edge 4-5
+EDGES = [(0, 1), (1, 2), (2, 3), (4, 5)]
+LEMMA_VERTICES = {'a': [0], 'b': [2, 4], 'c': [5], 'd': [], 'e': [3]}
+RESULTS = [('a', 103), ('a', 105), ('b', 100), ('c', 104), ('d', 100), ('e', 101), ('e', 999)]
+
+
+class SynsetGraphStub(object):
+    """ Synsets graph given by its edges and lemmas of its vertices """
+
+    def __init__(self):
+        self.lemma_to_nodes_dict = defaultdict(set)
+        for lemma, vertices in LEMMA_VERTICES.items():
+            self.lemma_to_nodes_dict[lemma].update(vertices)
+
+    def is_directed(self):
+        return False
+
+    def csr(self):
+        sources, targets = zip(*EDGES)
+        return CSRGraph.from_edges(6, sources + targets, targets + sources, np.zeros(8), np.ones(8))
+
+    def get_node_for_synset_id(self, synset_id):
+        return synset_id - 100 if 100 <= synset_id < 106 else None
+
+
+def write_results(path):
+    with open(path, 'w') as f:
+        for lemma, synset_id in reversed(RESULTS):
+            f.write("{};{};lemat\n".format(lemma, synset_id))
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_evaluate_in_lemma_order(tmpdir):
+    results_path = str(tmpdir.join('results.txt'))
+    write_results(results_path)
+    output_dir = str(tmpdir.join('run'))
+
+    evaluate(SynsetGraphStub(), results_path, output_dir, processes=2, shard_size=2)
+
+    assert read(os.path.join(output_dir, DISTANCES_FILE)).splitlines() == [
+        'a,3', 'b,2', 'b,-1', 'c,1', 'e,2'
+    ]
+    assert read(os.path.join(output_dir, FREQUENCIES_FILE)).splitlines() == ['1,1', '2,2', '3,1']
+
+
+def test_evaluate_resumes_truncated_shards(tmpdir):
+    results_path = str(tmpdir.join('results.txt'))
+    write_results(results_path)
+    output_dir = str(tmpdir.join('run'))
+    evaluate(SynsetGraphStub(), results_path, output_dir, processes=2, shard_size=2)
+    expected = read(os.path.join(output_dir, DISTANCES_FILE))
+
+    # the first lemma of shard 0 is done, the second one was cut off
+    # halfway; shard 1 was not started and shard 2 is complete
+    csv_path, progress_path = _shard_paths(output_dir, 0)
+    with open(csv_path, 'w') as f:
+        f.write('a,3\nb,2\nb,')
+    _write_progress(progress_path, 1, len('a,3\n'))
+    for path in _shard_paths(output_dir, 1):
+        os.remove(path)
+    # a completed shard is not evaluated again
+    csv_path, _ = _shard_paths(output_dir, 2)
+    with open(csv_path, 'w') as f:
+        f.write('e,7\n')
+    os.remove(os.path.join(output_dir, DISTANCES_FILE))
+
+    evaluate(SynsetGraphStub(), results_path, output_dir, processes=2, shard_size=2)
+
+    assert read(os.path.join(output_dir, DISTANCES_FILE)) == expected.replace('e,2\n', 'e,7\n')
+    assert read(_shard_paths(output_dir, 0)[0]) == 'a,3\nb,2\nb,-1\n'
+
+    with pytest.raises(ValueError):
+        evaluate(SynsetGraphStub(), results_path, output_dir, processes=2, shard_size=3)
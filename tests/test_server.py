@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+import pytest
+
+try:
+    from http.client import HTTPConnection
+except ImportError:
+    from httplib import HTTPConnection
+
+# the server loads graphs and settings with paintball.main
+for module in ('graph_tool', 'dotenv', 'pathlib2'):
+    pytest.importorskip(module)
+from paintball.server import LatencyMetrics, PaintBallServer, parse_attach_request
+
+
+class AttacherStub(object):
+    """ Attaches every source to the synsets numbered by supports of its targets """
+
+    def attach(self, source, targets_supports):
+        if source == 'error':
+            raise RuntimeError('Attaching failed')
+        return [{'synset_id': int(support * 10), 'lemmas': [target]} for target, support in targets_supports]
+
+    def close(self):
+        pass
+
+
+def test_parse_attach_request():
+    assert parse_attach_request('{"source": "kot", "targets": [["zwierzę", 0.5], ["kocur", "0.7"]]}') == \
+        (u'kot', [(u'zwierzę', 0.5), (u'kocur', 0.7)])
+    assert parse_attach_request(b'{"source": "kot", "targets": {"kocur": 1}}') == (u'kot', [(u'kocur', 1.0)])
+
+    for body in ('[]', '{"source": "kot"}', '{"targets": []}', 'kot', '{"source": "kot", "targets": [["kocur"]]}',
+                 '{"source": "kot", "targets": [["kocur", "dużo"]]}'):
+        with pytest.raises(ValueError):
+            parse_attach_request(body)
+
+
+def test_latency_metrics():
+    metrics = LatencyMetrics(window=4)
+    assert metrics.snapshot() == {
+        'requests': 0, 'errors': 0, 'mean_ms': 0.0, 'max_ms': 0.0, 'p50_ms': 0.0, 'p90_ms': 0.0, 'p99_ms': 0.0
+    }
+
+    for seconds in (0.5, 0.001, 0.002, 0.003, 0.004):
+        metrics.record(seconds, error=seconds > 0.1)
+    snapshot = metrics.snapshot()
+    assert snapshot['requests'] == 5 and snapshot['errors'] == 1
+    assert snapshot['mean_ms'] == pytest.approx(102.0)
+    assert snapshot['max_ms'] == pytest.approx(500.0)
+    # percentiles are taken over the window of the last 4 requests
+    assert snapshot['p50_ms'] == pytest.approx(3.0)
+    assert snapshot['p99_ms'] == pytest.approx(4.0)
+
+
+def request(server, method, path, body=None):
+    connection = HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read().decode('utf-8'))
+    finally:
+        connection.close()
+
+
+def test_attach_request_round_trip():
+    server = PaintBallServer(('127.0.0.1', 0), AttacherStub())
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        body = json.dumps({'source': u'kot', 'targets': [[u'zwierzę', 0.5], [u'kocur', 0.7]]})
+        status, response = request(server, 'POST', '/attach', body.encode('utf-8'))
+        assert status == 200
+        assert response['source'] == u'kot'
+        assert response['lead_synsets'] == [{'synset_id': 5, 'lemmas': [u'zwierzę']},
+                                            {'synset_id': 7, 'lemmas': [u'kocur']}]
+
+        assert request(server, 'POST', '/attach', b'{"source": "kot"}')[0] == 400
+        assert request(server, 'POST', '/attach', b'{"source": "error", "targets": []}')[0] == 500
+        assert request(server, 'POST', '/unknown', b'{}')[0] == 404
+        assert request(server, 'GET', '/health') == (200, {'status': 'ok'})
+
+        status, metrics = request(server, 'GET', '/metrics')
+        assert status == 200
+        assert metrics['requests'] == 3 and metrics['errors'] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from paintball.similarity_cache import SimilarityCache, convert_similarities
+
+
+def test_convert_and_load_similarities(tmpdir):
+    similarities = tmpdir.join('sim.csv')
+    similarities.write('kot;pies;0.75\nkot;mysz;0.25\npies;kot;0.5\nkot;pies;0.125\n')
+    path = str(tmpdir.join('sim.pbsim'))
+    convert_similarities([str(similarities)], path)
+
+    cache = SimilarityCache(path)
+    assert len(cache) == 2
+    assert list(cache) == ['kot', 'pies']
+    items = dict((source, sorted(targets)) for source, targets in cache.items())
+    assert items == {'kot': [('mysz', 0.25), ('pies', 0.875)], 'pies': [('kot', 0.5)]}
+    assert cache.scores.dtype == np.float32
+
+
+def test_tau_0_filters_on_load(tmpdir):
+    similarities = tmpdir.join('sim.csv')
+    similarities.write('kot;pies;0.75\nkot;mysz;0.25\npies;kot;0.5\n')
+    path = str(tmpdir.join('sim.pbsim'))
+    convert_similarities([str(similarities)], path)
+
+    items = dict(SimilarityCache(path, tau_0=0.5).items())
+    assert items == {'kot': [('pies', 0.75)], 'pies': []}
+
+
+def test_sources_keep_first_seen_order(tmpdir):
+    similarities = tmpdir.join('sim.csv')
+    # y is interned as a target before it is seen as a source
+    similarities.write('x;y;0.5\nz;a;0.25\ny;b;0.75\nz;y;0.5\n')
+    path = str(tmpdir.join('sim.pbsim'))
+    convert_similarities([str(similarities)], path)
+
+    cache = SimilarityCache(path)
+    assert list(cache) == ['x', 'z', 'y']
+    assert [(source, sorted(targets)) for source, targets in cache.items()] == \
+        [('x', [('y', 0.5)]), ('z', [('a', 0.25), ('y', 0.5)]), ('y', [('b', 0.75)])]
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from paintball.budget import EXHAUSTED, RELAXATIONS, TIME, TOP_K, SpreadingBudget
+from paintball.csr import CSRGraph
+from paintball.lemma_index import LemmaIndex, LemmaNodesMapping
+from paintball.paint_ball import BATCHED, BEST_FIRST, FRONTIER, SPARSE, VECTORIZED, PaintBall, Params
+from paintball.profile_cache import ActivationProfileCache
+from paintball.synset_sizes import SynsetSizeTable
+from paintball.tracing import JsonlTracer, NullTracer
+
+SYNONYMY = 888
+HYPERNYMY = 11
+HYPONYMY = 10
+ANTONYMY = 12
+
+# lexical units 0, 1, 2 and 4, 5 are synonyms, 3 is a hypernym of 0 and 4,
+# 5 an antonym of 1
+EDGES = [
+    (0, 1, SYNONYMY), (1, 0, SYNONYMY), (1, 2, SYNONYMY), (2, 1, SYNONYMY), (0, 2, SYNONYMY), (2, 0, SYNONYMY),
+    (4, 5, SYNONYMY), (5, 4, SYNONYMY),
+    (0, 3, HYPERNYMY), (3, 0, HYPONYMY), (4, 3, HYPERNYMY), (3, 4, HYPONYMY),
+    (1, 5, ANTONYMY), (5, 1, ANTONYMY),
+]
+SYNSET_IDS = [10, 10, 10, 20, 30, 30]
+SYNSET_SIZES = SynsetSizeTable([10, 20, 30], [3, 1, 2])
+LEMMAS = [u'kot', u'kocur', u'mruczek', u'zwierzę', u'pies', u'kundel']
+IMPEDANCE_TABLE = {
+    HYPERNYMY: {HYPONYMY: 0, ANTONYMY: 0},
+    HYPONYMY: {HYPERNYMY: 0},
+    ANTONYMY: {ANTONYMY: 0},
+}
+
+
+class GraphStub(object):
+    """ Lexical unit graph with edge and node attributes kept in arrays """
+
+    def __init__(self, edges, synset_ids, lemmas=None):
+        self.sources, self.targets, rel_ids = [np.array(column) for column in zip(*edges)]
+        self.synset_ids = np.array(synset_ids)
+        self.edge_attributes = {'rel_id': rel_ids}
+        if lemmas is not None:
+            index = LemmaIndex.from_pairs(lemmas, range(len(lemmas)))
+            self.lemma_to_nodes_dict = LemmaNodesMapping(self, index)
+
+    def node_for_vertex(self, vertex):
+        return vertex
+
+    def create_edge_attribute(self, name, kind, value=0):
+        self.edge_attributes[name] = np.full(len(self.sources), value)
+
+    def get_edge_attribute_array(self, name):
+        return self.edge_attributes[name]
+
+    def set_edge_attribute_array(self, name, values):
+        self.edge_attributes[name] = np.asarray(values)
+
+    def get_node_attribute_array(self, name):
+        assert name == 'synset_id'
+        return self.synset_ids
+
+    def csr(self, rebuild=False):
+        return CSRGraph.from_edges(len(self.synset_ids), self.sources, self.targets,
+                                   self.edge_attributes['rel_id'], self.edge_attributes['weight'])
+
+
+class SynsetGraphStub(object):
+    """ Synsets graph without edges, its vertices are served by synset id from snapshot like arrays """
+
+    revision = 0
+    has_synset_index = True
+
+    def __init__(self, synset_ids):
+        self.synset_ids = np.array(synset_ids)
+        self.snapshot = self
+
+    def node_for_vertex(self, vertex):
+        return vertex
+
+    def node_synset_id(self, node):
+        return int(self.synset_ids[node])
+
+    def connected_components(self, nodes):
+        return [[node] for node in sorted(nodes)]
+
+
+def make_paint_ball(engine, decay, epsilon, edges=EDGES, synset_ids=SYNSET_IDS, plwn=None, **kwargs):
+    params = Params(mikro=decay, tau_0=0.0, epsilon=epsilon, tau_3=1.0, tau_4=1.0)
+    graph = GraphStub(edges, synset_ids, LEMMAS if edges is EDGES else None)
+    return PaintBall(graph, params, IMPEDANCE_TABLE, None, plwn, engine=engine, **kwargs)
+
+
+def spread_recursively(edges, decay, epsilon, T):
+    """ Q of the original recursive spreading, which follows every path on its own """
+    transmitance = PaintBall.make_transmitance_dict()
+    out_edges = defaultdict(list)
+    for source, target, rel_id in edges:
+        out_edges[source].append((target, rel_id))
+    Q = defaultdict(float)
+
+    def transmit(rel_id, vertex, activation_value):
+        if activation_value < epsilon:
+            return
+        for target, next_rel_id in out_edges[vertex]:
+            impedance = IMPEDANCE_TABLE.get(rel_id, {}).get(next_rel_id, 1)
+            transmit(next_rel_id, target, impedance * (transmitance[next_rel_id] * (decay * activation_value)))
+        Q[vertex] += activation_value
+
+    for vertex, activation_value in T.items():
+        if activation_value >= epsilon:
+            for target, rel_id in out_edges[vertex]:
+                transmit(rel_id, target, transmitance[rel_id] * (decay * activation_value))
+    return Q
+
+
+def assert_same_activations(Q, expected):
+    vertices, activations = Q
+    assert sorted(vertices.tolist()) == sorted(vertex for vertex, value in expected.items() if value)
+    assert np.allclose(activations, [expected[vertex] for vertex in vertices.tolist()], rtol=1e-9)
+
+
+def test_spreading_matches_recursion_on_synonym_cycles():
+    T = OrderedDict([(0, 1.0), (4, 0.5), (3, 0.01)])
+    for decay, epsilon in [(0.8, 0.125), (0.8, 0.05), (0.6, 0.02)]:
+        expected = spread_recursively(EDGES, decay, epsilon, T)
+        for engine in (FRONTIER, VECTORIZED, BEST_FIRST, SPARSE, BATCHED):
+            assert_same_activations(make_paint_ball(engine, decay, epsilon)._spread(T), expected)
+
+        paint_ball = make_paint_ball(FRONTIER, decay, epsilon, profile_cache=ActivationProfileCache())
+        assert_same_activations(paint_ball._spread(T), expected)
+        assert_same_activations(paint_ball._spread(T), expected)
+
+
+def test_spreading_ends_on_synonym_cliques():
+    # every path of length d leaving a start node of a clique of 5
+    # synonyms passes activation decay ** d, and there are 4 ** d of them
+    clique = [(source, target, SYNONYMY) for source in range(5) for target in range(5) if source != target]
+    decay, epsilon = 0.8, 1e-4
+    depth = int(np.floor(np.log(epsilon) / np.log(decay)))
+    expected = sum(4 ** d * decay ** d for d in range(1, depth + 1))
+
+    for engine in (FRONTIER, VECTORIZED, BEST_FIRST, SPARSE, BATCHED):
+        Q = make_paint_ball(engine, decay, epsilon, edges=clique, synset_ids=[1] * 5)._spread({0: 1.0})
+        vertices, activations = Q
+        assert sorted(vertices.tolist()) == [0, 1, 2, 3, 4]
+        assert np.isclose(activations.sum(), expected, rtol=1e-9)
+
+
+def test_replayed_spreading_matches_recursion():
+    T = OrderedDict([(0, 1.0), (4, 0.5), (3, 0.01)])
+    record = make_paint_ball(VECTORIZED, 0.8, 0.02).record_spreading(T)
+    for decay, epsilon in [(0.8, 0.02), (0.8, 0.125), (0.6, 0.05)]:
+        assert_same_activations(record.replay(decay, 0.0, epsilon), spread_recursively(EDGES, decay, epsilon, T))
+
+
+class RecordingTracer(NullTracer):
+    """ Disabled tracer remembering what it was given """
+
+    def __init__(self):
+        self.visits = []
+
+    def visit(self, vertex, rel_id, activation):
+        self.visits.append((vertex, rel_id, activation))
+
+    def visit_many(self, vertices, rel_ids, activations):
+        self.visits.extend(zip(vertices, rel_ids, activations))
+
+
+def test_jsonl_tracer_writes_line_per_source(tmpdir):
+    path = str(tmpdir.join('trace.jsonl'))
+    syn_graph = SynsetGraphStub([10, 20, 30])
+    items = [(u'kotek', [(u'kot', '1.0'), (u'zwierzę', '0.2')]), (u'szczeniak', [(u'pies', '0.5')])]
+    for engine in (FRONTIER, VECTORIZED, BEST_FIRST):
+        tracer = JsonlTracer(path)
+        paint_ball = make_paint_ball(engine, 0.8, 0.05, tracer=tracer, synset_sizes=SYNSET_SIZES)
+        Qs = []
+        for source, targets_supports in items:
+            paint_ball.attach(source, targets_supports, syn_graph)
+            Qs.append(paint_ball._spread(paint_ball._initial_activation(targets_supports)))
+        tracer.close()
+
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        assert [line['source'] for line in lines] == [source for source, _ in items]
+        for line, (_, targets_supports), Q in zip(lines, items, Qs):
+            starts = [(vertex, activation) for vertex, rel_id, activation in line['visits'] if rel_id == -1]
+            assert sorted(starts) == sorted(paint_ball._initial_activation(targets_supports).items())
+            # the start vertices are not activated by themselves
+            spread = sum(activation for _, rel_id, activation in line['visits'] if rel_id != -1)
+            assert np.isclose(spread, Q[1].sum())
+
+
+def test_null_tracer_records_nothing(caplog):
+    # Q and Q_synset are logged as well
+    caplog.set_level(logging.INFO)
+    syn_graph = SynsetGraphStub([10, 20, 30])
+    for engine in (FRONTIER, VECTORIZED, BEST_FIRST):
+        tracer = RecordingTracer()
+        paint_ball = make_paint_ball(engine, 0.8, 0.05, tracer=tracer, synset_sizes=SYNSET_SIZES)
+        assert paint_ball.tracer is tracer
+        paint_ball.attach(u'kotek', [(u'kot', '1.0'), (u'pies', '0.5')], syn_graph)
+        assert tracer.visits == []
+        assert not make_paint_ball(engine, 0.8, 0.05).tracer.enabled
+
+
+def test_best_first_budget_stops_early():
+    T = OrderedDict([(0, 1.0), (4, 0.5), (3, 0.01)])
+    decay, epsilon = 0.8, 0.02
+    paint_ball = make_paint_ball(BEST_FIRST, decay, epsilon)
+    vertices, activations = paint_ball._spread(T)
+    full = dict(zip(vertices.tolist(), activations.tolist()))
+    report = paint_ball.spread_report
+    assert report.stopped_by == EXHAUSTED
+    assert report.unexpanded_states == 0 and report.unexpanded_mass == 0
+
+    budget = SpreadingBudget(max_relaxations=report.relaxations // 4)
+    paint_ball = make_paint_ball(BEST_FIRST, decay, epsilon, budget=budget)
+    vertices, activations = paint_ball._spread(T)
+    stopped = paint_ball.spread_report
+    assert stopped.stopped_by == RELAXATIONS
+    assert budget.max_relaxations <= stopped.relaxations < report.relaxations
+    assert stopped.expansions < report.expansions
+    # pending activation would be added to Q once expanded, with more on
+    # the paths leaving it
+    assert stopped.unexpanded_states > 0 and stopped.unexpanded_mass > 0
+    assert activations.sum() + stopped.unexpanded_mass <= sum(full.values()) + 1e-9
+    assert all(value <= full[vertex] + 1e-9 for vertex, value in zip(vertices.tolist(), activations.tolist()))
+
+    paint_ball = make_paint_ball(BEST_FIRST, decay, epsilon, budget=SpreadingBudget(max_seconds=0))
+    vertices, _ = paint_ball._spread(T)
+    stopped = paint_ball.spread_report
+    assert stopped.stopped_by == TIME and stopped.expansions == 0 and len(vertices) == 0
+    assert np.isclose(stopped.unexpanded_mass, 1.5) and stopped.unexpanded_states == 2
+
+    budget = SpreadingBudget(top_k=1, patience=2, check_every=1)
+    paint_ball = make_paint_ball(BEST_FIRST, decay, epsilon, budget=budget, synset_sizes=SYNSET_SIZES)
+    vertices, activations = paint_ball._spread(T)
+    stopped = paint_ball.spread_report
+    assert stopped.stopped_by == TOP_K
+    assert stopped.expansions < report.expansions and stopped.unexpanded_mass > 0
+    Q_synset = paint_ball.synset_activation((vertices, activations))
+    assert max(Q_synset, key=Q_synset.get) == 10
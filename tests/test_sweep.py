@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from paintball.sweep import SpreadingRecord
+
+
+def make_record():
+    # start nodes 0 and 1 both reach vertex 2, only the state of start 0 goes on to vertex 3
+    return SpreadingRecord(
+        vertices=np.array([0, 1]),
+        activations=np.array([1.0, 0.5]),
+        levels=[
+            (np.array([0, 1]), np.array([1.0, 1.0]), np.array([1.0, 1.0]), np.array([0, 1]), np.array([2, 2])),
+            (np.array([0]), np.array([0.5]), np.array([1.0]), np.array([0]), np.array([3])),
+        ]
+    )
+
+
+def test_replay_loosest_setting():
+    vertices, activations = make_record().replay(0.8, 0.3, 0.1)
+    assert vertices.tolist() == [2, 3]
+    assert np.allclose(activations, [1.2, 0.32])
+
+
+def test_replay_stricter_settings():
+    vertices, activations = make_record().replay(0.8, 0.6, 0.1)
+    assert vertices.tolist() == [2, 3]
+    assert np.allclose(activations, [0.8, 0.32])
+
+    vertices, activations = make_record().replay(0.8, 0.3, 0.35)
+    assert vertices.tolist() == [2]
+    assert np.allclose(activations, [1.2])
+
+    vertices, activations = make_record().replay(0.5, 0.3, 0.6)
+    assert len(vertices) == 0
+
+
+def test_replay_counts_merged_paths():
+    # both states of level 1 reach the same state of vertex 3 with the same activation
+    record = SpreadingRecord(
+        vertices=np.array([0]),
+        activations=np.array([1.0]),
+        levels=[
+            (np.array([0, 0]), np.array([1.0, 1.0]), np.array([1.0, 1.0]), np.array([0, 1]), np.array([1, 2])),
+            (np.array([0, 1]), np.array([1.0, 1.0]), np.array([1.0, 1.0]), np.array([0, 0]), np.array([3])),
+        ]
+    )
+    vertices, activations = record.replay(0.5, 0.3, 0.2)
+    assert vertices.tolist() == [1, 2, 3]
+    assert np.allclose(activations, [0.5, 0.5, 0.5])
+
+    vertices, activations = record.replay(0.5, 0.3, 0.3)
+    assert vertices.tolist() == [1, 2]
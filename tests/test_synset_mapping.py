@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from paintball.synset_mapping import SynsetMapping
+
+
+class SnapshotStub(object):
+    has_synset_index = True
+
+    def __init__(self, synset_ids):
+        self.synset_ids = np.asarray(synset_ids)
+
+
+class SynGraphStub(object):
+    revision = 0
+
+    def __init__(self, synset_ids):
+        self.snapshot = SnapshotStub(synset_ids)
+
+
+def test_aggregate_activation_per_synset():
+    mapping = SynsetMapping([30, -1, 10, 30, 20])
+    assert mapping.synset_ids.tolist() == [10, 20, 30]
+    assert mapping.vertex_synsets.tolist() == [2, -1, 0, 2, 1]
+    assert mapping.indices_of([20, 40, 30]).tolist() == [1, -1, 2]
+
+    indices, activations = mapping.aggregate([0, 1, 3, 2], [0.5, 1.0, 0.25, 0.125])
+    assert indices.tolist() == [0, 2]
+    assert np.allclose(activations, [0.125, 0.75])
+
+
+def test_synset_vertices_keep_the_last_vertex():
+    mapping = SynsetMapping([30, -1, 10, 20])
+    syn_graph = SynGraphStub([-1, 10, 30, 10, 50])
+
+    assert mapping.synset_vertices(syn_graph).tolist() == [3, -1, 2]
+
+
+def test_update_added_and_removed_vertices():
+    mapping = SynsetMapping([30, -1, 10, 30])
+    mapping.update([4, 0], [10, -1])
+    assert mapping.synset_ids.tolist() == [10, 30]
+    assert mapping.vertex_synsets.tolist() == [-1, -1, 0, 1, 0]
+
+    # a new synset moves the indices of the synsets after it
+    mapping.update([5, 1], [20, 30])
+    assert mapping.synset_ids.tolist() == [10, 20, 30]
+    assert mapping.vertex_synsets.tolist() == [-1, 2, 0, 2, 0, 1]
+    assert mapping.synset_vertices(SynGraphStub([20, 30])).tolist() == [-1, 0, 1]
@@ -0,0 +1,58 @@
+import numpy as np
+
+from paintball.paint_ball import FRONTIER
+from paintball.synset_sizes import SynsetSizeTable
+from test_spreading import make_paint_ball
+
+
+class PLWNStub(object):
+    """ plwn_utils.PLWN of known synset sizes, 1 for unknown synsets as PLWN.synset_len gives """
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.calls = 0
+
+    def synset_len(self, synset_id):
+        self.calls += 1
+        return self.sizes.get(synset_id, 1)
+
+
+def test_sizes_of_missing_synsets():
+    table = SynsetSizeTable([30, 10, 20], [2, 3, 4])
+
+    assert table.sizes_of([10, 5, 30, 40, 20, 25]).tolist() == [3, 1, 2, 1, 4, 1]
+    assert table.sizes_of(np.zeros(0, dtype=np.int64)).tolist() == []
+    assert table.synset_len(20) == 4
+    assert table.synset_len(21) == 1
+    assert SynsetSizeTable([], []).sizes_of([10, 20]).tolist() == [1, 1]
+
+
+def test_sizes_like_plwn(tmpdir):
+    plwn = PLWNStub({10: 3, 20: 4, 30: 2})
+    synset_ids = [10, 20, 30, 40]
+    table = SynsetSizeTable.from_plwn(plwn, synset_ids)
+
+    queried = [40, 30, 50, 10, 20]
+    assert table.sizes_of(queried).tolist() == [plwn.synset_len(synset_id) for synset_id in queried]
+
+    path = str(tmpdir.join('sizes.npz'))
+    table.save(path)
+    loaded = SynsetSizeTable.load(path)
+    assert loaded.synset_ids.tolist() == table.synset_ids.tolist()
+    assert loaded.sizes_of(queried).tolist() == table.sizes_of(queried).tolist()
+
+
+def test_synset_activation_falls_back_to_plwn():
+    # synsets 10 and 30 of 3 lexical units need activation 2, synset 20,
+    # unknown to plwn and the table, of 1 lexical unit needs 1.2
+    plwn = PLWNStub({10: 3, 30: 3})
+    Q = (np.arange(6), np.array([0.5, 0.5, 1.1, 1.3, 0.5, 1.0]))
+    expected = {10: 2.1, 20: 1.3}
+
+    for synset_sizes in (None, SynsetSizeTable.from_plwn(plwn, [10, 30])):
+        plwn.calls = 0
+        paint_ball = make_paint_ball(FRONTIER, 0.8, 0.05, plwn=plwn, synset_sizes=synset_sizes)
+        Q_synset = paint_ball.synset_activation(Q)
+        assert sorted(Q_synset) == sorted(expected)
+        assert all(np.isclose(Q_synset[synset_id], value) for synset_id, value in expected.items())
+        assert plwn.calls == (3 if synset_sizes is None else 0)